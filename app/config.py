@@ -15,6 +15,10 @@ class Config:
     # Model Settings
     MODEL_ID: str = os.getenv("MODEL_ID", "fixie-ai/ultravox-v0_5-llama-3_2-1b")
     DEVICE: str = os.getenv("DEVICE", "auto")
+    # Speculative decoding: a smaller causal LM sharing the model's tokenizer
+    # ("" = off) and the tokens it proposes per verification round
+    DRAFT_MODEL_ID: str = os.getenv("DRAFT_MODEL_ID", "")
+    DRAFT_NUM_TOKENS: int = int(os.getenv("DRAFT_NUM_TOKENS", "5"))
 
     # API Tokens
     HF_TOKEN: str = os.getenv("HF_TOKEN", "")
@@ -1,18 +1,116 @@
+import contextlib
+import threading
+import time
 import torch
 import warnings
-from transformers import AutoProcessor, AutoModel
+from transformers import AutoProcessor, AutoModel, AutoModelForCausalLM
 from huggingface_hub import login
 from app.config import config
 
 warnings.filterwarnings("ignore")
 
 
+class DraftModel:
+    """
+    Speculative decoding draft: a small causal LM whose `model` is handed to
+    generate() as `assistant_model`.
+
+    transformers 4.36 runs the draft's forward pass directly, one proposed
+    token per call, and the main model's once per verification round, so
+    both are counted with forward hooks while counting() is active. The
+    draft only sees the prompt's token ids (audio placeholders included),
+    never the audio. The main model still samples every position itself and
+    keeps draft tokens only up to the first one that differs, so outputs
+    follow the same distribution as decoding without a draft.
+    """
+
+    def __init__(self, model, num_tokens: int):
+        self.model = model
+        self.model.generation_config.num_assistant_tokens = num_tokens
+        self.rounds = 0
+        self.proposed = 0
+        self.model.register_forward_hook(self._count_proposed)
+
+    def _count_proposed(self, module, args, output):
+        self.proposed += 1
+
+    def _count_round(self, module, args, output):
+        self.rounds += 1
+
+    @contextlib.contextmanager
+    def counting(self, main_model):
+        """Count rounds and proposed tokens of one assisted generate() by `main_model`."""
+        self.rounds = 0
+        self.proposed = 0
+        hook = main_model.register_forward_hook(self._count_round)
+        try:
+            yield self
+        finally:
+            hook.remove()
+
+
+class DecodeStats:
+    """Decode throughput and draft acceptance totals (shared by pipeline threads)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.totals = {
+            "generations": 0,
+            "speculative": 0,
+            "new_tokens": 0,
+            "seconds": 0.0,
+            "draft_rounds": 0,
+            "draft_tokens": 0,
+            "accepted_tokens": 0,
+        }
+
+    def record(self, new_tokens: int, seconds: float, rounds: int = 0, proposed: int = 0):
+        """
+        Add one generate() call. Each verification round keeps the accepted
+        draft tokens plus one token from the main model, so accepted tokens
+        are the new tokens minus the rounds.
+        """
+        with self._lock:
+            self.totals["generations"] += 1
+            self.totals["new_tokens"] += new_tokens
+            self.totals["seconds"] += seconds
+            if rounds:
+                self.totals["speculative"] += 1
+                self.totals["draft_rounds"] += rounds
+                self.totals["draft_tokens"] += proposed
+                self.totals["accepted_tokens"] += min(max(new_tokens - rounds, 0), proposed)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            totals = dict(self.totals)
+        return {
+            **totals,
+            "tokens_per_second": round(totals["new_tokens"] / totals["seconds"], 2)
+            if totals["seconds"] else None,
+            "acceptance_rate": round(totals["accepted_tokens"] / totals["draft_tokens"], 4)
+            if totals["draft_tokens"] else None,
+            "tokens_per_round": round(totals["new_tokens"] / totals["draft_rounds"], 2)
+            if totals["draft_rounds"] else None,
+        }
+
+
+def count_new_tokens(output, prompt_length: int, pad_token_id) -> int:
+    """Tokens generated after the prompt, not counting padding of finished rows."""
+    new = output[:, prompt_length:]
+    if pad_token_id is None:
+        return new.numel()
+    return int((new != pad_token_id).sum())
+
+
 class AIModelManager:
     """Manages AI model loading and inference with lazy loading."""
 
     def __init__(self):
         self.processor = None
         self.model = None
+        self.draft_model = None
+        self.stats = DecodeStats()
+        self._draft_lock = threading.Lock()
         self.device = self._get_device()
         self._initialized = False
 
@@ -22,6 +120,10 @@ class AIModelManager:
             return "cuda" if torch.cuda.is_available() else "cpu"
         return config.DEVICE
 
+    def _get_dtype(self) -> torch.dtype:
+        """Half precision on GPU; CPU kernels need float32."""
+        return torch.float16 if self.device.startswith("cuda") else torch.float32
+
     def _initialize(self):
         """Initialize model and processor (called on first use)."""
         if self._initialized:
@@ -36,35 +138,104 @@ class AIModelManager:
 
         self.model = AutoModel.from_pretrained(
             config.MODEL_ID,
-            torch_dtype=torch.float16,
+            torch_dtype=self._get_dtype(),
             low_cpu_mem_usage=True,
             trust_remote_code=True,
             token=config.HF_TOKEN,
         ).to(self.device)
 
         print(f"✓ Model loaded on {self.device}")
+
+        if config.DRAFT_MODEL_ID:
+            self.draft_model = self._load_draft()
         self._initialized = True
 
-    def generate(self, prompt: str, audio_array, sr: int) -> str:
-        """Generate response from audio and prompt."""
-        self._initialize()  # Lazy load on first call
-        inputs = self.processor(
-            text=prompt, audio=audio_array, sampling_rate=sr, return_tensors="pt"
+    def _load_draft(self):
+        """Load the speculative decoding draft model, or None if it cannot be used."""
+        print(f"⏳ Loading draft model {config.DRAFT_MODEL_ID}...")
+        draft = AutoModelForCausalLM.from_pretrained(
+            config.DRAFT_MODEL_ID,
+            torch_dtype=self._get_dtype(),
+            low_cpu_mem_usage=True,
+            token=config.HF_TOKEN,
         ).to(self.device)
 
-        with torch.cuda.amp.autocast():
-            output = self.model.generate(
-                **inputs, max_new_tokens=512, do_sample=True, temperature=0.2
+        # Draft tokens are verified by id, so both models must share a vocabulary
+        text_config = getattr(self.model.config, "text_config", self.model.config)
+        if draft.config.vocab_size != text_config.vocab_size:
+            print(
+                f"⚠️  Draft vocabulary ({draft.config.vocab_size}) does not match the model's "
+                f"({text_config.vocab_size}); speculative decoding disabled"
             )
+            return None
+
+        print(f"✓ Draft model loaded, {config.DRAFT_NUM_TOKENS} tokens per round")
+        return DraftModel(draft, config.DRAFT_NUM_TOKENS)
+
+    def load(self):
+        """Load model and processor now instead of on first request."""
+        self._initialize()
 
-        full_response = self.processor.batch_decode(output, skip_special_tokens=True)[0]
-        clean_response = (
-            full_response.split("<|audio|>")[-1].strip()
-            if "<|audio|>" in full_response
-            else full_response
+    def featurize(self, prompt: str, audio_arrays: list, sr: int):
+        """Build (CPU) model inputs for one prompt over one or more clips."""
+        self._initialize()
+        if len(audio_arrays) == 1:
+            return self.processor(
+                text=prompt, audio=audio_arrays[0], sampling_rate=sr, return_tensors="pt"
+            )
+        return self.processor(
+            text=[prompt] * len(audio_arrays),
+            audio=list(audio_arrays),
+            sampling_rate=sr,
+            return_tensors="pt",
+            padding=True,
         )
 
-        return clean_response
+    def generate_from_features(self, inputs) -> list:
+        """Generate one response per clip from featurized inputs."""
+        self._initialize()
+        inputs = inputs.to(self.device)
+        prompt_length = inputs["input_ids"].shape[-1]
+        pad_token_id = self.model.generation_config.pad_token_id
+
+        # Assisted generation handles one sequence at a time; batches decode normally
+        if self.draft_model is not None and inputs["input_ids"].shape[0] == 1:
+            # One draft per generate() call; its cache and counters are per call
+            with self._draft_lock, self.draft_model.counting(self.model) as draft:
+                started = time.perf_counter()
+                with torch.cuda.amp.autocast():
+                    output = self.model.generate(
+                        **inputs,
+                        max_new_tokens=512,
+                        do_sample=True,
+                        temperature=0.2,
+                        assistant_model=draft.model,
+                    )
+                self.stats.record(
+                    count_new_tokens(output, prompt_length, pad_token_id),
+                    time.perf_counter() - started,
+                    draft.rounds,
+                    draft.proposed,
+                )
+        else:
+            started = time.perf_counter()
+            with torch.cuda.amp.autocast():
+                output = self.model.generate(
+                    **inputs, max_new_tokens=512, do_sample=True, temperature=0.2
+                )
+            self.stats.record(
+                count_new_tokens(output, prompt_length, pad_token_id),
+                time.perf_counter() - started,
+            )
+
+        return [
+            response.split("<|audio|>")[-1].strip() if "<|audio|>" in response else response
+            for response in self.processor.batch_decode(output, skip_special_tokens=True)
+        ]
+
+    def generate(self, prompt: str, audio_array, sr: int) -> str:
+        """Generate response from audio and prompt."""
+        return self.generate_from_features(self.featurize(prompt, [audio_array], sr))[0]
 
 
 # Global model instance
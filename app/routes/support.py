@@ -41,3 +41,13 @@ async def customer_support(audio: UploadFile = File(...)):
 
     except Exception as e:
         return JSONResponse({"error": str(e)}, status_code=500)
+
+
+@router.get("/support/stats")
+async def decode_stats():
+    """Decode tokens/sec and speculative decoding acceptance since startup."""
+    model_manager = get_model_manager()
+    return JSONResponse({
+        "speculative": bool(model_manager.draft_model),
+        **model_manager.stats.snapshot(),
+    })
@@ -1,3 +1,4 @@
-from app.utils.audio_processor import load_audio
+from app.utils.audio_processor import load_audio, decode_audio, resample_audio
+from app.utils.pipeline import Pipeline, Stage
 
-__all__ = ["load_audio"]
+__all__ = ["load_audio", "decode_audio", "resample_audio", "Pipeline", "Stage"]
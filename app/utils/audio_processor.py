@@ -5,3 +5,16 @@ def load_audio(file_path: str, sr: int = 16000):
     """Load audio file and return array with sample rate."""
     audio_array, sample_rate = librosa.load(file_path, sr=sr)
     return audio_array, sample_rate
+
+
+def decode_audio(file_path: str):
+    """Decode audio file to a mono array at its native sample rate."""
+    audio_array, sample_rate = librosa.load(file_path, sr=None)
+    return audio_array, sample_rate
+
+
+def resample_audio(audio_array, orig_sr: int, sr: int = 16000):
+    """Resample audio array to `sr` (returned unchanged if it already matches)."""
+    if orig_sr == sr:
+        return audio_array
+    return librosa.resample(audio_array, orig_sr=orig_sr, target_sr=sr)
@@ -0,0 +1,175 @@
+"""Thread-based processing pipeline with bounded queues between stages."""
+
+import queue
+import threading
+import time
+
+_DONE = object()
+
+
+class Stage:
+    """
+    One pipeline step run by `workers` threads.
+
+    `func(item) -> item`, or with `batch_size` > 0, `func(items) -> item` on up
+    to `batch_size` items collected within `batch_timeout` seconds of the first.
+    """
+
+    def __init__(self, name: str, func, workers: int = 1, batch_size: int = 0,
+                 batch_timeout: float = 0.05):
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.batch_size = batch_size
+        self.batch_timeout = batch_timeout
+        self.items = 0
+        self.busy = 0.0
+        self.starved = 0.0
+        self.blocked = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, items: int, busy: float, starved: float, blocked: float):
+        with self._lock:
+            self.items += items
+            self.busy += busy
+            self.starved += starved
+            self.blocked += blocked
+
+    def utilization(self, wall_time: float) -> dict:
+        """Share of worker time spent working, waiting for input and waiting on output."""
+        capacity = max(wall_time * self.workers, 1e-9)
+        return {
+            "items": self.items,
+            "busy": self.busy / capacity,
+            "starved": self.starved / capacity,
+            "blocked": self.blocked / capacity,
+        }
+
+
+class Pipeline:
+    """Runs items through stages concurrently; each stage feeds the next via a bounded queue."""
+
+    def __init__(self, stages: list, queue_size: int = 16):
+        self.stages = stages
+        self.queue_size = queue_size
+        self.error = None
+        self._stop = threading.Event()
+
+    def run(self, source) -> float:
+        """Feed every item from `source` through all stages; return the wall time."""
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        remaining = [stage.workers for stage in self.stages]
+        lock = threading.Lock()
+
+        def finish(index: int):
+            # The last worker of a stage to finish tells every worker of the next one
+            with lock:
+                remaining[index] -= 1
+                last = remaining[index] == 0
+            if last and index + 1 < len(self.stages):
+                for _ in range(self.stages[index + 1].workers):
+                    self._put(queues[index + 1], _DONE)
+
+        def feed():
+            try:
+                for item in source:
+                    if not self._put(queues[0], item):
+                        return
+            except Exception as e:
+                self._fail(e)
+            for _ in range(self.stages[0].workers):
+                self._put(queues[0], _DONE)
+
+        def work(index: int):
+            stage = self.stages[index]
+            output = queues[index + 1] if index + 1 < len(self.stages) else None
+            try:
+                while not self._stop.is_set():
+                    started = time.perf_counter()
+                    items, done = self._take(stage, queues[index])
+                    waited = time.perf_counter() - started
+                    if items:
+                        started = time.perf_counter()
+                        result = stage.func(items if stage.batch_size else items[0])
+                        busy = time.perf_counter() - started
+                        started = time.perf_counter()
+                        if output is not None and not self._put(output, result):
+                            break
+                        stage.record(len(items), busy, waited, time.perf_counter() - started)
+                    else:
+                        stage.record(0, 0.0, waited, 0.0)
+                    if done:
+                        break
+            except Exception as e:
+                self._fail(e)
+            finally:
+                finish(index)
+
+        threads = [threading.Thread(target=feed, name="pipeline-source", daemon=True)]
+        for index, stage in enumerate(self.stages):
+            threads += [
+                threading.Thread(target=work, args=(index,), name=f"{stage.name}-{n}", daemon=True)
+                for n in range(stage.workers)
+            ]
+
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                thread.join()
+        except KeyboardInterrupt:
+            # Let workers finish the item in hand, then stop
+            self.stop()
+            for thread in threads:
+                thread.join()
+            raise
+        wall_time = time.perf_counter() - started
+
+        if self.error is not None:
+            raise self.error
+        return wall_time
+
+    def stop(self):
+        """Abort the run; items still queued between stages are dropped."""
+        self._stop.set()
+
+    def _fail(self, error: Exception):
+        if self.error is None:
+            self.error = error
+        self._stop.set()
+
+    def _put(self, q: queue.Queue, item) -> bool:
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _get(self, q: queue.Queue, timeout: float = 0.1):
+        try:
+            return q.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def _take(self, stage: Stage, q: queue.Queue):
+        """Next item (or batch) for a stage: (items, saw_end_of_input)."""
+        item = self._get(q)
+        if item is None:
+            return [], False
+        if item is _DONE:
+            return [], True
+        items = [item]
+        deadline = time.perf_counter() + stage.batch_timeout
+        while len(items) < stage.batch_size and not self._stop.is_set():
+            item = self._get(q, max(0.0, deadline - time.perf_counter()))
+            if item is _DONE:
+                return items, True
+            if item is None:
+                if time.perf_counter() >= deadline:
+                    break
+                continue
+            items.append(item)
+        return items, False
@@ -0,0 +1,225 @@
+"""
+Per-call resource accounting.
+
+Each API handler runs with a Usage in a context variable. Once the handler
+knows which call it is working for, it calls bind(call_id); the code it
+reaches adds to the same Usage with record(): Ultravox requests and bytes
+(upstream.py), rows and bytes written for the call (database.py), webhook
+deliveries. The handler's CPU time on the event loop is measured step by
+step around its coroutine, so time spent in other requests interleaved with
+it is not counted (work on executor and SQLite threads is not either).
+
+When the handler returns, a bound Usage is added to the ledger, which sums
+usage per call in memory and writes it in batches to the call_costs table.
+Background work for a call (e.g. the transcript job) is charged the same
+way inside charge_to(call_id). Unbound usage is counted but not attributed.
+"""
+
+import asyncio
+import contextvars
+import logging
+import time
+
+from fastapi.routing import APIRoute
+
+from config import COST_FLUSH_INTERVAL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Counters kept per call, in call_costs column order
+COST_FIELDS = (
+    "requests",
+    "webhooks",
+    "ultravox_requests",
+    "ultravox_bytes",
+    "db_rows",
+    "db_bytes",
+    "cpu_ms",
+)
+
+# Usage of the handler or background job being run
+_usage_var = contextvars.ContextVar("call_usage", default=None)
+
+
+class Usage:
+    """Resources used by one handler run, and the call they are charged to."""
+
+    __slots__ = ("call_id", "counters")
+
+    def __init__(self, call_id: str = None):
+        self.call_id = call_id
+        self.counters = dict.fromkeys(COST_FIELDS, 0)
+
+
+def record(**counts):
+    """Add to the current usage (a no-op outside handlers and charged jobs)."""
+    usage = _usage_var.get()
+    if usage is not None:
+        for name, value in counts.items():
+            usage.counters[name] += value
+
+
+def bind(call_id: str):
+    """Charge the current handler's usage (including what it used so far) to a call."""
+    usage = _usage_var.get()
+    if usage is not None and call_id:
+        usage.call_id = call_id
+
+
+def current_call_id():
+    """The call the current usage is charged to, if any."""
+    usage = _usage_var.get()
+    return usage.call_id if usage is not None else None
+
+
+def collect() -> Usage:
+    """Start a fresh usage for the current task; read it back with the return value."""
+    usage = Usage()
+    _usage_var.set(usage)
+    return usage
+
+
+class charge_to:
+    """Context manager charging the enclosed background work to a call."""
+
+    def __init__(self, call_id: str):
+        self.usage = Usage(call_id)
+
+    def __enter__(self) -> Usage:
+        self.token = _usage_var.set(self.usage)
+        return self.usage
+
+    def __exit__(self, exc_type, exc, tb):
+        _usage_var.reset(self.token)
+        ledger.charge(self.usage)
+
+
+class _Metered:
+    """Await a coroutine, adding the thread CPU time of each of its steps to a usage."""
+
+    __slots__ = ("coro", "usage")
+
+    def __init__(self, coro, usage: Usage):
+        self.coro = coro
+        self.usage = usage
+
+    def __await__(self):
+        steps = self.coro.__await__()
+        send, value = steps.send, None
+        cpu = 0.0
+        try:
+            while True:
+                started = time.thread_time()
+                try:
+                    future = send(value)
+                except StopIteration as stop:
+                    cpu += time.thread_time() - started
+                    return stop.value
+                except BaseException:
+                    cpu += time.thread_time() - started
+                    raise
+                cpu += time.thread_time() - started
+                try:
+                    value = yield future
+                    send = steps.send
+                except BaseException as e:
+                    # Deliver cancellation and errors to the coroutine on its next step
+                    send, value = steps.throw, e
+        finally:
+            self.usage.counters["cpu_ms"] += cpu * 1000
+
+
+class AccountedRoute(APIRoute):
+    """APIRoute whose handler runs with its own Usage and is CPU metered."""
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def accounted_handler(request):
+            usage = Usage()
+            usage.counters["requests"] = 1
+            token = _usage_var.set(usage)
+            try:
+                return await _Metered(handler(request), usage)
+            finally:
+                _usage_var.reset(token)
+                ledger.charge(usage)
+
+        return accounted_handler
+
+
+class CostLedger:
+    """Per-call usage totals, written to call_costs in batches."""
+
+    def __init__(self, flush_interval: float = 5.0, max_pending: int = 10000):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending = {}
+        self._save = None
+        self._wake = None
+        self._task = None
+        self.stats = {"charged": 0, "unattributed": 0, "flushes": 0, "errors": 0}
+
+    def charge(self, usage: Usage):
+        if usage.call_id is None:
+            self.stats["unattributed"] += 1
+            return
+        totals = self._pending.get(usage.call_id)
+        if totals is None:
+            self._pending[usage.call_id] = dict(usage.counters)
+        else:
+            for name, value in usage.counters.items():
+                totals[name] += value
+        self.stats["charged"] += 1
+        if len(self._pending) >= self.max_pending and self._wake:
+            self._wake.set()
+
+    async def start(self, save):
+        """Flush every flush_interval with `save(rows)` (see database.save_call_costs)."""
+        self._save = save
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._flusher())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Call cost flush failed; {len(self._pending)} calls lost: {e}")
+
+    async def flush(self):
+        """Write pending totals now."""
+        if not self._pending or self._save is None:
+            return
+        pending, self._pending = self._pending, {}
+        try:
+            await self._save([{"call_id": call_id, **totals} for call_id, totals in pending.items()])
+        except Exception:
+            # Merge back into anything charged meanwhile
+            for call_id, totals in pending.items():
+                current = self._pending.setdefault(call_id, dict.fromkeys(COST_FIELDS, 0))
+                for name, value in totals.items():
+                    current[name] += value
+            raise
+        self.stats["flushes"] += 1
+
+    async def _flusher(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"Call cost flush error: {e}")
+
+    def snapshot(self) -> dict:
+        return {**self.stats, "pending_calls": len(self._pending)}
+
+
+ledger = CostLedger(COST_FLUSH_INTERVAL_SECONDS)
@@ -0,0 +1,133 @@
+"""
+In-memory, precompressed frontend asset store.
+
+The frontend directory is loaded once: every file is hashed and kept in
+memory with gzip (and brotli, if installed) variants. CSS/JS are also served
+under content-hashed names (e.g. /static/app.3f9a1c2b.js) with immutable
+cache headers, and HTML pages are rewritten to reference those names. HTML
+itself is served with `no-cache` and a strong ETag so browsers revalidate it
+cheaply. In dev mode the store reloads when a file changes on disk.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import re
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+
+
+class Asset:
+    """One file with its precompressed variants."""
+
+    def __init__(self, name: str, content: bytes, content_type: str):
+        self.name = name
+        self.content_type = content_type
+        self.digest = hashlib.sha256(content).hexdigest()[:12]
+        self.variants = {"identity": content}
+        if content_type.startswith(COMPRESSIBLE_TYPES):
+            gzipped = gzip.compress(content, compresslevel=9, mtime=0)
+            if len(gzipped) < len(content):
+                self.variants["gzip"] = gzipped
+            if brotli is not None:
+                compressed = brotli.compress(content, quality=11)
+                if len(compressed) < len(content):
+                    self.variants["br"] = compressed
+
+    @property
+    def hashed_name(self) -> str:
+        stem, dot, suffix = self.name.rpartition(".")
+        return f"{stem}.{self.digest}.{suffix}" if dot else f"{self.name}.{self.digest}"
+
+    def select(self, accept_encoding: str):
+        """Pick the smallest variant the client accepts: (encoding, body, etag)."""
+        accepted = {
+            part.split(";")[0].strip()
+            for part in accept_encoding.lower().split(",")
+            if not part.strip().endswith(";q=0")
+        }
+        for encoding in ("br", "gzip"):
+            if encoding in self.variants and encoding in accepted:
+                return encoding, self.variants[encoding], f'"{self.digest}-{encoding}"'
+        return "identity", self.variants["identity"], f'"{self.digest}"'
+
+
+class AssetStore:
+    """All frontend assets, addressable by plain and content-hashed names."""
+
+    def __init__(self, directory: Path, url_prefix: str = "/static/", reload: bool = False):
+        self.directory = directory
+        self.url_prefix = url_prefix
+        self.reload = reload
+        self._assets = {}
+        self._immutable = set()
+        self._mtimes = {}
+
+    def load(self):
+        """(Re)load every file in the directory into memory."""
+        assets = {}
+        immutable = set()
+        files = sorted(p for p in self.directory.rglob("*") if p.is_file())
+
+        # Hash non-HTML assets first so HTML can point at the hashed names
+        for path in files:
+            if path.suffix != ".html":
+                name = path.relative_to(self.directory).as_posix()
+                asset = Asset(name, path.read_bytes(), self._content_type(path))
+                assets[name] = asset
+                assets[asset.hashed_name] = asset
+                immutable.add(asset.hashed_name)
+
+        references = {
+            f"{self.url_prefix}{name}": f"{self.url_prefix}{asset.hashed_name}"
+            for name, asset in assets.items()
+            if name not in immutable
+        }
+        pattern = re.compile("|".join(re.escape(url) for url in sorted(references, reverse=True))
+                             + r"(?=[\"'?#])") if references else None
+
+        for path in files:
+            if path.suffix == ".html":
+                name = path.relative_to(self.directory).as_posix()
+                html = path.read_text(encoding="utf-8")
+                if pattern:
+                    html = pattern.sub(lambda m: references[m.group(0)], html)
+                assets[name] = Asset(name, html.encode("utf-8"), "text/html")
+
+        self._assets = assets
+        self._immutable = immutable
+        self._mtimes = self._scan()
+
+    def _scan(self) -> dict:
+        return {p: p.stat().st_mtime for p in self.directory.rglob("*") if p.is_file()}
+
+    @staticmethod
+    def _content_type(path: Path) -> str:
+        return mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+
+    def get(self, name: str):
+        """Return (asset, cache_control) for a name, or (None, None)."""
+        if self.reload and self._scan() != self._mtimes:
+            self.load()
+        asset = self._assets.get(name)
+        if asset is None:
+            return None, None
+        return asset, IMMUTABLE_CACHE if name in self._immutable else REVALIDATE_CACHE
+
+    def stats(self) -> dict:
+        """Total bytes per available encoding across unique assets."""
+        encodings = ("identity", "gzip", "br") if brotli is not None else ("identity", "gzip")
+        totals = {}
+        for asset in {id(a): a for a in self._assets.values()}.values():
+            for encoding in encodings:
+                body = asset.variants.get(encoding, asset.variants["identity"])
+                totals[encoding] = totals.get(encoding, 0) + len(body)
+        return totals
@@ -0,0 +1,131 @@
+"""
+Call detail query benchmark.
+
+Compares the previous path (get_call + get_call_webhooks +
+get_call_tool_invocations, each on its own connection, encoded with orjson)
+with get_call_detail_json, which has SQLite build the whole document with
+json_object/json_group_array in one statement. Both documents must decode
+to the same data once the JSON-text columns of the old one are parsed. Runs
+against a scratch database.
+
+Usage:
+    python bench_call_detail.py --webhooks 300 --tools 100 --repeat 50
+"""
+
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+import database
+from responses import FastJSONResponse, orjson
+
+
+async def seed(webhooks: int, tools: int) -> str:
+    """Create one call with many webhook and tool rows; return its id."""
+    call_id = str(uuid.uuid4())
+    response_json = {
+        "callId": call_id,
+        "joinUrl": f"wss://voice.ultravox.ai/calls/{call_id}",
+        "medium": {"webRtc": {}},
+        "systemPrompt": "You are Avani, a customer support agent for TechFix. " * 60,
+    }
+    await database.create_call(call_id, "bench-agent", response_json["joinUrl"], response_json)
+    async with database._connect(shard=database.shard_for(call_id)) as db:
+        await db.executemany(
+            "INSERT INTO webhooks (call_id, event_type, payload, event_timestamp) VALUES (?, ?, ?, ?)",
+            [
+                (call_id, "call.joined", json.dumps({"event": "call.joined", "call": response_json}),
+                 f"2026-01-19T16:05:{i:06d}Z")
+                for i in range(webhooks)
+            ],
+        )
+        await db.executemany(
+            "INSERT INTO tool_invocations (call_id, tool_name, parameters) VALUES (?, ?, ?)",
+            [
+                (call_id, "log_call_engagement", json.dumps({
+                    "call_phase": "providing_solution",
+                    "customer_sentiment": "satisfied",
+                    "resolution_likelihood": i % 100,
+                    "engagement_notes": "Customer followed the troubleshooting steps.",
+                }))
+                for i in range(tools)
+            ],
+        )
+        await db.commit()
+    return call_id
+
+
+async def three_queries(call_id: str) -> bytes:
+    """The previous endpoint path."""
+    content = {
+        "call": await database.get_call(call_id),
+        "webhooks": await database.get_call_webhooks(call_id),
+        "tool_invocations": await database.get_call_tool_invocations(call_id),
+    }
+    return FastJSONResponse(content=content).body
+
+
+async def one_statement(call_id: str) -> bytes:
+    return await database.get_call_detail_json(call_id)
+
+
+def decoded(document: bytes) -> dict:
+    """A call detail document's rows, limited to the detail columns, with JSON text parsed."""
+    detail = json.loads(document)
+    sections = {"calls": [detail["call"]], "webhooks": detail["webhooks"],
+                "tool_invocations": detail["tool_invocations"]}
+    for table, rows in sections.items():
+        for i, row in enumerate(rows):
+            rows[i] = {
+                column: json.loads(row[column])
+                if column in database.CALL_DETAIL_JSON_COLUMNS and isinstance(row[column], str)
+                else row[column]
+                for column in database.CALL_DETAIL_COLUMNS[table]
+            }
+    return sections
+
+
+async def measure(fn, call_id: str, repeat: int) -> float:
+    """Best-of-3 mean milliseconds per call."""
+    best = float("inf")
+    for _ in range(3):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            await fn(call_id)
+        best = min(best, (time.perf_counter() - started) / repeat)
+    return best * 1000
+
+
+async def main_async(args):
+    database.DB_PATH = Path(tempfile.mkdtemp()) / "bench.db"
+    await database.init_db()
+
+    print(f"Encoder: {'orjson' if orjson else 'stdlib json (orjson not installed)'}")
+    for webhooks in args.webhooks:
+        call_id = await seed(webhooks, args.tools)
+        old = await three_queries(call_id)
+        new = await one_statement(call_id)
+        assert decoded(old) == decoded(new)
+
+        old_ms = await measure(three_queries, call_id, args.repeat)
+        new_ms = await measure(one_statement, call_id, args.repeat)
+        print(f"call detail ({webhooks} webhooks, {args.tools} tools) [{len(new) / 1024:,.0f} KB]")
+        print(f"  3 queries + encode:  {old_ms:8.2f} ms")
+        print(f"  1 statement:         {new_ms:8.2f} ms  ({old_ms / new_ms:.1f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Call detail query benchmark")
+    parser.add_argument("--webhooks", type=int, nargs="+", default=[10, 100, 300, 1000])
+    parser.add_argument("--tools", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Throughput benchmark for the outbound campaign scheduler.
+
+Starts the mock Ultravox server in-process, queues a campaign against it and
+reports achieved dial rate, peak upstream concurrency and retry counts.
+
+Usage:
+    python bench_campaign.py --numbers 2000 --cps 50 --max-concurrent 20 \\
+        --latency-ms 100 --error-rate 0.05
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_mock(port: int, args):
+    """Run the mock Ultravox server in a background thread."""
+    import uvicorn
+    import mock_ultravox
+
+    mock_ultravox.settings.latency_ms = args.latency_ms
+    mock_ultravox.settings.error_rate = args.error_rate
+    mock_ultravox.settings.rate_limit_rate = args.rate_limit_rate
+    server = uvicorn.Server(
+        uvicorn.Config(mock_ultravox.app, host="127.0.0.1", port=port, log_level="warning")
+    )
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return mock_ultravox.stats
+
+
+async def run(args, stats):
+    import database
+    from campaigns import CampaignScheduler
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = Path(tmp) / "bench.db"
+        await database.init_db()
+
+        scheduler = CampaignScheduler(poll_interval=0.1)
+        await scheduler.start()
+        targets = [{"to_number": f"+1555{i:07d}"} for i in range(args.numbers)]
+        started = time.perf_counter()
+        campaign_id = await database.create_campaign(
+            "benchmark", targets, args.cps, args.max_concurrent, args.max_attempts
+        )
+        scheduler.wake()
+
+        while True:
+            campaign = await database.get_campaign(campaign_id)
+            if campaign["status"] != "running":
+                break
+            await asyncio.sleep(0.2)
+        elapsed = time.perf_counter() - started
+        await scheduler.stop()
+
+    jobs = campaign["jobs"]
+    print(f"Campaign of {args.numbers} numbers finished in {elapsed:.2f}s")
+    print(f"  Completed:        {jobs['completed']}  Failed: {jobs['failed']}")
+    print(f"  Dial rate:        {jobs['completed'] / elapsed:.1f} calls/s (budget {args.cps})")
+    print(f"  Upstream requests: {stats['requests']} "
+          f"({stats['errors']} 5xx, {stats['rate_limited']} 429)")
+    print(f"  Peak concurrency: {stats['peak_in_flight']} (budget {args.max_concurrent})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Campaign scheduler benchmark")
+    parser.add_argument("--numbers", type=int, default=1000)
+    parser.add_argument("--cps", type=float, default=50)
+    parser.add_argument("--max-concurrent", type=int, default=20)
+    parser.add_argument("--max-attempts", type=int, default=5)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    port = free_port()
+    # Must be set before config is imported by the scheduler modules
+    os.environ["ULTRAVOX_API_BASE"] = f"http://127.0.0.1:{port}/api"
+    os.environ.setdefault("ULTRAVOX_AGENT_ID", "bench-agent")
+    os.environ.setdefault("CAMPAIGN_RETRY_BASE_SECONDS", "0.2")
+    # Keep the global upstream budget out of the way of the campaign's own budget
+    os.environ.setdefault("UPSTREAM_RATE_PER_SECOND", str(args.cps * 2))
+    os.environ.setdefault("UPSTREAM_BURST", str(args.cps * 2))
+    os.environ.setdefault("UPSTREAM_INITIAL_CONCURRENCY", str(args.max_concurrent))
+    os.environ.setdefault("UPSTREAM_MAX_CONCURRENCY", str(args.max_concurrent * 2))
+
+    stats = start_mock(port, args)
+    asyncio.run(run(args, stats))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark for streaming bulk exports.
+
+Seeds a scratch database with N webhook rows, streams them through the same
+encoders used by /api/export, and checks that peak memory growth stays under
+a fixed ceiling.
+
+Usage:
+    python bench_export.py --rows 1000000 --format csv --compression gzip
+"""
+
+import argparse
+import asyncio
+import json
+import resource
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import database
+from export import check_export_options, encode_export
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB (Linux reports KB)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def seed(db_path: Path, rows: int):
+    """Insert `rows` synthetic webhook rows without holding them in memory."""
+    conn = sqlite3.connect(db_path)
+    payload = json.dumps(
+        {
+            "event": "call.ended",
+            "call": {
+                "callId": "00000000-0000-0000-0000-000000000000",
+                "endReason": "hangup",
+                "shortSummary": "Customer asked about a laptop that does not boot.",
+            },
+        }
+    )
+    conn.executemany(
+        "INSERT INTO webhooks (call_id, event_type, payload) VALUES (?, ?, ?)",
+        ((f"call-{i % 5000}", "call.ended", payload) for i in range(rows)),
+    )
+    conn.commit()
+    conn.close()
+
+
+async def run(args):
+    """Seed, export and report."""
+    check_export_options(args.format, args.compression)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = Path(tmp) / "bench.db"
+        await database.init_db()
+
+        started = time.perf_counter()
+        seed(database.DB_PATH, args.rows)
+        print(f"Seeded {args.rows} rows in {time.perf_counter() - started:.1f}s")
+
+        baseline = peak_rss_mb()
+        started = time.perf_counter()
+        total_bytes = 0
+        batches = database.iter_export_rows("webhooks", batch_size=args.batch_size)
+        async for chunk in encode_export(batches, args.format, args.compression):
+            total_bytes += len(chunk)
+        elapsed = time.perf_counter() - started
+        growth = peak_rss_mb() - baseline
+
+    print(f"Exported {args.rows} rows as {args.format} ({args.compression or 'none'})")
+    print(f"  Time:        {elapsed:.2f}s ({args.rows / elapsed:,.0f} rows/s)")
+    print(f"  Output:      {total_bytes / 1024 / 1024:.1f} MB")
+    print(f"  Peak memory: +{growth:.1f} MB (ceiling {args.max_memory_mb} MB)")
+    return growth <= args.max_memory_mb
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming export benchmark")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--format", default="ndjson", choices=["ndjson", "csv", "parquet"])
+    parser.add_argument("--compression", default=None)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--max-memory-mb", type=float, default=64)
+    args = parser.parse_args()
+
+    if not asyncio.run(run(args)):
+        print("FAILED: memory ceiling exceeded")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Hot-path cost of a log call: synchronous StreamHandler vs the queued pipeline.
+
+Emits the same request-log records through both setups, writing to a file,
+and reports the time spent inside the logging call, which is what the event
+loop pays per record. --write-latency-us adds a delay to every write to the
+sink, as when stderr is a pipe to a slow log collector.
+
+Usage:
+    python bench_logging.py --records 100000 --write-latency-us 50
+"""
+
+import argparse
+import logging
+import time
+
+import log_pipeline
+
+
+class SlowStream:
+    """File wrapper whose writes block for a fixed time (a slow log consumer)."""
+
+    def __init__(self, stream, latency: float):
+        self.stream = stream
+        self.latency = latency
+
+    def write(self, text: str):
+        time.sleep(self.latency)
+        return self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+
+def emit(logger: logging.Logger, count: int) -> float:
+    """Log `count` access-style records; return mean microseconds per call."""
+    started = time.perf_counter()
+    for i in range(count):
+        logger.info(
+            "POST /api/webhook - Status: 200",
+            extra={"method": "POST", "path": "/api/webhook", "status": 200, "duration_ms": 1.5},
+        )
+    return (time.perf_counter() - started) / count * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Logging pipeline benchmark")
+    parser.add_argument("--records", type=int, default=100000)
+    parser.add_argument("--output", default="/tmp/bench_logging.log")
+    parser.add_argument("--write-latency-us", type=float, default=0)
+    args = parser.parse_args()
+
+    with open(args.output, "w") as output:
+        stream = SlowStream(output, args.write_latency_us / 1e6)
+        sync_logger = logging.getLogger("bench.sync")
+        sync_logger.propagate = False
+        handler = logging.StreamHandler(stream)
+        handler.setFormatter(log_pipeline.TextFormatter())
+        sync_logger.addHandler(handler)
+        sync_logger.setLevel(logging.INFO)
+        sync_us = emit(sync_logger, args.records)
+
+        log_pipeline.configure_logging("INFO", "json", stream)
+        queued_logger = logging.getLogger("bench.queued")
+        started = time.perf_counter()
+        queued_us = emit(queued_logger, args.records)
+        log_pipeline._writer.stop(timeout=60)
+        drained = time.perf_counter() - started
+
+    stats = log_pipeline.stats()
+    print(f"{args.records} records, {args.write_latency_us:g} us per sink write")
+    print(f"  StreamHandler (sync, text):   {sync_us:6.2f} us per call on the caller")
+    print(f"  Queued pipeline (json):       {queued_us:6.2f} us per call on the caller "
+          f"({sync_us / queued_us:.1f}x)")
+    print(f"  Writer thread: {stats['written']} records in {stats['batches']} batches, "
+          f"drained {drained:.2f}s after the first record")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Serialization benchmark for API responses.
+
+Compares FastAPI's default path (jsonable_encoder + stdlib json, as used for
+plain dict returns) with FastJSONResponse on realistic call-detail and
+call-list payloads.
+
+Usage:
+    python bench_serialization.py --webhooks 300 --tools 50 --calls 5000
+"""
+
+import argparse
+import json
+import time
+import uuid
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from responses import FastJSONResponse, orjson
+
+
+def call_row(call_id: str) -> dict:
+    """A calls row shaped like database.get_call output."""
+    response_json = {
+        "callId": call_id,
+        "created": "2026-01-19T16:05:24.691593Z",
+        "joinUrl": f"wss://voice.ultravox.ai/calls/{call_id}",
+        "medium": {"webRtc": {}},
+        "model": "ultravox-v0.7",
+        "recordingEnabled": True,
+        "systemPrompt": "You are Avani, a customer support agent for TechFix. " * 60,
+    }
+    return {
+        "id": 1,
+        "call_id": call_id,
+        "agent_id": str(uuid.uuid4()),
+        "join_url": response_json["joinUrl"],
+        "status": "ended",
+        "created_at": "2026-01-19 16:05:26",
+        "joined_at": "2026-01-19T16:05:30.000000Z",
+        "ended_at": "2026-01-19T16:09:02.209888Z",
+        "end_reason": "hangup",
+        "short_summary": "Laptop not booting",
+        "summary": "Customer reported a black screen with fans running. " * 5,
+        "metadata": None,
+        "response_json": json.dumps(response_json),
+    }
+
+
+def call_detail(webhooks: int, tools: int) -> dict:
+    """A get_call_details payload with many webhook and tool rows."""
+    call_id = str(uuid.uuid4())
+    call = call_row(call_id)
+    return {
+        "call": call,
+        "webhooks": [
+            {
+                "id": i,
+                "call_id": call_id,
+                "event_type": "call.ended",
+                "payload": json.dumps({"event": "call.ended", "call": json.loads(call["response_json"])}),
+                "received_at": "2026-01-19 16:09:02",
+            }
+            for i in range(webhooks)
+        ],
+        "tool_invocations": [
+            {
+                "id": i,
+                "call_id": call_id,
+                "tool_name": "log_call_engagement",
+                "parameters": json.dumps({
+                    "call_phase": "closing_conversation",
+                    "customer_sentiment": "satisfied",
+                    "resolution_likelihood": 80,
+                    "issue_resolved": True,
+                    "engagement_notes": "Customer satisfied with the troubleshooting steps.",
+                }),
+                "invoked_at": "2026-01-19 16:08:55",
+            }
+            for i in range(tools)
+        ],
+    }
+
+
+def default_path(content) -> bytes:
+    """What FastAPI does for a plain dict return with the stock JSONResponse."""
+    return JSONResponse(content=jsonable_encoder(content)).body
+
+
+def fast_path(content) -> bytes:
+    return FastJSONResponse(content=content).body
+
+
+def measure(fn, content, repeat: int) -> float:
+    """Best-of-3 mean milliseconds per call."""
+    best = float("inf")
+    for _ in range(3):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            fn(content)
+        best = min(best, (time.perf_counter() - started) / repeat)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Response serialization benchmark")
+    parser.add_argument("--webhooks", type=int, default=300)
+    parser.add_argument("--tools", type=int, default=50)
+    parser.add_argument("--calls", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    payloads = {
+        f"call detail ({args.webhooks} webhooks, {args.tools} tools)":
+            call_detail(args.webhooks, args.tools),
+        f"call list ({args.calls} calls)": {
+            "calls": [call_row(str(uuid.uuid4())) for _ in range(args.calls)],
+            "count": args.calls,
+        },
+    }
+
+    print(f"Encoder: {'orjson' if orjson else 'stdlib json (orjson not installed)'}")
+    for name, content in payloads.items():
+        assert json.loads(default_path(content)) == json.loads(fast_path(content))
+        size = len(fast_path(content)) / 1024
+        default_ms = measure(default_path, content, args.repeat)
+        fast_ms = measure(fast_path, content, args.repeat)
+        print(f"{name} [{size:,.0f} KB]")
+        print(f"  jsonable_encoder + json: {default_ms:8.2f} ms")
+        print(f"  FastJSONResponse:        {fast_ms:8.2f} ms  ({default_ms / fast_ms:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Fault-injection scenario for the Ultravox admission-control layer.
+
+Drives concurrent requests through an UltravoxUpstream pointed at the mock
+Ultravox server while the mock moves through healthy, slow, failing and
+recovered phases, and checks that the concurrency limit and circuit breaker
+react as expected.
+
+Usage:
+    python bench_upstream.py
+"""
+
+import asyncio
+import sys
+import time
+
+import requests
+
+from bench_campaign import free_port, start_mock
+from upstream import UltravoxUpstream, UpstreamUnavailable
+
+
+async def drive(upstream, seconds: float, workers: int):
+    """Hammer the mock with `workers` concurrent request loops for `seconds`."""
+    outcomes = {"ok": 0, "error": 0, "rejected": 0}
+    deadline = time.monotonic() + seconds
+
+    async def worker():
+        while time.monotonic() < deadline:
+            try:
+                response = await upstream.request("POST", "/agents/bench/calls", json={})
+                outcomes["ok" if response.status_code < 500 else "error"] += 1
+            except UpstreamUnavailable:
+                outcomes["rejected"] += 1
+                await asyncio.sleep(0.05)
+            except requests.exceptions.RequestException:
+                outcomes["error"] += 1
+
+    await asyncio.gather(*(worker() for _ in range(workers)))
+    return outcomes
+
+
+async def run(base_url: str, settings) -> bool:
+    upstream = UltravoxUpstream(
+        base_url=base_url,
+        headers={},
+        rate=500,
+        burst=500,
+        initial_concurrency=4,
+        min_concurrency=1,
+        max_concurrency=32,
+        target_latency=0.2,
+        timeout=2,
+        queue_timeout=0.5,
+        failure_threshold=5,
+        reset_timeout=1.0,
+    )
+    checks = []
+
+    def phase(name, outcomes):
+        snapshot = upstream.snapshot()
+        print(f"{name:<10} {outcomes}  limit={snapshot['concurrency']['limit']} "
+              f"circuit={snapshot['circuit']['state']}")
+        return snapshot
+
+    settings.latency_ms, settings.error_rate = 20, 0.0
+    healthy = phase("healthy", await drive(upstream, 3, 32))
+    checks.append(("limit grows while healthy", healthy["concurrency"]["limit"] > 4))
+
+    settings.latency_ms = 500
+    slow = phase("slow", await drive(upstream, 3, 32))
+    checks.append(("limit shrinks when slow",
+                   slow["concurrency"]["limit"] < healthy["concurrency"]["limit"]))
+
+    settings.latency_ms, settings.error_rate = 20, 1.0
+    outage = phase("outage", await drive(upstream, 2, 8))
+    checks.append(("circuit opens on outage", outage["circuit"]["times_opened"] >= 1))
+    checks.append(("fails fast while open", outage["stats"]["rejected_open_circuit"] > 0))
+
+    settings.error_rate = 0.0
+    await asyncio.sleep(1.2)
+    recovered = phase("recovered", await drive(upstream, 2, 8))
+    checks.append(("circuit closes after probe", recovered["circuit"]["state"] == "closed"))
+
+    for name, passed in checks:
+        print(f"  [{'PASS' if passed else 'FAIL'}] {name}")
+    return all(passed for _, passed in checks)
+
+
+def main():
+    class Args:
+        latency_ms = 0
+        error_rate = 0.0
+        rate_limit_rate = 0.0
+
+    import mock_ultravox
+
+    port = free_port()
+    start_mock(port, Args)
+    if not asyncio.run(run(f"http://127.0.0.1:{port}/api", mock_ultravox.settings)):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Throughput of the backend with 1..N worker processes.
+
+Starts the mock Ultravox server in its own process, then for each worker count launches
+`python main.py` (WORKERS=n, on a fresh copy of the database) and drives it
+with the load_test.py request mix at a rate above what it can sustain.
+Reports achieved throughput and p95 latency per worker count.
+
+Usage:
+    python bench_workers.py --workers 1 2 4 --rps 2000 --duration 20
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from bench_campaign import free_port
+from load_test import DEFAULT_MIX, LoadTest, percentile
+
+
+def wait_healthy(url: str, process, what: str):
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    stop_process(process)
+    raise RuntimeError(f"{what} did not start")
+
+
+def start_process(args: list, env: dict = None):
+    """Run a script from this directory in its own process group."""
+    return subprocess.Popen(
+        [sys.executable] + args,
+        cwd=Path(__file__).parent,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+
+def stop_process(process):
+    os.killpg(process.pid, signal.SIGTERM)
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+
+
+def start_backend(workers: int, db_path: Path, mock_port: int):
+    """Launch main.py with `workers` workers; return (process, base_url)."""
+    port = free_port()
+    env = dict(
+        os.environ,
+        WORKERS=str(workers),
+        PORT=str(port),
+        DB_WRITER_PORT=str(free_port()),
+        DATABASE_PATH=str(db_path),
+        ULTRAVOX_API_BASE=f"http://127.0.0.1:{mock_port}/api",
+        ULTRAVOX_API_KEY=os.getenv("ULTRAVOX_API_KEY", "bench"),
+        ULTRAVOX_AGENT_ID=os.getenv("ULTRAVOX_AGENT_ID", "bench-agent"),
+        UPSTREAM_RATE_PER_SECOND="100000",
+        UPSTREAM_BURST="100000",
+    )
+    process = start_process(["main.py"], env)
+    base_url = f"http://127.0.0.1:{port}"
+    wait_healthy(f"{base_url}/health", process, f"Backend with {workers} workers")
+    return process, base_url
+
+
+async def drive(base_url: str, args) -> dict:
+    test = LoadTest(base_url, DEFAULT_MIX, args.max_outstanding)
+    try:
+        await test.seed(args.seed_calls)
+        test.latencies.clear()
+        test.errors.clear()
+        wall_time = await test.run(args.rps, args.duration)
+    finally:
+        await test.client.aclose()
+    latencies = sorted(v for values in test.latencies.values() for v in values)
+    return {
+        "requests": len(latencies),
+        "errors": sum(test.errors.values()),
+        "throughput_rps": len(latencies) / wall_time,
+        "p95_ms": percentile(latencies, 0.95),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-worker throughput benchmark")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--rps", type=float, default=2000)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--max-outstanding", type=int, default=256)
+    parser.add_argument("--seed-calls", type=int, default=50)
+    parser.add_argument("--db", default=str(Path(__file__).parent / "ultravox.db"),
+                        help="Database to copy for each run")
+    args = parser.parse_args()
+
+    mock_port = free_port()
+    mock = start_process(["mock_ultravox.py", "--port", str(mock_port)])
+    wait_healthy(f"http://127.0.0.1:{mock_port}/_stats", mock, "Mock Ultravox server")
+    print(f"{os.cpu_count()} CPUs; offered load {args.rps:.0f} rps for {args.duration:.0f}s\n")
+    print(f"{'workers':>7} {'requests':>9} {'errors':>7} {'rps':>9} {'p95 ms':>9} {'scaling':>8}")
+
+    baseline = None
+    try:
+        for workers in args.workers:
+            with tempfile.TemporaryDirectory() as tmp:
+                db_path = Path(tmp) / "bench.db"
+                if Path(args.db).exists():
+                    shutil.copy(args.db, db_path)
+                process, base_url = start_backend(workers, db_path, mock_port)
+                try:
+                    result = asyncio.run(drive(base_url, args))
+                finally:
+                    stop_process(process)
+            baseline = baseline or result["throughput_rps"]
+            print(f"{workers:>7} {result['requests']:>9} {result['errors']:>7} "
+                  f"{result['throughput_rps']:>9.1f} {result['p95_ms']:>9.1f} "
+                  f"{result['throughput_rps'] / baseline:>7.2f}x")
+    finally:
+        stop_process(mock)
+
+
+if __name__ == "__main__":
+    main()
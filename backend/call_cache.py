@@ -0,0 +1,80 @@
+"""In-memory, size-bounded caches: hot call state by call_id, and recently seen keys."""
+
+from collections import OrderedDict
+
+# Columns kept in the cache; enough to answer existence and status checks
+HOT_FIELDS = ("call_id", "agent_id", "status", "joined_at", "ended_at")
+
+
+class CallStateCache:
+    """LRU cache of call status and hot fields."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, call_id: str):
+        """Return a copy of the cached state, or None on a miss."""
+        state = self._entries.get(call_id)
+        if state is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(call_id)
+        self.hits += 1
+        return dict(state)
+
+    def put(self, call_id: str, state: dict):
+        """Cache the hot fields of a call row, evicting the least recently used."""
+        self._entries[call_id] = {field: state.get(field) for field in HOT_FIELDS}
+        self._entries.move_to_end(call_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def update(self, call_id: str, **fields):
+        """Apply field changes to a cached call (no-op if it isn't cached)."""
+        state = self._entries.get(call_id)
+        if state is not None:
+            state.update((k, v) for k, v in fields.items() if k in HOT_FIELDS)
+
+    def invalidate(self, call_id: str):
+        self._entries.pop(call_id, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+        }
+
+
+class RecentKeys:
+    """Bounded LRU set of recently seen keys."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._keys = OrderedDict()
+        self.hits = 0
+
+    def __contains__(self, key) -> bool:
+        if key in self._keys:
+            self._keys.move_to_end(key)
+            self.hits += 1
+            return True
+        return False
+
+    def add(self, key):
+        self._keys[key] = None
+        self._keys.move_to_end(key)
+        if len(self._keys) > self.max_size:
+            self._keys.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {"size": len(self._keys), "max_size": self.max_size, "hits": self.hits}
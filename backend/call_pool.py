@@ -0,0 +1,143 @@
+"""
+Warm pool of pre-created Ultravox calls.
+
+Creating a call is a full Ultravox round trip. With CALL_POOL_SIZE > 0 each
+worker keeps that many WebRTC calls created ahead of time, so POST /api/calls
+can hand one out at once while a background task creates its replacement.
+
+Ultravox fixes a call's settings when it is created, so pooled calls use the
+default call settings and only requests asking for those are served from the
+pool; the request's metadata is bound in our calls row (the Ultravox copy
+carries POOL_METADATA_KEY instead). Requests with other settings, and any
+request arriving while the pool is empty, create their call on demand.
+
+Pooled calls are created with a long join window and dropped once older than
+max_age, so a handed-out call still leaves the client time to join. Dropped
+and never-used calls end unjoined at Ultravox; since they have no row in
+calls, their callbacks and sync listings are ignored.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+
+from database import POOL_METADATA_KEY
+from ultravox_api import create_agent_call, webrtc_call_payload
+
+logger = logging.getLogger(__name__)
+
+# Pooled calls created at once while refilling
+REFILL_CONCURRENCY = 4
+# Longest wait after failed refills
+MAX_RETRY_DELAY_SECONDS = 60
+
+
+class CallPool:
+    """Pre-created WebRTC calls for one set of call settings."""
+
+    def __init__(self, size: int, max_age: float, join_timeout: float,
+                 recording_enabled: bool, first_speaker_prompt: str):
+        self.size = size
+        self.max_age = max_age
+        self.recording_enabled = recording_enabled
+        self.first_speaker_prompt = first_speaker_prompt
+        self.payload = webrtc_call_payload(
+            {POOL_METADATA_KEY: "true"}, recording_enabled, first_speaker_prompt, join_timeout
+        )
+        # (created, Ultravox call object), oldest first
+        self._calls = deque()
+        self._wake = None
+        self._task = None
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "bypassed": 0,
+            "created": 0,
+            "expired": 0,
+            "errors": 0,
+        }
+
+    async def start(self):
+        if self.size > 0:
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._refill())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    def take(self, recording_enabled: bool, first_speaker_prompt: str):
+        """
+        Hand out a pooled call (its Ultravox call object) for a request with
+        these settings, or None if it must be created on demand.
+        """
+        if self.size <= 0:
+            return None
+        if (recording_enabled, first_speaker_prompt) != (
+            self.recording_enabled, self.first_speaker_prompt
+        ):
+            self.stats["bypassed"] += 1
+            return None
+        self._drop_expired()
+        if not self._calls:
+            self.stats["misses"] += 1
+            self._wake.set()
+            return None
+        # Oldest first, so calls are used well inside their join window
+        _, call = self._calls.popleft()
+        self.stats["hits"] += 1
+        self._wake.set()
+        return call
+
+    def _drop_expired(self):
+        cutoff = time.monotonic() - self.max_age
+        while self._calls and self._calls[0][0] < cutoff:
+            self._calls.popleft()
+            self.stats["expired"] += 1
+
+    async def _create(self):
+        response = await create_agent_call(self.payload)
+        if response.status_code != 201:
+            raise RuntimeError(f"Ultravox returned {response.status_code}: {response.text[:200]}")
+        self._calls.append((time.monotonic(), response.json()))
+        self.stats["created"] += 1
+
+    async def _refill(self):
+        """Keep the pool full, waking on take() or when the oldest call expires."""
+        failures = 0
+        while True:
+            self._drop_expired()
+            missing = min(self.size - len(self._calls), REFILL_CONCURRENCY)
+            if missing > 0:
+                results = await asyncio.gather(
+                    *(self._create() for _ in range(missing)), return_exceptions=True
+                )
+                errors = [result for result in results if isinstance(result, Exception)]
+                if not errors:
+                    failures = 0
+                    continue
+                failures += 1
+                self.stats["errors"] += len(errors)
+                logger.error(f"Call pool refill error: {errors[0]}")
+                await asyncio.sleep(min(2 ** failures, MAX_RETRY_DELAY_SECONDS))
+                continue
+
+            timeout = None
+            if self._calls:
+                timeout = max(self._calls[0][0] + self.max_age - time.monotonic(), 0)
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def snapshot(self) -> dict:
+        served = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "size": self.size,
+            "depth": len(self._calls),
+            "hit_rate": round(self.stats["hits"] / served, 4) if served else None,
+        }
@@ -0,0 +1,145 @@
+"""
+Reconciliation sync of call state from Ultravox.
+
+Calls whose webhooks were lost would otherwise stay `created`/`started`
+forever. Each sync cycle:
+
+- pages through Ultravox's call listing (oldest first) from a persisted
+  high-water mark on `created`, upserting each page into calls in one
+  transaction together with the advanced cursor (calls of other agents on
+  the account only update rows we already have; they are never inserted), and
+- re-checks a rotating batch of local calls that are still not ended and
+  older than SYNC_RECHECK_AGE_SECONDS (calls the listing has moved past).
+
+Every Ultravox request first takes a token from the sync's own budget, on
+top of the shared admission control in upstream.py.
+"""
+
+import asyncio
+import logging
+import time
+
+from call_cache import RecentKeys
+from database import get_sync_cursor, get_unfinished_calls, sync_calls
+from ultravox_api import next_cursor, ultravox_request
+from upstream import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+LISTING_CURSOR = "ultravox_calls_created"
+# Most call ids remembered as unknown to Ultravox
+NOT_FOUND_MAX = 10000
+
+
+class CallSync:
+    """Periodic reconciliation of local call state with Ultravox."""
+
+    def __init__(self, interval: float, requests_per_minute: float, page_size: int,
+                 recheck_batch: int, recheck_age: float, agent_id: str):
+        self.interval = interval
+        self.agent_id = agent_id
+        self.page_size = page_size
+        self.recheck_batch = recheck_batch
+        self.recheck_age = recheck_age
+        self.bucket = TokenBucket(requests_per_minute / 60)
+        self._recheck_after = ""
+        # Calls Ultravox does not know (e.g. made with another account); not re-checked
+        self._not_found = RecentKeys(NOT_FOUND_MAX)
+        self._task = None
+        self.stats = {
+            "runs": 0,
+            "requests": 0,
+            "listed": 0,
+            "rechecked": 0,
+            "not_found": 0,
+            "changed": 0,
+            "errors": 0,
+            "last_run_seconds": None,
+        }
+
+    async def start(self):
+        if self.interval > 0:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"Call sync error: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def run_once(self):
+        """One sync cycle: catch up on the listing, then re-check stale calls."""
+        started = time.monotonic()
+        await self._sync_listing()
+        await self._recheck()
+        self.stats["runs"] += 1
+        self.stats["last_run_seconds"] = round(time.monotonic() - started, 3)
+
+    async def _get(self, path: str, **kwargs):
+        await self.bucket.acquire()
+        self.stats["requests"] += 1
+        return await ultravox_request("GET", path, **kwargs)
+
+    async def _sync_listing(self):
+        """Page through calls created since the high-water mark."""
+        params = {"pageSize": self.page_size, "sort": "created"}
+        high_water_mark = await get_sync_cursor(LISTING_CURSOR)
+        if high_water_mark:
+            params["fromDate"] = high_water_mark
+
+        while True:
+            response = await self._get("/calls", params=params)
+            response.raise_for_status()
+            page = response.json()
+            calls = [call for call in page.get("results", []) if call.get("callId")]
+            if calls:
+                high_water_mark = max(
+                    [call["created"] for call in calls if call.get("created")]
+                    + [high_water_mark or ""]
+                )
+                changed = await sync_calls(
+                    calls, LISTING_CURSOR, high_water_mark, agent_id=self.agent_id
+                )
+                self.stats["listed"] += len(calls)
+                self.stats["changed"] += len(changed)
+            cursor = next_cursor(page)
+            if not cursor:
+                return
+            params["cursor"] = cursor
+
+    async def _recheck(self):
+        """Fetch a batch of local calls that are still not ended."""
+        call_ids = await get_unfinished_calls(
+            self._recheck_after, self.recheck_batch, self.recheck_age
+        )
+        # Start over from the beginning once the end of the table is reached
+        self._recheck_after = call_ids[-1] if len(call_ids) == self.recheck_batch else ""
+
+        calls = []
+        try:
+            for call_id in call_ids:
+                if call_id in self._not_found:
+                    continue
+                response = await self._get(f"/calls/{call_id}")
+                if response.status_code == 404:
+                    self._not_found.add(call_id)
+                    self.stats["not_found"] += 1
+                    continue
+                response.raise_for_status()
+                calls.append(response.json())
+        finally:
+            # Keep what was fetched before an error
+            changed = await sync_calls(calls)
+            self.stats["rechecked"] += len(calls)
+            self.stats["changed"] += len(changed)
+
+    def snapshot(self) -> dict:
+        return {**self.stats, "recheck_after": self._recheck_after}
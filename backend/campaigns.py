@@ -0,0 +1,218 @@
+"""
+Outbound SIP campaign scheduler.
+
+Campaign jobs live in SQLite (see database.py). One runner task per running
+campaign claims due jobs and dials them, keeping within the campaign's
+calls-per-second and max-concurrent-calls budget. Ultravox 429/5xx responses
+and network errors are retried with exponential backoff. Requests also pass
+through the shared Ultravox admission control in upstream.py.
+"""
+
+import asyncio
+import json
+import logging
+import random
+import time
+
+import requests
+
+from config import ULTRAVOX_AGENT_ID, CAMPAIGN_RETRY_BASE_SECONDS
+from database import (
+    create_call,
+    get_campaign,
+    get_running_campaign_ids,
+    set_campaign_status,
+    claim_campaign_jobs,
+    record_campaign_call,
+    finish_campaign_job,
+    campaign_has_open_jobs,
+    requeue_dialing_jobs,
+)
+from ultravox_api import create_agent_call, sip_outbound_payload
+from upstream import TokenBucket, UpstreamUnavailable
+
+logger = logging.getLogger(__name__)
+
+# Longest single backoff between dial attempts
+MAX_RETRY_DELAY_SECONDS = 300
+
+
+def retry_delay(attempt: int, retry_after: str = None) -> float:
+    """Backoff before the next attempt, honouring a Retry-After header."""
+    if retry_after:
+        try:
+            return min(float(retry_after), MAX_RETRY_DELAY_SECONDS)
+        except ValueError:
+            pass
+    delay = CAMPAIGN_RETRY_BASE_SECONDS * (2 ** (attempt - 1))
+    return min(delay, MAX_RETRY_DELAY_SECONDS) * random.uniform(0.5, 1.0)
+
+
+class CampaignScheduler:
+    """Runs one dialing loop per running campaign."""
+
+    def __init__(self, poll_interval: float = 1.0, on_change=None):
+        self.poll_interval = poll_interval
+        self.on_change = on_change
+        self._runners = {}
+        self._wake = None
+        self._task = None
+
+    async def start(self):
+        """Requeue jobs interrupted by a restart and start the supervisor loop."""
+        await requeue_dialing_jobs()
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._supervise())
+
+    async def stop(self):
+        """Stop all campaign runners (their in-flight jobs are requeued on next start)."""
+        if self._task:
+            self._task.cancel()
+        for runner in list(self._runners.values()):
+            runner.cancel()
+        await asyncio.gather(self._task, *self._runners.values(), return_exceptions=True)
+        self._runners.clear()
+
+    def wake(self):
+        """Pick up newly created or resumed campaigns immediately."""
+        if self._wake:
+            self._wake.set()
+
+    def is_active(self, campaign_id: int) -> bool:
+        """Whether a runner is currently dialing this campaign."""
+        return campaign_id in self._runners
+
+    def active_ids(self) -> list:
+        """Ids of campaigns with a running dialing loop."""
+        return sorted(self._runners)
+
+    def _runner_finished(self, campaign_id: int):
+        self._runners.pop(campaign_id, None)
+        if self.on_change:
+            self.on_change()
+
+    async def _supervise(self):
+        """Start runners for running campaigns that don't have one."""
+        while True:
+            try:
+                for campaign_id in await get_running_campaign_ids():
+                    if campaign_id not in self._runners:
+                        runner = asyncio.create_task(self._run_campaign(campaign_id))
+                        runner.add_done_callback(
+                            lambda _, cid=campaign_id: self._runner_finished(cid)
+                        )
+                        self._runners[campaign_id] = runner
+                        if self.on_change:
+                            self.on_change()
+            except Exception as e:
+                logger.error(f"Campaign supervisor error: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def _run_campaign(self, campaign_id: int):
+        """Dial a campaign's jobs until none are left or it stops running."""
+        campaign = await get_campaign(campaign_id)
+        max_concurrent = campaign["max_concurrent"]
+        bucket = TokenBucket(campaign["calls_per_second"])
+        in_flight = set()
+        logger.info(f"Campaign {campaign_id} dialing")
+
+        try:
+            while True:
+                in_flight = {task for task in in_flight if not task.done()}
+                campaign = await get_campaign(campaign_id)
+                if campaign["status"] != "running":
+                    break
+
+                free = max_concurrent - len(in_flight)
+                jobs = []
+                if free > 0:
+                    jobs = await claim_campaign_jobs(campaign_id, free, time.time())
+
+                if not jobs:
+                    if not in_flight:
+                        if not await campaign_has_open_jobs(campaign_id):
+                            await set_campaign_status(campaign_id, "completed")
+                            logger.info(f"Campaign {campaign_id} completed")
+                            break
+                        await asyncio.sleep(self.poll_interval)
+                    else:
+                        await asyncio.wait(
+                            in_flight,
+                            timeout=self.poll_interval,
+                            return_when=asyncio.FIRST_COMPLETED,
+                        )
+                    continue
+
+                for job in jobs:
+                    await bucket.acquire()
+                    in_flight.add(
+                        asyncio.create_task(self._dial(campaign, job))
+                    )
+        finally:
+            # Let dials already sent to Ultravox record their outcome
+            if in_flight:
+                await asyncio.gather(*in_flight, return_exceptions=True)
+
+    async def _dial(self, campaign: dict, job: dict):
+        """Place one outbound call and record the result on the job."""
+        try:
+            await self._place_call(campaign, job)
+        except Exception as e:
+            # Runner tasks are gathered without looking at their results, so
+            # log here and close the job rather than leave it 'dialing'
+            logger.error(f"Campaign {campaign['id']} job {job['id']} error: {e}")
+            try:
+                await finish_campaign_job(job["id"], "failed", error=f"Internal error: {e}")
+            except Exception as e:
+                logger.error(f"Campaign {campaign['id']} job {job['id']} not recorded: {e}")
+
+    async def _place_call(self, campaign: dict, job: dict):
+        payload = sip_outbound_payload(
+            job["to_number"], json.loads(job["template_context"] or "{}")
+        )
+        error = None
+        retry_after = None
+
+        try:
+            response = await create_agent_call(payload)
+            if response.status_code == 201:
+                response_data = response.json()
+                call_id = response_data.get("callId")
+                # Recorded before anything else, so a restart from here on
+                # completes the job instead of dialing the number again
+                await record_campaign_call(job["id"], call_id)
+                try:
+                    await create_call(
+                        call_id=call_id,
+                        agent_id=ULTRAVOX_AGENT_ID,
+                        join_url="",
+                        response_json=response_data,
+                    )
+                except Exception as e:
+                    logger.error(f"Campaign {campaign['id']} call {call_id} not stored: {e}")
+                await finish_campaign_job(job["id"], "completed", call_id=call_id)
+                return
+
+            error = f"Ultravox API error {response.status_code}: {response.text[:200]}"
+            retryable = response.status_code == 429 or response.status_code >= 500
+            retry_after = response.headers.get("Retry-After")
+        except UpstreamUnavailable as e:
+            error = f"Ultravox unavailable: {e.reason}"
+            retryable = True
+            retry_after = str(e.retry_after)
+        except requests.exceptions.RequestException as e:
+            error = f"Request failed: {e}"
+            retryable = True
+
+        if retryable and job["attempts"] < campaign["max_attempts"]:
+            delay = retry_delay(job["attempts"], retry_after)
+            await finish_campaign_job(
+                job["id"], "pending", error=error, next_attempt_at=time.time() + delay
+            )
+        else:
+            logger.warning(f"Campaign {campaign['id']} job {job['id']} failed: {error}")
+            await finish_campaign_job(job["id"], "failed", error=error)
@@ -0,0 +1,124 @@
+"""
+Long-poll support for text chat replies.
+
+Clients wait for the agent's reply to their latest message instead of
+re-fetching the message history themselves. All requests waiting on the same
+chat share one upstream polling loop, which runs only while someone is
+waiting: it polls quickly right after a message is sent and backs off while
+nothing changes.
+"""
+
+import asyncio
+
+AGENT_ROLE = "MESSAGE_ROLE_AGENT"
+USER_ROLE = "MESSAGE_ROLE_USER"
+
+
+def has_reply(messages: list, text: str = None) -> bool:
+    """
+    Whether an agent message follows the last user message in `messages`
+    (the last one reading `text`, if given). Agent messages with no such
+    user message before them, like the greeting, are not a reply.
+    """
+    anchor = next(
+        (
+            i for i in range(len(messages) - 1, -1, -1)
+            if messages[i].get("role") == USER_ROLE
+            and (text is None or (messages[i].get("text") or "").strip() == text.strip())
+        ),
+        None,
+    )
+    return anchor is not None and any(
+        message.get("role") == AGENT_ROLE for message in messages[anchor + 1:]
+    )
+
+
+class _Chat:
+    """Shared state for one chat's polling loop and its waiters."""
+
+    def __init__(self):
+        self.messages = []
+        self.error = None
+        self.waiters = 0
+        self.changed = asyncio.Condition()
+        self.wake = asyncio.Event()
+        self.task = None
+
+
+class ChatReplyWatcher:
+    """One upstream polling loop per chat, shared by every waiting request."""
+
+    def __init__(self, fetch, min_interval: float = 0.25, max_interval: float = 2.0):
+        self.fetch = fetch
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self._chats = {}
+        self.stats = {"waits": 0, "replies": 0, "timeouts": 0, "upstream_fetches": 0}
+
+    async def wait(self, chat_id: str, after: int, timeout: float, text: str = None):
+        """
+        Wait up to `timeout` seconds for a reply to the user message `text`
+        (or to the latest user message) among the messages after index
+        `after`. Returns (messages after `after`, timed_out); re-raises the
+        error if polling Ultravox fails.
+        """
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            chat = self._chats[chat_id] = _Chat()
+            chat.task = asyncio.create_task(self._poll(chat_id, chat))
+        chat.waiters += 1
+        self.stats["waits"] += 1
+        try:
+            async with chat.changed:
+                await asyncio.wait_for(
+                    chat.changed.wait_for(
+                        lambda: chat.error is not None or has_reply(chat.messages[after:], text)
+                    ),
+                    timeout,
+                )
+            if chat.error is not None:
+                raise chat.error
+            self.stats["replies"] += 1
+            return chat.messages[after:], False
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            return chat.messages[after:], True
+        finally:
+            chat.waiters -= 1
+
+    def nudge(self, chat_id: str):
+        """Poll a chat right away (e.g. a message was just sent to it)."""
+        chat = self._chats.get(chat_id)
+        if chat is not None:
+            chat.wake.set()
+
+    async def _poll(self, chat_id: str, chat: _Chat):
+        """Fetch the chat's messages until nobody is waiting on it."""
+        interval = self.min_interval
+        try:
+            while chat.waiters > 0:
+                chat.wake.clear()
+                messages = await self.fetch(chat_id)
+                self.stats["upstream_fetches"] += 1
+                # Back off while nothing changes; poll fast again once it does
+                if len(messages) == len(chat.messages):
+                    interval = min(self.max_interval, interval * 2)
+                else:
+                    interval = self.min_interval
+                async with chat.changed:
+                    chat.messages = messages
+                    chat.changed.notify_all()
+                try:
+                    await asyncio.wait_for(chat.wake.wait(), interval)
+                except asyncio.TimeoutError:
+                    pass
+        except Exception as e:
+            async with chat.changed:
+                chat.error = e
+                chat.changed.notify_all()
+        finally:
+            if self._chats.get(chat_id) is chat:
+                del self._chats[chat_id]
+
+    def snapshot(self) -> dict:
+        return {**self.stats, "active_chats": len(self._chats)}
@@ -15,6 +15,38 @@ ULTRAVOX_API_BASE = os.getenv("ULTRAVOX_API_BASE", "https://api.ultravox.ai/api"
 HOST = os.getenv("HOST", "0.0.0.0")
 PORT = int(os.getenv("PORT", "8000"))
 
+# Multi-worker mode: with more than one worker, all SQLite writes go through a
+# dedicated DB writer process listening on DB_WRITER_HOST:DB_WRITER_PORT
+WORKERS = int(os.getenv("WORKERS", "1"))
+DB_WRITER_HOST = os.getenv("DB_WRITER_HOST", "127.0.0.1")
+DB_WRITER_PORT = int(os.getenv("DB_WRITER_PORT", "8765"))
+
+# SQLite database file (defaults to backend/ultravox.db)
+DATABASE_PATH = os.getenv("DATABASE_PATH", "")
+
+# Call data (calls, webhooks, tool invocations, transcripts and their analytics
+# rollups) is split over this many SQLite files by a hash of the call id.
+# Shard 0 is DATABASE_PATH itself and also holds campaigns, jobs and cursors;
+# change it with `python manage.py reshard`.
+DB_SHARDS = int(os.getenv("DB_SHARDS", "1"))
+
+# Search ranks at most this many matches per shard (the newest ones), so
+# common terms cost the same as rare ones on large tables
+SEARCH_MAX_CANDIDATES = int(os.getenv("SEARCH_MAX_CANDIDATES", "5000"))
+
+# Read-only snapshot of the database that analytics and export reads use
+# (defaults to ultravox.replica.db next to it). It is refreshed every
+# REPLICA_INTERVAL_SECONDS (0 = disabled, those reads use the database itself);
+# a snapshot older than REPLICA_MAX_STALENESS_SECONDS is not used.
+REPLICA_DATABASE_PATH = os.getenv("REPLICA_DATABASE_PATH", "")
+REPLICA_INTERVAL_SECONDS = float(os.getenv("REPLICA_INTERVAL_SECONDS", "30"))
+REPLICA_MAX_STALENESS_SECONDS = float(os.getenv("REPLICA_MAX_STALENESS_SECONDS", "120"))
+REPLICA_PAGES_PER_STEP = int(os.getenv("REPLICA_PAGES_PER_STEP", "256"))
+REPLICA_STEP_PAUSE_SECONDS = float(os.getenv("REPLICA_STEP_PAUSE_SECONDS", "0.002"))
+
+# Development mode (reloads frontend assets from disk when they change)
+DEV_MODE = os.getenv("DEV_MODE", "false").lower() == "true"
+
 # Webhook Configuration
 WEBHOOK_BASE_URL = os.getenv("WEBHOOK_BASE_URL", "http://localhost:8000")
 
@@ -24,6 +56,72 @@ SIP_USERNAME = os.getenv("SIP_USERNAME", "")
 SIP_PASSWORD = os.getenv("SIP_PASSWORD", "")
 SIP_FROM_NUMBER = os.getenv("SIP_FROM_NUMBER", "")
 
+# Logging: level, "json" or "text" output, and the fraction of successful
+# requests whose INFO logs are kept ("path-prefix=rate,..." plus a default)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1.0"))
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "/api/webhook=0.1,/api/tools/=0.1,/static/=0.01")
+
+# Request tracing (see tracing.py): requests slower than TRACE_SLOW_MS are kept,
+# the latest TRACE_BUFFER_SIZE of them per worker, for /api/debug/traces
+# (0 = tracing off). Spans past TRACE_MAX_SPANS in one request are counted only.
+TRACE_SLOW_MS = float(os.getenv("TRACE_SLOW_MS", "500"))
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "200"))
+TRACE_MAX_SPANS = int(os.getenv("TRACE_MAX_SPANS", "500"))
+
+# Per-call resource accounting (see accounting.py): how often each worker adds
+# the usage it attributed to calls to the call_costs table
+COST_FLUSH_INTERVAL_SECONDS = float(os.getenv("COST_FLUSH_INTERVAL_SECONDS", "5"))
+
+# Number of calls kept in the in-memory call state cache
+CALL_CACHE_SIZE = int(os.getenv("CALL_CACHE_SIZE", "10000"))
+
+# Number of recent webhook idempotency keys kept in memory
+WEBHOOK_DEDUP_SIZE = int(os.getenv("WEBHOOK_DEDUP_SIZE", "50000"))
+
+# Upstream admission control for Ultravox API requests
+UPSTREAM_RATE_PER_SECOND = float(os.getenv("UPSTREAM_RATE_PER_SECOND", "20"))
+UPSTREAM_BURST = float(os.getenv("UPSTREAM_BURST", "40"))
+UPSTREAM_INITIAL_CONCURRENCY = int(os.getenv("UPSTREAM_INITIAL_CONCURRENCY", "8"))
+UPSTREAM_MIN_CONCURRENCY = int(os.getenv("UPSTREAM_MIN_CONCURRENCY", "1"))
+UPSTREAM_MAX_CONCURRENCY = int(os.getenv("UPSTREAM_MAX_CONCURRENCY", "64"))
+UPSTREAM_TARGET_LATENCY_MS = float(os.getenv("UPSTREAM_TARGET_LATENCY_MS", "2000"))
+UPSTREAM_TIMEOUT_SECONDS = float(os.getenv("UPSTREAM_TIMEOUT_SECONDS", "15"))
+UPSTREAM_QUEUE_TIMEOUT_SECONDS = float(os.getenv("UPSTREAM_QUEUE_TIMEOUT_SECONDS", "5"))
+UPSTREAM_FAILURE_THRESHOLD = int(os.getenv("UPSTREAM_FAILURE_THRESHOLD", "5"))
+UPSTREAM_RESET_TIMEOUT_SECONDS = float(os.getenv("UPSTREAM_RESET_TIMEOUT_SECONDS", "30"))
+
+# Outbound campaign defaults (per campaign overrides are allowed)
+CAMPAIGN_CALLS_PER_SECOND = float(os.getenv("CAMPAIGN_CALLS_PER_SECOND", "1"))
+CAMPAIGN_MAX_CONCURRENT = int(os.getenv("CAMPAIGN_MAX_CONCURRENT", "5"))
+CAMPAIGN_MAX_ATTEMPTS = int(os.getenv("CAMPAIGN_MAX_ATTEMPTS", "5"))
+CAMPAIGN_RETRY_BASE_SECONDS = float(os.getenv("CAMPAIGN_RETRY_BASE_SECONDS", "2"))
+
+# Reconciliation sync of call state from the Ultravox call listing (0 = disabled)
+SYNC_INTERVAL_SECONDS = float(os.getenv("SYNC_INTERVAL_SECONDS", "0"))
+SYNC_REQUESTS_PER_MINUTE = float(os.getenv("SYNC_REQUESTS_PER_MINUTE", "60"))
+SYNC_PAGE_SIZE = int(os.getenv("SYNC_PAGE_SIZE", "100"))
+SYNC_RECHECK_BATCH = int(os.getenv("SYNC_RECHECK_BATCH", "20"))
+SYNC_RECHECK_AGE_SECONDS = float(os.getenv("SYNC_RECHECK_AGE_SECONDS", "900"))
+
+# Durable background job queue for post-call processing (per worker process)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_VISIBILITY_TIMEOUT_SECONDS = float(os.getenv("JOB_VISIBILITY_TIMEOUT_SECONDS", "300"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", "2"))
+JOB_POLL_INTERVAL_SECONDS = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "1"))
+JOB_DRAIN_TIMEOUT_SECONDS = float(os.getenv("JOB_DRAIN_TIMEOUT_SECONDS", "10"))
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", "86400"))
+
+# Warm pool of pre-created WebRTC calls handed out by POST /api/calls
+# (per worker process; 0 = disabled). Pooled calls are created with a
+# CALL_POOL_JOIN_TIMEOUT_SECONDS join window and dropped after
+# CALL_POOL_MAX_AGE_SECONDS, leaving the rest of the window for the client.
+CALL_POOL_SIZE = int(os.getenv("CALL_POOL_SIZE", "0"))
+CALL_POOL_JOIN_TIMEOUT_SECONDS = float(os.getenv("CALL_POOL_JOIN_TIMEOUT_SECONDS", "600"))
+CALL_POOL_MAX_AGE_SECONDS = float(os.getenv("CALL_POOL_MAX_AGE_SECONDS", "480"))
+
 
 def get_webhook_url() -> str:
     """Get the webhook URL for Ultravox callbacks."""
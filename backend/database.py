@@ -1,132 +1,821 @@
 import aiosqlite
+import asyncio
+import functools
+import heapq
 import json
+import os
+import time
+import zlib
 from datetime import datetime
 from pathlib import Path
 
-DB_PATH = Path(__file__).parent / "ultravox.db"
+import accounting
+from call_cache import CallStateCache, RecentKeys, HOT_FIELDS
+from tracing import instrument
+from config import (
+    CALL_CACHE_SIZE,
+    DATABASE_PATH,
+    DB_SHARDS,
+    REPLICA_DATABASE_PATH,
+    REPLICA_INTERVAL_SECONDS,
+    REPLICA_MAX_STALENESS_SECONDS,
+    SEARCH_MAX_CANDIDATES,
+    WEBHOOK_DEDUP_SIZE,
+)
+
+DB_PATH = Path(DATABASE_PATH) if DATABASE_PATH else Path(__file__).parent / "ultravox.db"
+REPLICA_PATH = Path(REPLICA_DATABASE_PATH) if REPLICA_DATABASE_PATH else None
+
+# Number of call data shards (see shard_for)
+SHARD_COUNT = max(1, DB_SHARDS)
+
+# Hot call state, populated on create and kept coherent on status updates
+call_cache = CallStateCache(CALL_CACHE_SIZE)
+
+# Recently ingested webhook idempotency keys, checked before touching the DB
+webhook_keys = RecentKeys(WEBHOOK_DEDUP_SIZE)
+
+# Counters exposed through the metrics endpoint
+DB_STATS = {"connections": 0, "replica_connections": 0}
+
+# Rollup granularities maintained for analytics ("all" holds running totals)
+ROLLUP_GRANULARITIES = ("hour", "day", "all")
+
+# Tool parameters that are rolled up as analytics dimensions. Rollups count
+# calls: a call's first invocation of each tool (bucketed by its time), and
+# each call's current status (bucketed by the call's created_at)
+ROLLUP_DIMENSIONS = {
+    "escalate_to_human": ("priority_level", "customer_sentiment"),
+    "log_call_engagement": ("call_phase", "customer_sentiment"),
+}
+
+# Exportable tables and the timestamp column used for time-range filters
+EXPORT_TABLES = {
+    "calls": "created_at",
+    "webhooks": "received_at",
+    "tool_invocations": "invoked_at",
+}
+
+# Webhook events and the call status they move a call into
+WEBHOOK_STATUSES = {
+    "call.started": "started",
+    "call.joined": "joined",
+    "call.ended": "ended",
+}
+
+# Call field holding the time of each webhook event (part of its idempotency key)
+WEBHOOK_TIMESTAMP_FIELDS = {
+    "call.started": "created",
+    "call.joined": "joined",
+    "call.ended": "ended",
+}
+
+# Lifecycle order of call statuses; a call never moves back to an earlier one
+CALL_STATUS_ORDER = {"created": 0, "started": 1, "joined": 2, "ended": 3}
+
+# Call columns a status update may also set
+CALL_UPDATE_FIELDS = ("joined_at", "ended_at", "end_reason", "short_summary", "summary")
+
+# Ultravox call fields copied into calls by the reconciliation sync
+ULTRAVOX_CALL_FIELDS = {
+    "joined": "joined_at",
+    "ended": "ended_at",
+    "endReason": "end_reason",
+    "shortSummary": "short_summary",
+    "summary": "summary",
+}
+
+# Ultravox metadata key marking calls pre-created by the warm call pool
+# (call_pool.py); until one is handed out, it has no row in calls
+POOL_METADATA_KEY = "warmPool"
+
+# Columns of each call detail section; JSON-valued ones are embedded as JSON
+CALL_DETAIL_COLUMNS = {
+    "calls": ("id", "call_id", "agent_id", "join_url", "status", "created_at", "joined_at",
+              "ended_at", "end_reason", "short_summary", "summary", "metadata", "response_json"),
+    "webhooks": ("id", "call_id", "event_type", "payload", "received_at", "event_timestamp"),
+    "tool_invocations": ("id", "call_id", "tool_name", "parameters", "invoked_at"),
+}
+CALL_DETAIL_JSON_COLUMNS = ("metadata", "response_json", "payload", "parameters")
+
+
+# DB writer client in multi-worker mode (see db_writer.py); None = write locally
+_writer = None
+
+# Write functions by name, executed by the DB writer process on request
+WRITE_OPERATIONS = {}
+
+
+def _connect(replica: bool = False, shard: int = 0):
+    """
+    Open a database connection (counted for metrics) to a shard, or to the
+    shard's read replica. Shard 0 also holds everything not stored per call.
+    """
+    DB_STATS["connections"] += 1
+    if replica:
+        DB_STATS["replica_connections"] += 1
+        # The snapshot file is never modified, only replaced, so no locking is needed
+        path = replica_path(shard).resolve()
+        return aiosqlite.connect(f"{path.as_uri()}?immutable=1", uri=True)
+    return aiosqlite.connect(shard_path(shard))
+
+
+def _shard_file(base: Path, shard: int) -> Path:
+    return base if shard == 0 else base.with_name(f"{base.stem}.shard{shard}{base.suffix}")
+
+
+def shard_path(shard: int) -> Path:
+    """Database file of a shard (shard 0 is DB_PATH)."""
+    return _shard_file(DB_PATH, shard)
+
+
+def shard_for(call_id: str, shard_count: int = None) -> int:
+    """Shard holding a call's rows: a stable hash of the call id."""
+    shard_count = shard_count or SHARD_COUNT
+    return zlib.crc32(call_id.encode()) % shard_count if shard_count > 1 else 0
+
+
+async def _fan_out(query):
+    """Run `query(shard)` on every shard concurrently; results in shard order."""
+    if SHARD_COUNT == 1:
+        return [await query(0)]
+    return await asyncio.gather(*(query(shard) for shard in range(SHARD_COUNT)))
+
+
+def replica_path(shard: int = 0) -> Path:
+    """Where a shard's read replica snapshot is kept (see replica.py)."""
+    base = REPLICA_PATH or DB_PATH.with_name(f"{DB_PATH.stem}.replica{DB_PATH.suffix}")
+    return _shard_file(base, shard)
+
+
+def replica_age():
+    """
+    Seconds since the oldest shard's read replica snapshot was taken, or None
+    when replica reads should use the primary (replica disabled, missing or
+    too stale).
+    """
+    if REPLICA_INTERVAL_SECONDS <= 0:
+        return None
+    try:
+        # A snapshot's mtime is set to the moment its read transaction began
+        taken = min(os.stat(replica_path(shard)).st_mtime for shard in range(SHARD_COUNT))
+    except FileNotFoundError:
+        return None
+    age = max(0.0, time.time() - taken)
+    return age if age <= REPLICA_MAX_STALENESS_SECONDS else None
+
+
+def use_writer(client):
+    """Send all writes through a DB writer client (None to write locally again)."""
+    global _writer
+    _writer = client
+
+
+def _write(func):
+    """Run a write locally, or in the DB writer process when one is in use."""
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        if _writer is not None:
+            return await _writer.call(func.__name__, *args, **kwargs)
+        return await func(*args, **kwargs)
+
+    WRITE_OPERATIONS[func.__name__] = wrapper
+    return wrapper
 
 
 async def init_db():
-    """Initialize the SQLite database with required tables."""
-    async with aiosqlite.connect(DB_PATH) as db:
-        # Calls table - stores all Ultravox call information
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS calls (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                call_id TEXT UNIQUE NOT NULL,
-                agent_id TEXT NOT NULL,
-                join_url TEXT,
-                status TEXT DEFAULT 'created',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                joined_at TIMESTAMP,
-                ended_at TIMESTAMP,
-                end_reason TEXT,
-                short_summary TEXT,
-                summary TEXT,
-                metadata TEXT,
-                response_json TEXT
-            )
-        """)
-
-        # Webhooks table - stores all webhook events received
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS webhooks (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                call_id TEXT NOT NULL,
-                event_type TEXT NOT NULL,
-                payload TEXT NOT NULL,
-                received_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (call_id) REFERENCES calls(call_id)
-            )
-        """)
-
-        # Tool invocations table - stores tool calls (escalate_to_human, log_call_engagement)
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS tool_invocations (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                call_id TEXT NOT NULL,
-                tool_name TEXT NOT NULL,
-                parameters TEXT NOT NULL,
-                invoked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (call_id) REFERENCES calls(call_id)
-            )
-        """)
-
-        await db.commit()
-        print(f"Database initialized at {DB_PATH}")
-
-
-async def create_call(call_id: str, agent_id: str, join_url: str, response_json: dict):
-    """Store a new call in the database."""
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute(
-            """
-            INSERT INTO calls (call_id, agent_id, join_url, status, response_json)
-            VALUES (?, ?, ?, ?, ?)
-        """,
-            (call_id, agent_id, join_url, "created", json.dumps(response_json)),
+    """Initialize every shard's tables, and the shared tables in shard 0."""
+    for shard in range(SHARD_COUNT):
+        async with _connect(shard=shard) as db:
+            await _init_call_tables(db)
+            if shard == 0:
+                await _init_shared_tables(db)
+            await db.commit()
+    shards = f" ({SHARD_COUNT} shards)" if SHARD_COUNT > 1 else ""
+    print(f"Database initialized at {DB_PATH}{shards}")
+
+
+async def _init_call_tables(db):
+    """Create the per call tables of one shard."""
+    # WAL lets readers in other processes run while the writer commits
+    await db.execute("PRAGMA journal_mode=WAL")
+
+    # Calls table - stores all Ultravox call information
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS calls (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            call_id TEXT UNIQUE NOT NULL,
+            agent_id TEXT NOT NULL,
+            join_url TEXT,
+            status TEXT DEFAULT 'created',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            joined_at TIMESTAMP,
+            ended_at TIMESTAMP,
+            end_reason TEXT,
+            short_summary TEXT,
+            summary TEXT,
+            metadata TEXT,
+            response_json TEXT
+        )
+    """)
+
+    # Webhooks table - stores all webhook events received
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS webhooks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            call_id TEXT NOT NULL,
+            event_type TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            received_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            event_timestamp TEXT,
+            FOREIGN KEY (call_id) REFERENCES calls(call_id)
+        )
+    """)
+
+    # Webhook idempotency key (call_id, event_type, event_timestamp); rows
+    # logged before it existed have no event_timestamp and are not keyed
+    cursor = await db.execute("PRAGMA table_info(webhooks)")
+    if "event_timestamp" not in [row[1] for row in await cursor.fetchall()]:
+        await db.execute("ALTER TABLE webhooks ADD COLUMN event_timestamp TEXT")
+    await db.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_webhooks_event_key
+        ON webhooks (call_id, event_type, event_timestamp)
+        WHERE event_timestamp IS NOT NULL
+    """)
+
+    # Tool invocations table - stores tool calls (escalate_to_human, log_call_engagement)
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS tool_invocations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            call_id TEXT NOT NULL,
+            tool_name TEXT NOT NULL,
+            parameters TEXT NOT NULL,
+            invoked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (call_id) REFERENCES calls(call_id)
+        )
+    """)
+
+    # Per-call lookups in time order (call detail) read these without sorting
+    await db.execute("""
+        CREATE INDEX IF NOT EXISTS idx_webhooks_call
+        ON webhooks (call_id, received_at)
+    """)
+    await db.execute("""
+        CREATE INDEX IF NOT EXISTS idx_tool_invocations_call
+        ON tool_invocations (call_id, invoked_at)
+    """)
+
+    # Analytics rollups - counters maintained incrementally per time bucket
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS analytics_rollups (
+            granularity TEXT NOT NULL,
+            bucket TEXT NOT NULL,
+            agent_id TEXT NOT NULL,
+            metric TEXT NOT NULL,
+            dimension TEXT NOT NULL,
+            value TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            resolution_sum INTEGER NOT NULL DEFAULT 0,
+            resolved_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (granularity, bucket, agent_id, metric, dimension, value)
+        )
+    """)
+
+    # Transcripts copied from Ultravox once a call has ended; a transcripts
+    # row marks the call's messages as stored (even when there are none)
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS messages (
+            call_id TEXT NOT NULL,
+            ordinal INTEGER NOT NULL,
+            role TEXT,
+            text TEXT,
+            medium TEXT,
+            payload TEXT NOT NULL,
+            PRIMARY KEY (call_id, ordinal)
+        )
+    """)
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS transcripts (
+            call_id TEXT PRIMARY KEY,
+            message_count INTEGER NOT NULL,
+            fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    # Resources used per call (see accounting.py), summed over batched flushes
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS call_costs (
+            call_id TEXT PRIMARY KEY,
+            requests INTEGER NOT NULL DEFAULT 0,
+            webhooks INTEGER NOT NULL DEFAULT 0,
+            ultravox_requests INTEGER NOT NULL DEFAULT 0,
+            ultravox_bytes INTEGER NOT NULL DEFAULT 0,
+            db_rows INTEGER NOT NULL DEFAULT 0,
+            db_bytes INTEGER NOT NULL DEFAULT 0,
+            cpu_ms REAL NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    await _init_search_index(db)
+    await _init_versions(db)
+
+
+async def _init_shared_tables(db):
+    """Create the tables that are not per call (shard 0 only)."""
+    # Export cursors - last exported row id per consumer and table
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS export_cursors (
+            consumer TEXT NOT NULL,
+            table_name TEXT NOT NULL,
+            last_id INTEGER NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (consumer, table_name)
+        )
+    """)
+
+    # Durable background jobs (see job_queue.py); times are epoch seconds
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            idempotency_key TEXT UNIQUE,
+            priority INTEGER NOT NULL DEFAULT 0,
+            status TEXT NOT NULL DEFAULT 'queued',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL,
+            run_after REAL NOT NULL,
+            locked_until REAL,
+            enqueued_at REAL NOT NULL,
+            finished_at REAL,
+            last_error TEXT
+        )
+    """)
+    await db.execute("""
+        CREATE INDEX IF NOT EXISTS idx_jobs_due
+        ON jobs (status, priority, run_after)
+    """)
+
+    # Reconciliation sync cursors (e.g. the Ultravox call listing high-water mark)
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS sync_cursors (
+            name TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    # Outbound campaigns and their per-number dial jobs
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS campaigns (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            status TEXT DEFAULT 'running',
+            calls_per_second REAL NOT NULL,
+            max_concurrent INTEGER NOT NULL,
+            max_attempts INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            completed_at TIMESTAMP
+        )
+    """)
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS campaign_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            campaign_id INTEGER NOT NULL,
+            to_number TEXT NOT NULL,
+            template_context TEXT,
+            status TEXT DEFAULT 'pending',
+            attempts INTEGER DEFAULT 0,
+            next_attempt_at REAL DEFAULT 0,
+            call_id TEXT,
+            last_error TEXT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (campaign_id) REFERENCES campaigns(id)
+        )
+    """)
+    await db.execute("""
+        CREATE INDEX IF NOT EXISTS idx_campaign_jobs_due
+        ON campaign_jobs (campaign_id, status, next_attempt_at)
+    """)
+
+
+async def _init_versions(db):
+    """
+    Create version counters for conditional GETs.
+    call_versions is bumped on any write to a call's rows; data_versions
+    holds global counters ('calls' for the call list). Triggers keep both
+    in the same transaction as the write.
+    """
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS call_versions (
+            call_id TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS data_versions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
         )
+    """)
+
+    bump_call = """
+        INSERT INTO call_versions (call_id, version) VALUES (new.call_id, 1)
+        ON CONFLICT (call_id) DO UPDATE SET version = version + 1;
+    """
+    bump_list = """
+        INSERT INTO data_versions (name, version) VALUES ('calls', 1)
+        ON CONFLICT (name) DO UPDATE SET version = version + 1;
+    """
+    triggers = {
+        "calls_version_insert": ("AFTER INSERT ON calls", bump_call + bump_list),
+        "calls_version_update": ("AFTER UPDATE ON calls", bump_call + bump_list),
+        "webhooks_version_insert": ("AFTER INSERT ON webhooks", bump_call),
+        "tool_invocations_version_insert": ("AFTER INSERT ON tool_invocations", bump_call),
+    }
+    for name, (event, body) in triggers.items():
+        await db.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {event} BEGIN {body} END")
+
+    # Calls stored before versioning existed start at version 1
+    await db.execute("""
+        INSERT OR IGNORE INTO call_versions (call_id, version)
+        SELECT call_id, 1 FROM calls
+    """)
+    await db.execute(
+        "INSERT OR IGNORE INTO data_versions (name, version) VALUES ('calls', 1)"
+    )
+
+
+async def _init_search_index(db):
+    """
+    Create the FTS5 search table and the triggers that keep it in sync.
+
+    Call summaries and free-text tool parameters share one index, so their
+    bm25 scores use the same term statistics and can be ranked together.
+    A call is indexed under rowid 2 * calls.id and a tool invocation under
+    2 * tool_invocations.id + 1.
+    """
+    # Earlier versions kept one index per table
+    for trigger in ("calls_fts_insert", "calls_fts_update", "calls_fts_delete",
+                    "tool_invocations_fts_insert", "tool_invocations_fts_delete"):
+        await db.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    await db.execute("DROP TABLE IF EXISTS calls_fts")
+    await db.execute("DROP TABLE IF EXISTS tool_invocations_fts")
+
+    cursor = await db.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'search_fts'"
+    )
+    exists = await cursor.fetchone()
+
+    await db.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5(
+            call_id UNINDEXED, source UNINDEXED,
+            short_summary, summary, escalation_reason, context_summary, engagement_notes,
+            tokenize='porter unicode61'
+        )
+    """)
+    await db.execute("""
+        CREATE TRIGGER IF NOT EXISTS search_fts_call_insert AFTER INSERT ON calls BEGIN
+            INSERT INTO search_fts (rowid, call_id, source, short_summary, summary)
+            VALUES (new.id * 2, new.call_id, 'call', new.short_summary, new.summary);
+        END
+    """)
+    await db.execute("""
+        CREATE TRIGGER IF NOT EXISTS search_fts_call_update
+        AFTER UPDATE OF short_summary, summary ON calls BEGIN
+            DELETE FROM search_fts WHERE rowid = old.id * 2;
+            INSERT INTO search_fts (rowid, call_id, source, short_summary, summary)
+            VALUES (new.id * 2, new.call_id, 'call', new.short_summary, new.summary);
+        END
+    """)
+    await db.execute("""
+        CREATE TRIGGER IF NOT EXISTS search_fts_call_delete AFTER DELETE ON calls BEGIN
+            DELETE FROM search_fts WHERE rowid = old.id * 2;
+        END
+    """)
+    await db.execute("""
+        CREATE TRIGGER IF NOT EXISTS search_fts_tool_insert
+        AFTER INSERT ON tool_invocations BEGIN
+            INSERT INTO search_fts
+                (rowid, call_id, source, escalation_reason, context_summary, engagement_notes)
+            VALUES (
+                new.id * 2 + 1,
+                new.call_id,
+                new.tool_name,
+                json_extract(new.parameters, '$.escalation_reason'),
+                json_extract(new.parameters, '$.context_summary'),
+                json_extract(new.parameters, '$.engagement_notes')
+            );
+        END
+    """)
+    await db.execute("""
+        CREATE TRIGGER IF NOT EXISTS search_fts_tool_delete
+        AFTER DELETE ON tool_invocations BEGIN
+            DELETE FROM search_fts WHERE rowid = old.id * 2 + 1;
+        END
+    """)
+
+    if not exists:
+        await _rebuild_search_index(db)
+
+
+async def _rebuild_search_index(db):
+    """Repopulate the search table from the raw rows (caller commits)."""
+    await db.execute("DELETE FROM search_fts")
+    await db.execute("""
+        INSERT INTO search_fts (rowid, call_id, source, short_summary, summary)
+        SELECT id * 2, call_id, 'call', short_summary, summary FROM calls
+    """)
+    await db.execute("""
+        INSERT INTO search_fts
+            (rowid, call_id, source, escalation_reason, context_summary, engagement_notes)
+        SELECT id * 2 + 1, call_id, tool_name,
+               json_extract(parameters, '$.escalation_reason'),
+               json_extract(parameters, '$.context_summary'),
+               json_extract(parameters, '$.engagement_notes')
+        FROM tool_invocations
+    """)
+
+
+def _rollup_buckets(timestamp: str):
+    """Return (granularity, bucket) pairs for a 'YYYY-MM-DD HH:MM:SS' timestamp."""
+    return [
+        ("hour", f"{timestamp[:13]}:00"),
+        ("day", timestamp[:10]),
+        ("all", ""),
+    ]
+
+
+def _rollup_rows(timestamp: str, agent_id: str, metric: str, dimensions: dict,
+                 resolution: int = 0, resolved: int = 0, count: int = 1):
+    """Build upsert parameter rows for one event across all buckets and dimensions."""
+    return [
+        (granularity, bucket, agent_id or "", metric, dimension, str(value),
+         count, count * resolution, count * resolved)
+        for granularity, bucket in _rollup_buckets(timestamp)
+        for dimension, value in dimensions.items()
+        if value is not None
+    ]
+
+
+async def _apply_rollups(db, rows):
+    """Add to (or with negative counts, take from) analytics rollup counters (caller commits)."""
+    await db.executemany(
+        """
+        INSERT INTO analytics_rollups
+            (granularity, bucket, agent_id, metric, dimension, value,
+             count, resolution_sum, resolved_count)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (granularity, bucket, agent_id, metric, dimension, value)
+        DO UPDATE SET
+            count = count + excluded.count,
+            resolution_sum = resolution_sum + excluded.resolution_sum,
+            resolved_count = resolved_count + excluded.resolved_count
+    """,
+        rows,
+    )
+
+
+def _tool_rollup_rows(timestamp: str, agent_id: str, tool_name: str, parameters: dict):
+    """Build rollup rows for a call's first invocation of a tool."""
+    dimensions = ROLLUP_DIMENSIONS.get(tool_name)
+    if not dimensions:
+        return []
+    return _rollup_rows(
+        timestamp,
+        agent_id,
+        tool_name,
+        {name: parameters.get(name) for name in dimensions},
+        resolution=int(parameters.get("resolution_likelihood") or 0),
+        resolved=1 if parameters.get("issue_resolved") else 0,
+    )
+
+
+def _utc_timestamp() -> str:
+    """Current UTC time in SQLite CURRENT_TIMESTAMP format."""
+    return datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+
+
+async def _insert_call(db, call_id: str, agent_id: str, join_url: str,
+                       response_json: dict, metadata: dict = None) -> bool:
+    """Insert a call unless it already exists; return whether it was inserted."""
+    metadata = json.dumps(metadata) if metadata is not None else None
+    response_json = json.dumps(response_json)
+    created_at = _utc_timestamp()
+    cursor = await db.execute(
+        """
+        INSERT INTO calls
+            (call_id, agent_id, join_url, status, created_at, metadata, response_json)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (call_id) DO NOTHING
+    """,
+        (call_id, agent_id, join_url, "created", created_at, metadata, response_json),
+    )
+    if cursor.rowcount == 0:
+        return False
+    accounting.record(db_rows=1, db_bytes=len(response_json) + len(metadata or ""))
+    await _apply_rollups(
+        db, _rollup_rows(created_at, agent_id, "call_status", {"status": "created"})
+    )
+    return True
+
+
+async def _update_call_status(db, call_id: str, status: str, **kwargs) -> str:
+    """
+    Apply a status update without moving the call back in its lifecycle
+    (a late 'joined' still fills in joined_at but leaves 'ended' alone).
+    Returns the resulting status, or None if the call does not exist.
+    """
+    cursor = await db.execute(
+        "SELECT agent_id, status, created_at FROM calls WHERE call_id = ?", (call_id,)
+    )
+    previous = await cursor.fetchone()
+    if not previous:
+        return None
+    agent_id, previous_status, created_at = previous
+
+    fields = [name for name in CALL_UPDATE_FIELDS if name in kwargs]
+    set_clause = "{0} = ?"
+    if CALL_STATUS_ORDER.get(previous_status, -1) > CALL_STATUS_ORDER.get(status, -1):
+        # Stale event: keep the later status and only fill in missing fields
+        status = previous_status
+        set_clause = "{0} = COALESCE({0}, ?)"
+
+    set_clauses = ["status = ?"] + [set_clause.format(name) for name in fields]
+    params = [status] + [kwargs[name] for name in fields] + [call_id]
+    await db.execute(f"UPDATE calls SET {', '.join(set_clauses)} WHERE call_id = ?", params)
+    accounting.record(db_rows=1, db_bytes=sum(len(str(value or "")) for value in params[:-1]))
+
+    # Move the call from its previous status count to the new one
+    if previous_status != status:
+        created_at = created_at or _utc_timestamp()
+        await _apply_rollups(
+            db,
+            _rollup_rows(created_at, agent_id, "call_status", {"status": previous_status},
+                         count=-1)
+            + _rollup_rows(created_at, agent_id, "call_status", {"status": status}),
+        )
+    return status
+
+
+@_write
+async def create_call(call_id: str, agent_id: str, join_url: str, response_json: dict,
+                      metadata: dict = None):
+    """Store a new call (with the metadata it was requested with) in the database."""
+    async with _connect(shard=shard_for(call_id)) as db:
+        inserted = await _insert_call(db, call_id, agent_id, join_url, response_json, metadata)
         await db.commit()
+    if inserted:
+        call_cache.put(call_id, {"call_id": call_id, "agent_id": agent_id, "status": "created"})
 
 
+@_write
 async def update_call_status(call_id: str, status: str, **kwargs):
     """Update call status and optional fields."""
-    async with aiosqlite.connect(DB_PATH) as db:
-        set_clauses = ["status = ?"]
-        params = [status]
-
-        if "joined_at" in kwargs:
-            set_clauses.append("joined_at = ?")
-            params.append(kwargs["joined_at"])
-        if "ended_at" in kwargs:
-            set_clauses.append("ended_at = ?")
-            params.append(kwargs["ended_at"])
-        if "end_reason" in kwargs:
-            set_clauses.append("end_reason = ?")
-            params.append(kwargs["end_reason"])
-        if "short_summary" in kwargs:
-            set_clauses.append("short_summary = ?")
-            params.append(kwargs["short_summary"])
-        if "summary" in kwargs:
-            set_clauses.append("summary = ?")
-            params.append(kwargs["summary"])
-
-        params.append(call_id)
-        query = f"UPDATE calls SET {', '.join(set_clauses)} WHERE call_id = ?"
-        await db.execute(query, params)
-        await db.commit()
-
-
-async def log_webhook(call_id: str, event_type: str, payload: dict):
-    """Log a webhook event."""
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute(
+    async with _connect(shard=shard_for(call_id)) as db:
+        status = await _update_call_status(db, call_id, status, **kwargs)
+        await db.commit()
+    if status:
+        call_cache.update(call_id, status=status, **kwargs)
+
+
+@_write
+async def ingest_webhook(call_id: str, event_type: str, event_timestamp: str,
+                         payload: dict, **fields) -> bool:
+    """
+    Log a webhook delivery and apply its status change in one transaction.
+    Returns False (and writes nothing) if this (call_id, event_type,
+    event_timestamp) was already ingested.
+    """
+    encoded = json.dumps(payload)
+    async with _connect(shard=shard_for(call_id)) as db:
+        cursor = await db.execute(
             """
-            INSERT INTO webhooks (call_id, event_type, payload)
-            VALUES (?, ?, ?)
+            INSERT INTO webhooks (call_id, event_type, payload, event_timestamp)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT DO NOTHING
         """,
-            (call_id, event_type, json.dumps(payload)),
+            (call_id, event_type, encoded, event_timestamp),
         )
+        if cursor.rowcount == 0:
+            return False
+        accounting.record(db_rows=1, db_bytes=len(encoded))
+
+        call_data = payload.get("call", {})
+        if event_type == "call.started":
+            await _insert_call(
+                db, call_id, call_data.get("agentId", ""), call_data.get("joinUrl", ""), call_data
+            )
+
+        status = WEBHOOK_STATUSES.get(event_type)
+        if status:
+            await _update_call_status(db, call_id, status, **fields)
         await db.commit()
 
+    # The cached entry may predate the call row or miss the new fields
+    call_cache.invalidate(call_id)
+    return True
+
 
+@_write
 async def log_tool_invocation(call_id: str, tool_name: str, parameters: dict):
     """Log a tool invocation and return the inserted ID."""
-    async with aiosqlite.connect(DB_PATH) as db:
+    encoded = json.dumps(parameters)
+    invoked_at = _utc_timestamp()
+    async with _connect(shard=shard_for(call_id)) as db:
         cursor = await db.execute(
             """
-            INSERT INTO tool_invocations (call_id, tool_name, parameters)
-            VALUES (?, ?, ?)
+            INSERT INTO tool_invocations (call_id, tool_name, parameters, invoked_at)
+            VALUES (?, ?, ?, ?)
         """,
-            (call_id, tool_name, json.dumps(parameters)),
+            (call_id, tool_name, encoded, invoked_at),
         )
+        invocation_id = cursor.lastrowid
+        accounting.record(db_rows=1, db_bytes=len(encoded))
+
+        # Only the call's first invocation of a tool is rolled up
+        if tool_name in ROLLUP_DIMENSIONS:
+            cursor = await db.execute(
+                """
+                SELECT
+                    (SELECT agent_id FROM calls WHERE call_id = ?),
+                    EXISTS (SELECT 1 FROM tool_invocations
+                            WHERE call_id = ? AND tool_name = ? AND id < ?)
+            """,
+                (call_id, call_id, tool_name, invocation_id),
+            )
+            agent_id, repeated = await cursor.fetchone()
+            if not repeated:
+                await _apply_rollups(
+                    db, _tool_rollup_rows(invoked_at, agent_id or "", tool_name, parameters)
+                )
         await db.commit()
-        return cursor.lastrowid
+        return invocation_id
+
+
+@_write
+async def store_call_messages(call_id: str, messages: list):
+    """Replace a call's stored transcript with `messages` (in Ultravox order)."""
+    rows = [
+        (call_id, ordinal, message.get("role"), message.get("text"),
+         message.get("medium"), json.dumps(message))
+        for ordinal, message in enumerate(messages)
+    ]
+    async with _connect(shard=shard_for(call_id)) as db:
+        await db.execute("DELETE FROM messages WHERE call_id = ?", (call_id,))
+        await db.executemany(
+            """
+            INSERT INTO messages (call_id, ordinal, role, text, medium, payload)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """,
+            rows,
+        )
+        accounting.record(
+            db_rows=len(rows),
+            db_bytes=sum(len(row[3] or "") + len(row[5]) for row in rows),
+        )
+        await db.execute(
+            """
+            INSERT INTO transcripts (call_id, message_count) VALUES (?, ?)
+            ON CONFLICT (call_id) DO UPDATE SET
+                message_count = excluded.message_count,
+                fetched_at = CURRENT_TIMESTAMP
+        """,
+            (call_id, len(messages)),
+        )
+        await db.commit()
+
+
+async def get_stored_messages(call_id: str, offset: int = 0, limit: int = 200):
+    """
+    Return (total, messages[offset:offset + limit]) from the stored
+    transcript, or None if the call's transcript has not been stored.
+    """
+    async with _connect(shard=shard_for(call_id)) as db:
+        cursor = await db.execute(
+            "SELECT message_count FROM transcripts WHERE call_id = ?", (call_id,)
+        )
+        row = await cursor.fetchone()
+        if not row:
+            return None
+        cursor = await db.execute(
+            """
+            SELECT payload FROM messages
+            WHERE call_id = ? AND ordinal >= ?
+            ORDER BY ordinal
+            LIMIT ?
+        """,
+            (call_id, offset, limit),
+        )
+        rows = await cursor.fetchall()
+        return row[0], [json.loads(payload) for (payload,) in rows]
 
 
 async def get_call(call_id: str):
     """Retrieve call information."""
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect(shard=shard_for(call_id)) as db:
         db.row_factory = aiosqlite.Row
         cursor = await db.execute("SELECT * FROM calls WHERE call_id = ?", (call_id,))
         row = await cursor.fetchone()
@@ -135,18 +824,123 @@ async def get_call(call_id: str):
         return None
 
 
-async def get_all_calls():
-    """Retrieve all calls."""
-    async with aiosqlite.connect(DB_PATH) as db:
+def _json_object_sql(table: str, alias: str) -> str:
+    """SQL rendering a row's call detail columns with json_object."""
+    # json() marks stored JSON text as JSON, so it is embedded as a value
+    # instead of being escaped into a string
+    return "json_object({})".format(", ".join(
+        f"'{column}', json({alias}.{column})" if column in CALL_DETAIL_JSON_COLUMNS
+        else f"'{column}', {alias}.{column}"
+        for column in CALL_DETAIL_COLUMNS[table]
+    ))
+
+
+def _call_detail_sql() -> str:
+    # Rows are ordered in a subquery (no ORDER BY inside aggregates before
+    # 3.44); the (call_id, time) indexes return them in order without a sort.
+    # The JSON built by an inner json_object/json_group_array is appended to
+    # the outer one as text, not parsed again.
+    sections = ", ".join(
+        f"""'{table}', (
+            SELECT json_group_array({_json_object_sql(table, "t")}) FROM (
+                SELECT {', '.join(CALL_DETAIL_COLUMNS[table])} FROM {table}
+                WHERE call_id = c.call_id
+                ORDER BY {EXPORT_TABLES[table]}, id
+            ) t
+        )"""
+        for table in ("webhooks", "tool_invocations")
+    )
+    return f"""
+        SELECT json_object('call', {_json_object_sql("calls", "c")}, {sections})
+        FROM calls c WHERE c.call_id = ?
+    """
+
+
+CALL_DETAIL_SQL = _call_detail_sql()
+
+
+async def get_call_detail_json(call_id: str):
+    """
+    Return a call with its webhooks and tool invocations, in time order, as
+    one JSON document (bytes) built by SQLite, or None if the call does not
+    exist.
+    """
+    async with _connect(shard=shard_for(call_id)) as db:
+        # Take the UTF-8 text as bytes instead of decoding it into a str
+        db.text_factory = bytes
+        cursor = await db.execute(CALL_DETAIL_SQL, (call_id,))
+        row = await cursor.fetchone()
+        return row[0] if row else None
+
+
+async def get_call_state(call_id: str):
+    """
+    Retrieve a call's status and hot fields, served from the in-memory cache
+    when possible. Use this for existence checks instead of get_call.
+    """
+    state = call_cache.get(call_id)
+    if state is not None:
+        return state
+
+    async with _connect(shard=shard_for(call_id)) as db:
         db.row_factory = aiosqlite.Row
-        cursor = await db.execute("SELECT * FROM calls ORDER BY created_at DESC")
-        rows = await cursor.fetchall()
-        return [dict(row) for row in rows]
+        cursor = await db.execute(
+            f"SELECT {', '.join(HOT_FIELDS)} FROM calls WHERE call_id = ?", (call_id,)
+        )
+        row = await cursor.fetchone()
+    if not row:
+        return None
+    state = dict(row)
+    call_cache.put(call_id, state)
+    return state
+
+
+async def get_call_version(call_id: str):
+    """Return a call's version counter, or None if the call is unknown."""
+    async with _connect(shard=shard_for(call_id)) as db:
+        cursor = await db.execute(
+            "SELECT version FROM call_versions WHERE call_id = ?", (call_id,)
+        )
+        row = await cursor.fetchone()
+        return row[0] if row else None
+
+
+async def get_data_version(name: str) -> int:
+    """
+    Return a global version counter (e.g. 'calls' for the call list): the sum
+    of the shards' counters, which changes whenever any of them does.
+    """
+
+    async def shard_version(shard: int) -> int:
+        async with _connect(shard=shard) as db:
+            cursor = await db.execute(
+                "SELECT version FROM data_versions WHERE name = ?", (name,)
+            )
+            row = await cursor.fetchone()
+            return row[0] if row else 0
+
+    return sum(await _fan_out(shard_version))
+
+
+async def get_all_calls():
+    """Retrieve all calls, newest first (merged across shards)."""
+
+    async def shard_calls(shard: int) -> list:
+        async with _connect(shard=shard) as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute("SELECT * FROM calls ORDER BY created_at DESC")
+            rows = await cursor.fetchall()
+            return [dict(row) for row in rows]
+
+    shards = await _fan_out(shard_calls)
+    if len(shards) == 1:
+        return shards[0]
+    return list(heapq.merge(*shards, key=lambda call: call["created_at"] or "", reverse=True))
 
 
 async def get_call_webhooks(call_id: str):
     """Retrieve all webhooks for a call."""
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect(shard=shard_for(call_id)) as db:
         db.row_factory = aiosqlite.Row
         cursor = await db.execute(
             "SELECT * FROM webhooks WHERE call_id = ? ORDER BY received_at", (call_id,)
@@ -157,7 +951,7 @@ async def get_call_webhooks(call_id: str):
 
 async def get_call_tool_invocations(call_id: str):
     """Retrieve all tool invocations for a call."""
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect(shard=shard_for(call_id)) as db:
         db.row_factory = aiosqlite.Row
         cursor = await db.execute(
             "SELECT * FROM tool_invocations WHERE call_id = ? ORDER BY invoked_at",
@@ -165,3 +959,882 @@ async def get_call_tool_invocations(call_id: str):
         )
         rows = await cursor.fetchall()
         return [dict(row) for row in rows]
+
+
+async def get_analytics(granularity: str = "all", start: str = None, end: str = None,
+                        agent_id: str = None, replica: bool = False):
+    """
+    Retrieve analytics rollup rows for a granularity and optional bucket range.
+    Each shard keeps rollups for its own calls; their counters are summed.
+    """
+    clauses = ["granularity = ?"]
+    params = [granularity]
+    if start:
+        clauses.append("bucket >= ?")
+        params.append(start)
+    if end:
+        clauses.append("bucket < ?")
+        params.append(end)
+    if agent_id:
+        clauses.append("agent_id = ?")
+        params.append(agent_id)
+
+    async def shard_rollups(shard: int) -> list:
+        async with _connect(replica, shard) as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute(
+                f"""
+                SELECT bucket, agent_id, metric, dimension, value,
+                       count, resolution_sum, resolved_count
+                FROM analytics_rollups
+                WHERE {' AND '.join(clauses)} AND count != 0
+                ORDER BY bucket
+            """,
+                params,
+            )
+            rows = await cursor.fetchall()
+            return [dict(row) for row in rows]
+
+    shards = await _fan_out(shard_rollups)
+    if len(shards) == 1:
+        return shards[0]
+    merged = {}
+    for row in heapq.merge(*shards, key=lambda row: row["bucket"]):
+        key = (row["bucket"], row["agent_id"], row["metric"], row["dimension"], row["value"])
+        total = merged.get(key)
+        if total is None:
+            merged[key] = row
+        else:
+            for counter in ("count", "resolution_sum", "resolved_count"):
+                total[counter] += row[counter]
+    return list(merged.values())
+
+
+@_write
+async def rebuild_analytics():
+    """Recompute all analytics rollups from the calls and tool invocation rows."""
+    totals = {"tool_invocations": 0, "calls": 0}
+    for shard in range(SHARD_COUNT):
+        async with _connect(shard=shard) as db:
+            counts = await _rebuild_analytics(db)
+            await db.commit()
+        for name, count in counts.items():
+            totals[name] += count
+    return totals
+
+
+async def _rebuild_analytics(db):
+    """
+    Recompute one shard's rollups (caller commits) from the same state the
+    live updates follow: each call's first invocation of each tool, and each
+    call's current status.
+    """
+    await db.execute("DELETE FROM analytics_rollups")
+
+    cursor = await db.execute(f"""
+        SELECT t.tool_name, t.parameters, t.invoked_at, COALESCE(c.agent_id, '')
+        FROM tool_invocations t
+        LEFT JOIN calls c ON c.call_id = t.call_id
+        WHERE t.id IN (
+            SELECT MIN(id) FROM tool_invocations
+            WHERE tool_name IN ({', '.join('?' * len(ROLLUP_DIMENSIONS))})
+            GROUP BY call_id, tool_name
+        )
+    """, list(ROLLUP_DIMENSIONS))
+    rows = []
+    tool_rows = 0
+    async for tool_name, parameters, invoked_at, agent_id in cursor:
+        rows += _tool_rollup_rows(invoked_at, agent_id, tool_name, json.loads(parameters))
+        tool_rows += 1
+
+    cursor = await db.execute("SELECT created_at, agent_id, status FROM calls")
+    call_rows = 0
+    async for created_at, agent_id, status in cursor:
+        rows += _rollup_rows(
+            created_at or _utc_timestamp(), agent_id, "call_status", {"status": status}
+        )
+        call_rows += 1
+
+    await _apply_rollups(db, rows)
+    return {"tool_invocations": tool_rows, "calls": call_rows}
+
+
+def _fts_query(text: str) -> str:
+    """Turn free text into an FTS5 query: every term must match, last term as a prefix."""
+    terms = [term.replace('"', '""') for term in text.split()]
+    if not terms:
+        return ""
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+async def search_calls(query: str, limit: int = 20, offset: int = 0):
+    """
+    Full-text search over call summaries and tool invocation notes.
+    Returns up to `limit` hits ranked by bm25, plus whether more hits exist.
+
+    Each shard scores at most SEARCH_MAX_CANDIDATES matches, its newest
+    (highest rowid) ones, which the index returns in rowid order without
+    scoring the rest; snippets are only built for the page returned. bm25
+    uses each shard's own term statistics; with shards of similar content
+    (calls are spread by a hash) the merged ranking is close to a global one.
+    """
+    match = _fts_query(query)
+    if not match:
+        return [], False
+
+    async def shard_hits(shard: int) -> list:
+        async with _connect(shard=shard) as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute(
+                """
+                SELECT * FROM (
+                    SELECT rowid, call_id, source,
+                           bm25(search_fts, 0, 0, 2.0, 1.0, 1.0, 1.0, 1.0) AS rank
+                    FROM search_fts
+                    WHERE search_fts MATCH ?
+                    ORDER BY rowid DESC
+                    LIMIT ?
+                )
+                ORDER BY rank, rowid DESC
+                LIMIT ?
+            """,
+                (match, SEARCH_MAX_CANDIDATES, offset + limit + 1),
+            )
+            return [{**dict(row), "shard": shard} for row in await cursor.fetchall()]
+
+    hits = heapq.merge(
+        *await _fan_out(shard_hits), key=lambda hit: (hit["rank"], -hit["rowid"])
+    )
+    rows = list(hits)[offset:offset + limit + 1]
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    by_shard = {}
+    for row in rows:
+        by_shard.setdefault(row["shard"], []).append(row["rowid"])
+
+    async def shard_snippets(shard: int) -> dict:
+        rowids = by_shard.get(shard)
+        if not rowids:
+            return {}
+        async with _connect(shard=shard) as db:
+            # One pass over the rowid range: an indexed rowid IN would expand a
+            # prefix term once per rowid, so the IN is only a filter (+rowid)
+            cursor = await db.execute(
+                f"""
+                SELECT rowid, snippet(search_fts, -1, '<mark>', '</mark>', '…', 16)
+                FROM search_fts
+                WHERE search_fts MATCH ? AND rowid BETWEEN ? AND ?
+                  AND +rowid IN ({', '.join('?' * len(rowids))})
+            """,
+                (match, min(rowids), max(rowids), *rowids),
+            )
+            return dict(await cursor.fetchall())
+
+    snippets = await _fan_out(shard_snippets)
+    return [
+        {
+            "call_id": row["call_id"],
+            "source": row["source"],
+            "invocation_id": row["rowid"] // 2 if row["rowid"] % 2 else None,
+            "rank": row["rank"],
+            "snippet": snippets[row["shard"]].get(row["rowid"]),
+        }
+        for row in rows
+    ], has_more
+
+
+@_write
+async def rebuild_search_index():
+    """Rebuild the full-text search index from the raw rows."""
+    for shard in range(SHARD_COUNT):
+        async with _connect(shard=shard) as db:
+            await _rebuild_search_index(db)
+            await db.commit()
+
+
+@_write
+async def save_call_costs(rows: list):
+    """
+    Add usage totals (dicts of call_id and accounting.COST_FIELDS) to
+    call_costs, one transaction per shard.
+    """
+    fields = accounting.COST_FIELDS
+    by_shard = {}
+    for row in rows:
+        by_shard.setdefault(shard_for(row["call_id"]), []).append(row)
+    for shard, shard_rows in sorted(by_shard.items()):
+        async with _connect(shard=shard) as db:
+            await db.executemany(
+                f"""
+                INSERT INTO call_costs (call_id, {', '.join(fields)})
+                VALUES (?, {', '.join('?' * len(fields))})
+                ON CONFLICT (call_id) DO UPDATE SET
+                    {', '.join(f'{name} = {name} + excluded.{name}' for name in fields)},
+                    updated_at = CURRENT_TIMESTAMP
+            """,
+                [(row["call_id"], *(row[name] for name in fields)) for row in shard_rows],
+            )
+            await db.commit()
+
+
+async def get_top_call_costs(metric: str, limit: int = 20, agent_id: str = None) -> list:
+    """The `limit` calls with the highest `metric` (one of accounting.COST_FIELDS)."""
+    if metric not in accounting.COST_FIELDS:
+        raise ValueError(f"Unknown cost metric: {metric}")
+    where, params = ("WHERE c.agent_id = ?", [agent_id]) if agent_id else ("", [])
+
+    async def shard_top(shard: int) -> list:
+        async with _connect(shard=shard) as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute(
+                f"""
+                SELECT k.call_id, c.agent_id, c.status, c.created_at,
+                       {', '.join(f'k.{name}' for name in accounting.COST_FIELDS)}
+                FROM call_costs k
+                LEFT JOIN calls c ON c.call_id = k.call_id
+                {where}
+                ORDER BY k.{metric} DESC
+                LIMIT ?
+            """,
+                params + [limit],
+            )
+            return [dict(row) for row in await cursor.fetchall()]
+
+    shards = await _fan_out(shard_top)
+    return heapq.nlargest(limit, (row for rows in shards for row in rows), key=lambda row: row[metric])
+
+
+async def get_agent_costs() -> list:
+    """Usage totals and call counts per agent, over all accounted calls."""
+    fields = accounting.COST_FIELDS
+
+    async def shard_totals(shard: int) -> list:
+        async with _connect(shard=shard) as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute(
+                f"""
+                SELECT COALESCE(c.agent_id, '') AS agent_id, COUNT(*) AS calls,
+                       {', '.join(f'SUM(k.{name}) AS {name}' for name in fields)}
+                FROM call_costs k
+                LEFT JOIN calls c ON c.call_id = k.call_id
+                GROUP BY 1
+            """
+            )
+            return [dict(row) for row in await cursor.fetchall()]
+
+    totals = {}
+    for rows in await _fan_out(shard_totals):
+        for row in rows:
+            total = totals.get(row["agent_id"])
+            if total is None:
+                totals[row["agent_id"]] = row
+            else:
+                for name in ("calls",) + fields:
+                    total[name] += row[name]
+    return sorted(totals.values(), key=lambda row: row["agent_id"])
+
+
+# Per call tables whose rows reshard() moves (call_versions is rebuilt by triggers)
+RESHARD_TABLES = ("calls", "webhooks", "tool_invocations", "messages", "transcripts", "call_costs")
+
+
+async def reshard(from_count: int, to_count: int) -> dict:
+    """
+    Move call rows from a `from_count` shard layout to a `to_count` one; run
+    it with the server stopped. Rows are copied, then deleted, per pair of
+    shard files, so an interrupted run leaves rows in both places rather than
+    losing any, and running it again finishes the move. Moved rows get new
+    ids, so analytics rollups are rebuilt and export cursors are reset.
+    Returns the rows moved per table and the emptied shard files removed.
+    """
+    global SHARD_COUNT
+    SHARD_COUNT = to_count
+    await init_db()
+    moved = dict.fromkeys(RESHARD_TABLES, 0)
+    removed = []
+
+    for source in range(from_count):
+        path = shard_path(source)
+        if not path.exists():
+            continue
+        async with aiosqlite.connect(path) as db:
+            await db.create_function(
+                "call_shard", 1, lambda call_id: shard_for(call_id, to_count), deterministic=True
+            )
+            for target in range(to_count):
+                if target == source:
+                    continue
+                await db.execute("ATTACH DATABASE ? AS target", (str(shard_path(target)),))
+                for table in RESHARD_TABLES:
+                    cursor = await db.execute(f"PRAGMA main.table_info({table})")
+                    columns = ", ".join(row[1] for row in await cursor.fetchall() if row[1] != "id")
+                    cursor = await db.execute(
+                        f"""
+                        INSERT OR IGNORE INTO target.{table} ({columns})
+                        SELECT {columns} FROM main.{table}
+                        WHERE call_shard(call_id) = ? ORDER BY rowid
+                    """,
+                        (target,),
+                    )
+                    moved[table] += cursor.rowcount
+                    await db.execute(
+                        f"DELETE FROM main.{table} WHERE call_shard(call_id) = ?", (target,)
+                    )
+                await db.execute(
+                    "DELETE FROM main.call_versions WHERE call_shard(call_id) = ?", (target,)
+                )
+                await db.commit()
+                await db.execute("DETACH DATABASE target")
+
+        if source >= to_count:
+            # Everything has moved out; shard files only hold call tables
+            for suffix in ("", "-wal", "-shm"):
+                extra = path.with_name(path.name + suffix)
+                if extra.exists():
+                    extra.unlink()
+            replica = replica_path(source)
+            if replica.exists():
+                replica.unlink()
+            removed.append(str(path))
+
+    await rebuild_analytics()
+    async with _connect() as db:
+        await db.execute("DELETE FROM export_cursors")
+        await db.commit()
+    return {"moved": moved, "removed": removed}
+
+
+def _export_cursor_name(table: str, shard: int) -> str:
+    """export_cursors key for a table's rows in one shard."""
+    return table if shard == 0 else f"{table}.shard{shard}"
+
+
+def parse_export_cursor(text: str) -> list:
+    """Per shard row ids from an export cursor ("12", or "12,40,3" with three shards)."""
+    ids = [int(part) for part in text.split(",")]
+    if len(ids) != SHARD_COUNT or min(ids) < 0:
+        raise ValueError(f"Export cursor must have {SHARD_COUNT} non-negative row id(s)")
+    return ids
+
+
+def format_export_cursor(ids: list) -> str:
+    return ",".join(str(last_id) for last_id in ids)
+
+
+async def get_export_high_water_mark(table: str, replica: bool = False) -> list:
+    """Return the highest row id currently in an exportable table, per shard."""
+
+    async def shard_mark(shard: int) -> int:
+        async with _connect(replica, shard) as db:
+            cursor = await db.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}")
+            row = await cursor.fetchone()
+            return row[0]
+
+    return await _fan_out(shard_mark)
+
+
+async def iter_export_rows(table: str, since_ids: list = None, until_ids: list = None,
+                           start: str = None, end: str = None, batch_size: int = 1000,
+                           replica: bool = False):
+    """
+    Yield batches of row dicts from an exportable table, shard by shard in id
+    order, between per shard row ids. Rows are read through a single open
+    cursor per shard, so memory stays bounded by `batch_size` no matter how
+    many rows match. With several shards each row also carries its `shard`,
+    since row ids are only unique within one.
+    """
+    for shard in range(SHARD_COUNT):
+        clauses = ["id > ?"]
+        params = [since_ids[shard] if since_ids else 0]
+        if until_ids is not None:
+            clauses.append("id <= ?")
+            params.append(until_ids[shard])
+        if start:
+            clauses.append(f"{EXPORT_TABLES[table]} >= ?")
+            params.append(start)
+        if end:
+            clauses.append(f"{EXPORT_TABLES[table]} < ?")
+            params.append(end)
+
+        async with _connect(replica, shard) as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute(
+                f"SELECT * FROM {table} WHERE {' AND '.join(clauses)} ORDER BY id", params
+            )
+            while True:
+                rows = await cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                if SHARD_COUNT > 1:
+                    yield [{**dict(row), "shard": shard} for row in rows]
+                else:
+                    yield [dict(row) for row in rows]
+
+
+async def get_export_cursor(consumer: str, table: str) -> list:
+    """Return the last exported row id per shard for a consumer (0s if it never exported)."""
+    names = [_export_cursor_name(table, shard) for shard in range(SHARD_COUNT)]
+    async with _connect() as db:
+        cursor = await db.execute(
+            f"""
+            SELECT table_name, last_id FROM export_cursors
+            WHERE consumer = ? AND table_name IN ({', '.join('?' * len(names))})
+        """,
+            (consumer, *names),
+        )
+        saved = dict(await cursor.fetchall())
+        return [saved.get(name, 0) for name in names]
+
+
+@_write
+async def save_export_cursor(consumer: str, table: str, last_ids: list):
+    """Record the last row id per shard a consumer has fully exported."""
+    async with _connect() as db:
+        await db.executemany(
+            """
+            INSERT INTO export_cursors (consumer, table_name, last_id)
+            VALUES (?, ?, ?)
+            ON CONFLICT (consumer, table_name)
+            DO UPDATE SET last_id = excluded.last_id, updated_at = CURRENT_TIMESTAMP
+        """,
+            [
+                (consumer, _export_cursor_name(table, shard), last_id)
+                for shard, last_id in enumerate(last_ids)
+            ],
+        )
+        await db.commit()
+
+
+def _ultravox_call_state(call: dict):
+    """(status, fields) implied by an Ultravox call object; status None if not joined yet."""
+    fields = {
+        column: call[key] for key, column in ULTRAVOX_CALL_FIELDS.items()
+        if call.get(key) is not None
+    }
+    status = "ended" if "ended_at" in fields else "joined" if "joined_at" in fields else None
+    return status, fields
+
+
+@_write
+async def sync_calls(calls: list, cursor_name: str = None, cursor_value: str = None,
+                     agent_id: str = None) -> list:
+    """
+    Upsert Ultravox call objects into calls, one transaction per shard (status
+    only moves forward; see _update_call_status), and optionally advance a
+    sync cursor. With agent_id, calls of other agents are not inserted (calls
+    already stored locally are still updated). The cursor is saved with shard
+    0's calls, after every other shard has committed, so a crash never leaves
+    it ahead of calls that were not written. Returns the ids of calls that
+    were inserted or changed.
+    """
+    if not calls:
+        return []
+    by_shard = {}
+    for call in calls:
+        by_shard.setdefault(shard_for(call["callId"]), []).append(call)
+
+    changed = []
+    for shard in sorted(by_shard, reverse=True):
+        if shard == 0:
+            continue
+        async with _connect(shard=shard) as db:
+            changed += await _sync_shard_calls(db, by_shard[shard], agent_id)
+            await db.commit()
+
+    async with _connect() as db:
+        changed += await _sync_shard_calls(db, by_shard.get(0, []), agent_id)
+        if cursor_name:
+            await db.execute(
+                """
+                INSERT INTO sync_cursors (name, value) VALUES (?, ?)
+                ON CONFLICT (name)
+                DO UPDATE SET value = excluded.value, updated_at = CURRENT_TIMESTAMP
+            """,
+                (cursor_name, cursor_value),
+            )
+        await db.commit()
+
+    for call_id in changed:
+        call_cache.invalidate(call_id)
+    return changed
+
+
+async def _sync_shard_calls(db, calls: list, agent_id: str = None) -> list:
+    """Upsert one shard's calls (caller commits); returns the changed ids."""
+    if not calls:
+        return []
+    changed = []
+    call_ids = [call["callId"] for call in calls]
+    columns = ("status",) + tuple(ULTRAVOX_CALL_FIELDS.values())
+    cursor = await db.execute(
+        f"""
+        SELECT call_id, {', '.join(columns)} FROM calls
+        WHERE call_id IN ({', '.join('?' * len(call_ids))})
+    """,
+        call_ids,
+    )
+    existing = {row[0]: dict(zip(columns, row[1:])) for row in await cursor.fetchall()}
+
+    for call in calls:
+        call_id = call["callId"]
+        status, fields = _ultravox_call_state(call)
+        local = existing.get(call_id)
+        if local is None:
+            if POOL_METADATA_KEY in (call.get("metadata") or {}):
+                # A warm pool call never handed out; it expires unjoined
+                continue
+            if agent_id and call.get("agentId") != agent_id:
+                # Another agent's (or app's) call on the same account
+                continue
+            await _insert_call(
+                db, call_id, call.get("agentId") or "", call.get("joinUrl") or "", call
+            )
+            changed.append(call_id)
+        elif not status or (
+            CALL_STATUS_ORDER.get(local["status"], -1) >= CALL_STATUS_ORDER[status]
+            and all(local[column] is not None for column in fields)
+        ):
+            # Nothing the local row doesn't already have
+            continue
+        if status:
+            await _update_call_status(db, call_id, status, **fields)
+            if local is not None:
+                changed.append(call_id)
+    return changed
+
+
+async def get_sync_cursor(name: str):
+    """Return a sync cursor's value, or None if it was never saved."""
+    async with _connect() as db:
+        cursor = await db.execute("SELECT value FROM sync_cursors WHERE name = ?", (name,))
+        row = await cursor.fetchone()
+        return row[0] if row else None
+
+
+async def get_unfinished_calls(after_call_id: str, limit: int, min_age_seconds: float) -> list:
+    """Ids of calls not yet ended and older than `min_age_seconds`, in call id order."""
+
+    async def shard_calls(shard: int) -> list:
+        async with _connect(shard=shard) as db:
+            cursor = await db.execute(
+                """
+                SELECT call_id FROM calls
+                WHERE status != 'ended' AND call_id > ?
+                  AND created_at <= datetime('now', ?)
+                ORDER BY call_id
+                LIMIT ?
+            """,
+                (after_call_id, f"-{int(min_age_seconds)} seconds", limit),
+            )
+            return [row[0] for row in await cursor.fetchall()]
+
+    return list(heapq.merge(*await _fan_out(shard_calls)))[:limit]
+
+
+@_write
+async def enqueue_jobs(jobs: list) -> int:
+    """
+    Insert jobs (dicts with kind, payload, key, priority, max_attempts,
+    run_after, enqueued_at) in one transaction; jobs whose idempotency key
+    already exists are skipped. Returns the number inserted.
+    """
+    async with _connect() as db:
+        cursor = await db.executemany(
+            """
+            INSERT INTO jobs (kind, payload, idempotency_key, priority, max_attempts,
+                              run_after, enqueued_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (idempotency_key) DO NOTHING
+        """,
+            [
+                (job["kind"], json.dumps(job["payload"]), job["key"], job["priority"],
+                 job["max_attempts"], job["run_after"], job["enqueued_at"])
+                for job in jobs
+            ],
+        )
+        await db.commit()
+        return cursor.rowcount
+
+
+@_write
+async def claim_jobs(limit: int, now: float, visibility_timeout: float):
+    """
+    Atomically claim up to `limit` due jobs, highest priority first: queued
+    jobs whose run_after has passed, and running jobs whose claim expired.
+    """
+    async with _connect() as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute(
+            """
+            UPDATE jobs
+            SET status = 'running', attempts = attempts + 1, locked_until = ?
+            WHERE id IN (
+                SELECT id FROM jobs
+                WHERE (status = 'queued' AND run_after <= ?)
+                   OR (status = 'running' AND locked_until <= ?)
+                ORDER BY priority DESC, run_after, id LIMIT ?
+            )
+            RETURNING *
+        """,
+            (now + visibility_timeout, now, now, limit),
+        )
+        rows = await cursor.fetchall()
+        await db.commit()
+        return [dict(row) for row in rows]
+
+
+@_write
+async def finish_job(job_id: int, status: str, error: str = None, run_after: float = 0):
+    """Record a job's outcome: 'done', 'failed', or back to 'queued' to retry at `run_after`."""
+    async with _connect() as db:
+        await db.execute(
+            """
+            UPDATE jobs
+            SET status = ?, last_error = ?, locked_until = NULL,
+                run_after = CASE WHEN ? = 'queued' THEN ? ELSE run_after END,
+                finished_at = CASE WHEN ? = 'queued' THEN NULL ELSE ? END
+            WHERE id = ?
+        """,
+            (status, error, status, run_after, status, time.time(), job_id),
+        )
+        await db.commit()
+
+
+@_write
+async def complete_jobs(job_ids: list):
+    """Mark a batch of claimed jobs done in one transaction."""
+    async with _connect() as db:
+        await db.executemany(
+            """
+            UPDATE jobs SET status = 'done', locked_until = NULL, finished_at = ?
+            WHERE id = ? AND status = 'running'
+        """,
+            [(time.time(), job_id) for job_id in job_ids],
+        )
+        await db.commit()
+
+
+@_write
+async def release_jobs(job_ids: list):
+    """Return claimed jobs to the queue without counting the interrupted attempt."""
+    async with _connect() as db:
+        await db.executemany(
+            """
+            UPDATE jobs SET status = 'queued', attempts = attempts - 1, locked_until = NULL
+            WHERE id = ? AND status = 'running'
+        """,
+            [(job_id,) for job_id in job_ids],
+        )
+        await db.commit()
+
+
+@_write
+async def prune_jobs(before: float) -> int:
+    """Delete jobs that finished successfully before `before`."""
+    async with _connect() as db:
+        cursor = await db.execute(
+            "DELETE FROM jobs WHERE status = 'done' AND finished_at < ?", (before,)
+        )
+        await db.commit()
+        return cursor.rowcount
+
+
+async def get_job_stats(now: float) -> dict:
+    """Job counts by status and how long the oldest due job has been waiting."""
+    async with _connect() as db:
+        cursor = await db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status")
+        counts = dict(await cursor.fetchall())
+        cursor = await db.execute(
+            "SELECT MIN(run_after) FROM jobs WHERE status = 'queued' AND run_after <= ?",
+            (now,),
+        )
+        oldest = (await cursor.fetchone())[0]
+        return {
+            "by_status": counts,
+            "oldest_due_seconds": round(now - oldest, 3) if oldest is not None else 0,
+        }
+
+
+@_write
+async def create_campaign(name: str, targets: list, calls_per_second: float,
+                          max_concurrent: int, max_attempts: int) -> int:
+    """Store a campaign and one pending job per target in a single transaction."""
+    async with _connect() as db:
+        cursor = await db.execute(
+            """
+            INSERT INTO campaigns (name, calls_per_second, max_concurrent, max_attempts)
+            VALUES (?, ?, ?, ?)
+        """,
+            (name, calls_per_second, max_concurrent, max_attempts),
+        )
+        campaign_id = cursor.lastrowid
+        await db.executemany(
+            """
+            INSERT INTO campaign_jobs (campaign_id, to_number, template_context)
+            VALUES (?, ?, ?)
+        """,
+            (
+                (campaign_id, target["to_number"], json.dumps(target.get("template_context") or {}))
+                for target in targets
+            ),
+        )
+        await db.commit()
+        return campaign_id
+
+
+async def get_campaign(campaign_id: int):
+    """Retrieve a campaign with job counts per status."""
+    async with _connect() as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute("SELECT * FROM campaigns WHERE id = ?", (campaign_id,))
+        row = await cursor.fetchone()
+        if not row:
+            return None
+        campaign = dict(row)
+        cursor = await db.execute(
+            """
+            SELECT status, COUNT(*) AS count, SUM(attempts) AS attempts
+            FROM campaign_jobs WHERE campaign_id = ? GROUP BY status
+        """,
+            (campaign_id,),
+        )
+        counts = {r["status"]: r["count"] for r in await cursor.fetchall()}
+        campaign["jobs"] = {
+            status: counts.get(status, 0)
+            for status in ("pending", "dialing", "completed", "failed", "cancelled")
+        }
+        campaign["jobs"]["total"] = sum(counts.values())
+        return campaign
+
+
+async def get_all_campaigns():
+    """Retrieve all campaigns, newest first."""
+    async with _connect() as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute("SELECT * FROM campaigns ORDER BY id DESC")
+        rows = await cursor.fetchall()
+        return [dict(row) for row in rows]
+
+
+async def get_running_campaign_ids():
+    """Return ids of campaigns the scheduler should be dialing."""
+    async with _connect() as db:
+        cursor = await db.execute("SELECT id FROM campaigns WHERE status = 'running'")
+        return [row[0] for row in await cursor.fetchall()]
+
+
+@_write
+async def set_campaign_status(campaign_id: int, status: str):
+    """Change a campaign's status; cancelling also cancels its open jobs."""
+    async with _connect() as db:
+        completed = "CURRENT_TIMESTAMP" if status in ("completed", "cancelled") else "NULL"
+        await db.execute(
+            f"UPDATE campaigns SET status = ?, completed_at = {completed} WHERE id = ?",
+            (status, campaign_id),
+        )
+        if status == "cancelled":
+            await db.execute(
+                """
+                UPDATE campaign_jobs SET status = 'cancelled', updated_at = CURRENT_TIMESTAMP
+                WHERE campaign_id = ? AND status = 'pending'
+            """,
+                (campaign_id,),
+            )
+        await db.commit()
+
+
+@_write
+async def claim_campaign_jobs(campaign_id: int, limit: int, now: float):
+    """Atomically move up to `limit` due pending jobs to 'dialing' and return them."""
+    async with _connect() as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute(
+            """
+            UPDATE campaign_jobs
+            SET status = 'dialing', attempts = attempts + 1, updated_at = CURRENT_TIMESTAMP
+            WHERE id IN (
+                SELECT id FROM campaign_jobs
+                WHERE campaign_id = ? AND status = 'pending' AND next_attempt_at <= ?
+                ORDER BY id LIMIT ?
+            )
+            RETURNING *
+        """,
+            (campaign_id, now, limit),
+        )
+        rows = await cursor.fetchall()
+        await db.commit()
+        return [dict(row) for row in rows]
+
+
+@_write
+async def record_campaign_call(job_id: int, call_id: str):
+    """Note the Ultravox call placed for a job that is still 'dialing'."""
+    async with _connect() as db:
+        await db.execute(
+            """
+            UPDATE campaign_jobs SET call_id = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        """,
+            (call_id, job_id),
+        )
+        await db.commit()
+
+
+@_write
+async def finish_campaign_job(job_id: int, status: str, call_id: str = None,
+                              error: str = None, next_attempt_at: float = 0):
+    """Record the outcome of a dial attempt ('completed', 'failed' or back to 'pending')."""
+    async with _connect() as db:
+        await db.execute(
+            """
+            UPDATE campaign_jobs
+            SET status = ?, call_id = COALESCE(?, call_id), last_error = ?,
+                next_attempt_at = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        """,
+            (status, call_id, error, next_attempt_at, job_id),
+        )
+        await db.commit()
+
+
+async def campaign_has_open_jobs(campaign_id: int) -> bool:
+    """Whether a campaign still has jobs waiting or being dialed."""
+    async with _connect() as db:
+        cursor = await db.execute(
+            """
+            SELECT 1 FROM campaign_jobs
+            WHERE campaign_id = ? AND status IN ('pending', 'dialing') LIMIT 1
+        """,
+            (campaign_id,),
+        )
+        return await cursor.fetchone() is not None
+
+
+@_write
+async def requeue_dialing_jobs():
+    """
+    Return jobs left in 'dialing' by a previous process to the queue.
+    Jobs with a recorded call id were already dialed, so they are completed
+    instead of being dialed twice.
+    """
+    async with _connect() as db:
+        await db.execute(
+            """
+            UPDATE campaign_jobs SET status = 'completed', updated_at = CURRENT_TIMESTAMP
+            WHERE status = 'dialing' AND call_id IS NOT NULL
+        """
+        )
+        await db.execute(
+            """
+            UPDATE campaign_jobs SET status = 'pending', updated_at = CURRENT_TIMESTAMP
+            WHERE status = 'dialing' AND call_id IS NULL
+        """
+        )
+        await db.commit()
+
+
+# Each call into this module is a span of the current request's trace
+instrument(globals(), "db", "db")
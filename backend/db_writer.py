@@ -0,0 +1,352 @@
+"""
+Single-writer database process for multi-worker deployments.
+
+With WORKERS > 1, `python main.py` starts this process first and then the
+uvicorn workers. Workers keep reading SQLite directly (in WAL mode), but
+every write function in database.py is sent here over a local TCP
+connection and executed one at a time per shard file, so workers never
+contend for a SQLite write lock while writes to different shards proceed
+in parallel.
+
+The writer also fans events out to every connected worker: `call_changed`
+after a write touches a call's hot state (workers drop it from their call
+state cache), and `campaigns_active` when the campaign scheduler, which
+runs once in this process rather than in every worker, starts or stops
+dialing a campaign. The call reconciliation sync (call_sync.py) and the
+read replica snapshots (replica.py) also run only here.
+
+Messages are length-prefixed JSON. To run the writer on its own (e.g. when
+starting workers with `uvicorn main:app --workers N`):
+    python db_writer.py
+"""
+
+import asyncio
+import contextlib
+import json
+import logging
+import multiprocessing
+import socket
+import struct
+import time
+
+import accounting
+import database
+import log_pipeline
+from call_sync import CallSync
+from campaigns import CampaignScheduler
+from replica import SnapshotReplica
+from config import (
+    DB_WRITER_HOST,
+    DB_WRITER_PORT,
+    LOG_LEVEL,
+    LOG_FORMAT,
+    ULTRAVOX_AGENT_ID,
+    SYNC_INTERVAL_SECONDS,
+    SYNC_REQUESTS_PER_MINUTE,
+    SYNC_PAGE_SIZE,
+    SYNC_RECHECK_BATCH,
+    SYNC_RECHECK_AGE_SECONDS,
+    REPLICA_INTERVAL_SECONDS,
+    REPLICA_PAGES_PER_STEP,
+    REPLICA_STEP_PAUSE_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+_HEADER = struct.Struct("!I")
+
+# Writes that change a call's hot state (call id is the first argument)
+CALL_STATE_WRITES = ("create_call", "update_call_status", "ingest_webhook")
+
+# Writes that return the ids of every call they changed
+CALL_BATCH_WRITES = ("sync_calls",)
+
+# Writes confined to the shard of their call id (first argument)
+CALL_SHARD_WRITES = CALL_STATE_WRITES + ("log_tool_invocation", "store_call_messages")
+
+# Writes that touch every shard; all other writes only touch shard 0
+ALL_SHARD_WRITES = ("sync_calls", "rebuild_analytics", "rebuild_search_index", "save_call_costs")
+
+
+def _send(writer: asyncio.StreamWriter, message: dict):
+    # Peers are local and always reading, so no drain() (which can't be
+    # awaited concurrently from several tasks on older Pythons)
+    body = json.dumps(message).encode()
+    writer.write(_HEADER.pack(len(body)) + body)
+
+
+async def _receive(reader: asyncio.StreamReader) -> dict:
+    (length,) = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+    return json.loads(await reader.readexactly(length))
+
+
+def _no_delay(writer: asyncio.StreamWriter):
+    sock = writer.get_extra_info("socket")
+    if sock is not None:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+
+class DBWriterError(Exception):
+    """A write failed in the DB writer process."""
+
+
+class DBWriter:
+    """Executes every database write for all workers, one at a time."""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.peers = set()
+        self.scheduler = CampaignScheduler(on_change=self._campaigns_changed)
+        self.call_sync = CallSync(
+            SYNC_INTERVAL_SECONDS, SYNC_REQUESTS_PER_MINUTE, SYNC_PAGE_SIZE,
+            SYNC_RECHECK_BATCH, SYNC_RECHECK_AGE_SECONDS, ULTRAVOX_AGENT_ID,
+        )
+        self.replica = SnapshotReplica(
+            REPLICA_INTERVAL_SECONDS, REPLICA_PAGES_PER_STEP, REPLICA_STEP_PAUSE_SECONDS
+        )
+        self.stats = {"writes": 0, "errors": 0}
+        self._locks = []
+
+    async def serve(self, ready=None):
+        """Initialize the database, start the background jobs and accept workers."""
+        await database.init_db()
+        # One writer per shard file
+        self._locks = [asyncio.Lock() for _ in range(database.SHARD_COUNT)]
+        # Writes made in this process (campaign dialing, call sync) go through the same queue
+        database.use_writer(self)
+        await self.scheduler.start()
+        await self.call_sync.start()
+        await self.replica.start()
+
+        server = await asyncio.start_server(self._handle, self.host, self.port)
+        logger.info(f"DB writer listening on {self.host}:{self.port} ({database.DB_PATH})")
+        if ready is not None:
+            ready.set()
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.scheduler.stop()
+            await self.call_sync.stop()
+            await self.replica.stop()
+
+    def _shard_locks(self, op: str, args: tuple, kwargs: dict) -> list:
+        if op in CALL_SHARD_WRITES:
+            call_id = args[0] if args else kwargs["call_id"]
+            return [self._locks[database.shard_for(call_id)]]
+        if op in ALL_SHARD_WRITES:
+            return self._locks
+        return self._locks[:1]
+
+    async def call(self, op: str, *args, **kwargs):
+        """Run a write function from database.py under its shards' writer locks."""
+        func = database.WRITE_OPERATIONS[op].__wrapped__
+        async with contextlib.AsyncExitStack() as stack:
+            # Always taken in shard order, so writes spanning shards cannot deadlock
+            for lock in self._shard_locks(op, args, kwargs):
+                await stack.enter_async_context(lock)
+            try:
+                result = await func(*args, **kwargs)
+            except Exception:
+                self.stats["errors"] += 1
+                raise
+            self.stats["writes"] += 1
+        if op in CALL_STATE_WRITES:
+            call_id = args[0] if args else kwargs["call_id"]
+            self._broadcast({"event": "call_changed", "call_id": call_id})
+        elif op in CALL_BATCH_WRITES:
+            for call_id in result:
+                self._broadcast({"event": "call_changed", "call_id": call_id})
+        return result
+
+    def _broadcast(self, event: dict):
+        for peer in list(self.peers):
+            _send(peer, event)
+
+    def _campaigns_changed(self):
+        self._broadcast({"event": "campaigns_active", "ids": self.scheduler.active_ids()})
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve one worker connection until it closes."""
+        _no_delay(writer)
+        self.peers.add(writer)
+        _send(writer, {"event": "campaigns_active", "ids": self.scheduler.active_ids()})
+        # Each request runs as its own task, so a slow write to one shard does
+        # not hold up this worker's writes to the others. Requests are not
+        # applied in arrival order (a write taking every shard's lock can be
+        # overtaken by later single-shard writes); callers that need an order
+        # wait for one write's reply before sending the next
+        tasks = set()
+        try:
+            while True:
+                message = await _receive(reader)
+                if "id" not in message:
+                    # Notifications need no reply
+                    if message["op"] == "wake_campaigns":
+                        self.scheduler.wake()
+                    continue
+                task = asyncio.create_task(self._serve_request(message, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.peers.discard(writer)
+            # Writes already received still complete; their replies are dropped
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            writer.close()
+
+    async def _serve_request(self, message: dict, writer: asyncio.StreamWriter):
+        """Run one write request and reply to it (matched by the request's id)."""
+        # Events broadcast by the write are sent before its reply, so
+        # the calling worker never sees its own write as stale
+        try:
+            if message["op"] not in database.WRITE_OPERATIONS:
+                raise ValueError(f"Unknown write operation: {message['op']}")
+            # Rows and bytes written go back to be charged to the caller's call
+            usage = accounting.collect()
+            result = await self.call(message["op"], *message["args"], **message["kwargs"])
+            reply = {"id": message["id"], "result": result}
+            if any(usage.counters.values()):
+                reply["usage"] = usage.counters
+        except Exception as e:
+            logger.error(f"Write {message['op']} failed: {e}")
+            reply = {"id": message["id"], "error": f"{type(e).__name__}: {e}"}
+        if not writer.is_closing():
+            _send(writer, reply)
+
+
+class DBWriterClient:
+    """Worker-side connection to the DB writer, used via database.use_writer()."""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.active_campaigns = set()
+        self._pending = {}
+        self._next_id = 0
+        self._writer = None
+        self._task = None
+        self._connect_lock = None
+
+    async def connect(self, timeout: float = 30):
+        """Connect to the writer, retrying while its process starts up."""
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                reader, writer = await asyncio.open_connection(self.host, self.port)
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise
+                await asyncio.sleep(0.1)
+        _no_delay(writer)
+        # Invalidations sent while we were disconnected are lost
+        database.call_cache.clear()
+        self._writer = writer
+        self._task = asyncio.create_task(self._read(reader, writer))
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def call(self, op: str, *args, **kwargs):
+        """Run a database write in the writer process and return its result."""
+        if self._writer is None:
+            if self._connect_lock is None:
+                self._connect_lock = asyncio.Lock()
+            async with self._connect_lock:
+                if self._writer is None:
+                    await self.connect(timeout=5)
+
+        self._next_id += 1
+        future = asyncio.get_running_loop().create_future()
+        self._pending[self._next_id] = future
+        _send(self._writer, {"id": self._next_id, "op": op, "args": args, "kwargs": kwargs})
+        reply = await future
+        if "usage" in reply:
+            accounting.record(**reply["usage"])
+        return reply["result"]
+
+    def notify(self, op: str):
+        """Send a fire-and-forget notification (dropped while disconnected)."""
+        if self._writer is not None:
+            _send(self._writer, {"op": op})
+
+    async def _read(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                message = await _receive(reader)
+                if "event" in message:
+                    self._handle_event(message)
+                    continue
+                future = self._pending.pop(message["id"], None)
+                if future is None or future.done():
+                    continue
+                if "error" in message:
+                    future.set_exception(DBWriterError(message["error"]))
+                else:
+                    future.set_result(message)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            logger.error("Lost connection to DB writer")
+        finally:
+            self._writer = None
+            writer.close()
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("DB writer connection lost"))
+            self._pending.clear()
+
+    def _handle_event(self, message: dict):
+        if message["event"] == "call_changed":
+            database.call_cache.invalidate(message["call_id"])
+        elif message["event"] == "campaigns_active":
+            self.active_campaigns = set(message["ids"])
+
+
+class RemoteCampaignScheduler:
+    """Worker-side stand-in for the campaign scheduler running in the DB writer."""
+
+    def __init__(self, client: DBWriterClient):
+        self.client = client
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    def wake(self):
+        self.client.notify("wake_campaigns")
+
+    def is_active(self, campaign_id: int) -> bool:
+        return campaign_id in self.client.active_campaigns
+
+
+def run(host: str = DB_WRITER_HOST, port: int = DB_WRITER_PORT, ready=None):
+    """Process entry point: serve until terminated."""
+    log_pipeline.configure_logging(LOG_LEVEL, LOG_FORMAT)
+    try:
+        asyncio.run(DBWriter(host, port).serve(ready))
+    except KeyboardInterrupt:
+        pass
+
+
+def start_process(host: str = DB_WRITER_HOST, port: int = DB_WRITER_PORT):
+    """Start the DB writer in a child process and wait until it accepts connections."""
+    ready = multiprocessing.Event()
+    process = multiprocessing.Process(
+        target=run, args=(host, port, ready), name="db-writer", daemon=True
+    )
+    process.start()
+    if not ready.wait(timeout=30):
+        process.terminate()
+        raise RuntimeError("DB writer process failed to start")
+    return process
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,130 @@
+"""
+Streaming encoders for bulk exports.
+
+Each encoder turns an async iterator of row-dict batches into an async
+iterator of bytes, so an export never holds more than one batch in memory.
+"""
+
+import csv
+import io
+import json
+import zlib
+
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+# Codecs accepted for each format; parquet compresses inside the file
+EXPORT_COMPRESSION = {
+    "ndjson": (None, "gzip"),
+    "csv": (None, "gzip"),
+    "parquet": (None, "snappy", "gzip", "zstd"),
+}
+
+
+async def _encode_ndjson(batches):
+    """Encode batches as newline-delimited JSON."""
+    async for batch in batches:
+        yield "".join(json.dumps(row, default=str) + "\n" for row in batch).encode()
+
+
+async def _encode_csv(batches):
+    """Encode batches as CSV with a header taken from the first row."""
+    writer = None
+    buffer = io.StringIO()
+    async for batch in batches:
+        if writer is None:
+            writer = csv.DictWriter(buffer, fieldnames=list(batch[0].keys()))
+            writer.writeheader()
+        writer.writerows(batch)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object that collects bytes until they are drained."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+async def _encode_parquet(batches, compression=None):
+    """Encode batches as a Parquet file, one row group per batch."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    sink = _ChunkSink()
+    writer = None
+    async for batch in batches:
+        if writer is None:
+            # Row ids are integers; everything else is stored as text
+            schema = pa.schema(
+                [(name, pa.int64() if name == "id" else pa.string()) for name in batch[0]]
+            )
+            writer = pq.ParquetWriter(sink, schema, compression=compression or "none")
+        columns = {
+            name: [row[name] if name == "id" or row[name] is None else str(row[name])
+                   for row in batch]
+            for name in schema.names
+        }
+        writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+        yield sink.drain()
+    if writer is not None:
+        writer.close()
+        yield sink.drain()
+
+
+async def _gzip(chunks):
+    """Gzip-compress a byte stream incrementally."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def check_export_options(fmt: str, compression: str = None):
+    """Raise ValueError if a format/compression combination is not supported."""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported format: {fmt}")
+    if compression not in EXPORT_COMPRESSION[fmt]:
+        raise ValueError(f"Unsupported compression for {fmt}: {compression}")
+    if fmt == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ValueError("Parquet export requires pyarrow to be installed")
+
+
+def encode_export(batches, fmt: str, compression: str = None):
+    """Return an async byte stream encoding `batches` in the requested format."""
+    if fmt == "parquet":
+        return _encode_parquet(batches, compression)
+    chunks = _encode_ndjson(batches) if fmt == "ndjson" else _encode_csv(batches)
+    if compression == "gzip":
+        chunks = _gzip(chunks)
+    return chunks
+
+
+def export_filename(table: str, fmt: str, compression: str = None) -> str:
+    """Build the download filename for an export."""
+    name = f"{table}.{EXPORT_FORMATS[fmt][1]}"
+    if compression == "gzip" and fmt != "parquet":
+        name += ".gz"
+    return name
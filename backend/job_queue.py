@@ -0,0 +1,271 @@
+"""
+Durable background job queue.
+
+Jobs live in the jobs table (see database.py), so post-call work scheduled by
+a request handler survives restarts. enqueue() only appends to an in-memory
+buffer; a flusher task writes buffered jobs in one transaction per batch, so
+handlers never wait on SQLite. Await flush() where a job must be on disk
+before responding. Completions are group-committed the same way: a job whose
+completion was not yet written when the process died runs again, so handlers
+must be idempotent (delivery is at-least-once).
+
+A dispatcher claims due jobs, highest priority first, for a pool of async
+workers. A claimed job is invisible to other claimers (including other
+worker processes) until its visibility timeout; if the process dies, the job
+becomes due again after that. Failures are retried with exponential backoff
+up to the job's max_attempts; PermanentJobError fails a job at once. An
+idempotency key makes enqueueing the same work twice a no-op.
+
+On shutdown the queue drains: it stops claiming, flushes the buffer and waits
+up to the drain timeout for running jobs, then returns the rest to the queue.
+"""
+
+import asyncio
+import json
+import logging
+import random
+import time
+from collections import deque
+
+from database import (
+    claim_jobs,
+    complete_jobs,
+    enqueue_jobs,
+    finish_job,
+    get_job_stats,
+    prune_jobs,
+    release_jobs,
+)
+
+logger = logging.getLogger(__name__)
+
+# Longest single backoff between attempts
+MAX_RETRY_DELAY_SECONDS = 300
+# How often finished jobs past their retention are deleted
+PRUNE_INTERVAL_SECONDS = 600
+# Latency samples kept for the percentiles in snapshot()
+LATENCY_SAMPLES = 1000
+
+
+class PermanentJobError(Exception):
+    """Raised by a job handler for failures that retrying cannot fix."""
+
+
+def _percentile(samples: list, pct: float):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * pct))], 4)
+
+
+class JobQueue:
+    """SQLite-backed job queue with an async worker pool."""
+
+    def __init__(self, workers: int = 4, visibility_timeout: float = 300,
+                 max_attempts: int = 5, retry_base: float = 2.0,
+                 poll_interval: float = 1.0, drain_timeout: float = 10.0,
+                 retention: float = 86400, flush_delay: float = 0.005):
+        self.workers = workers
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.poll_interval = poll_interval
+        self.drain_timeout = drain_timeout
+        self.retention = retention
+        self.flush_delay = flush_delay
+        self.handlers = {}
+        self._buffer = []
+        self._completed = []
+        self._running = {}
+        self._flush_wake = None
+        self._wake = None
+        self._tasks = []
+        self._stopping = False
+        self._wait_times = deque(maxlen=LATENCY_SAMPLES)
+        self._run_times = deque(maxlen=LATENCY_SAMPLES)
+        self.stats = {
+            "enqueued": 0,
+            "flushes": 0,
+            "claimed": 0,
+            "done": 0,
+            "retried": 0,
+            "failed": 0,
+            "released": 0,
+            "errors": 0,
+        }
+
+    def register(self, kind: str, handler):
+        """Run `handler(payload)` (a coroutine function) for jobs of this kind."""
+        self.handlers[kind] = handler
+
+    def enqueue(self, kind: str, payload: dict = None, key: str = None,
+                priority: int = 0, delay: float = 0, max_attempts: int = None):
+        """
+        Schedule a job. Returns immediately; the job is written by the flusher
+        within a few milliseconds (or at start() if the queue is not running).
+        """
+        now = time.time()
+        self._buffer.append({
+            "kind": kind,
+            "payload": payload or {},
+            "key": key,
+            "priority": priority,
+            "max_attempts": max_attempts or self.max_attempts,
+            "run_after": now + delay,
+            "enqueued_at": now,
+        })
+        self.stats["enqueued"] += 1
+        if self._flush_wake:
+            self._flush_wake.set()
+
+    async def flush(self):
+        """Write buffered jobs and completions now."""
+        batch, self._buffer = self._buffer, []
+        completed, self._completed = self._completed, []
+        try:
+            if batch:
+                await enqueue_jobs(batch)
+            if completed:
+                await complete_jobs(completed)
+        except Exception:
+            # Put them back in front of anything added meanwhile
+            self._buffer[:0] = batch
+            self._completed[:0] = completed
+            raise
+        if batch or completed:
+            self.stats["flushes"] += 1
+        if batch and self._wake:
+            self._wake.set()
+
+    async def start(self):
+        self._stopping = False
+        self._flush_wake = asyncio.Event()
+        self._wake = asyncio.Event()
+        if self._buffer:
+            self._flush_wake.set()
+        self._tasks = [
+            asyncio.create_task(self._flusher()),
+            asyncio.create_task(self._dispatch()),
+        ]
+
+    async def stop(self):
+        """Drain: stop claiming, give running jobs time to finish, then flush."""
+        self._stopping = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        if self._running:
+            _, pending = await asyncio.wait(self._running, timeout=self.drain_timeout)
+            if pending:
+                job_ids = [self._running[task] for task in pending]
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+                await release_jobs(job_ids)
+                self.stats["released"] += len(job_ids)
+                logger.warning(f"Job queue drain timed out; released {len(job_ids)} jobs")
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Job queue flush failed; {len(self._buffer)} jobs lost: {e}")
+
+    async def _flusher(self):
+        while True:
+            await self._flush_wake.wait()
+            # Let a burst of enqueues share one transaction
+            await asyncio.sleep(self.flush_delay)
+            self._flush_wake.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"Job queue flush error: {e}")
+                await asyncio.sleep(self.poll_interval)
+                self._flush_wake.set()
+
+    async def _dispatch(self):
+        """Claim due jobs whenever a worker slot is free."""
+        last_prune = 0.0
+        while True:
+            # Let slots freed together share one claim
+            await asyncio.sleep(self.flush_delay)
+            try:
+                free = self.workers - len(self._running)
+                if free > 0:
+                    jobs = await claim_jobs(free, time.time(), self.visibility_timeout)
+                    for job in jobs:
+                        task = asyncio.create_task(self._run(job))
+                        self._running[task] = job["id"]
+                        task.add_done_callback(self._finished)
+                    self.stats["claimed"] += len(jobs)
+                    if len(jobs) == free:
+                        # There may be more due; claim again once a slot frees up
+                        await self._wake.wait()
+                        continue
+                if time.time() - last_prune > PRUNE_INTERVAL_SECONDS:
+                    last_prune = time.time()
+                    await prune_jobs(last_prune - self.retention)
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"Job dispatcher error: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    def _finished(self, task: asyncio.Task):
+        self._running.pop(task, None)
+        if not self._stopping:
+            self._wake.set()
+
+    def _retry_delay(self, attempt: int, error: Exception) -> float:
+        delay = min(self.retry_base * 2 ** (attempt - 1), MAX_RETRY_DELAY_SECONDS)
+        delay *= random.uniform(0.5, 1.0)
+        return max(delay, getattr(error, "retry_after", 0) or 0)
+
+    async def _run(self, job: dict):
+        """Run one claimed job and record its outcome."""
+        started = time.time()
+        self._wait_times.append(started - job["run_after"])
+        try:
+            handler = self.handlers.get(job["kind"])
+            if handler is None:
+                raise PermanentJobError(f"No handler for job kind '{job['kind']}'")
+            if job["attempts"] > job["max_attempts"]:
+                # Only reachable when claims expired, e.g. the process kept dying mid-job
+                raise PermanentJobError("Attempts exhausted (visibility timeout expired)")
+            await handler(json.loads(job["payload"]))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            if not isinstance(e, PermanentJobError) and job["attempts"] < job["max_attempts"]:
+                run_after = time.time() + self._retry_delay(job["attempts"], e)
+                await finish_job(job["id"], "queued", error=error, run_after=run_after)
+                self.stats["retried"] += 1
+            else:
+                logger.warning(f"Job {job['id']} ({job['kind']}) failed: {error}")
+                await finish_job(job["id"], "failed", error=error)
+                self.stats["failed"] += 1
+            return
+        finally:
+            self._run_times.append(time.time() - started)
+        self._completed.append(job["id"])
+        self._flush_wake.set()
+        self.stats["done"] += 1
+
+    async def snapshot(self) -> dict:
+        """Counters, latency percentiles and queue depth from the jobs table."""
+        wait_times, run_times = list(self._wait_times), list(self._run_times)
+        return {
+            **self.stats,
+            "buffered": len(self._buffer),
+            "unacked": len(self._completed),
+            "running": len(self._running),
+            "wait_seconds": {"p50": _percentile(wait_times, 0.5), "p95": _percentile(wait_times, 0.95)},
+            "run_seconds": {"p50": _percentile(run_times, 0.5), "p95": _percentile(run_times, 0.95)},
+            "table": await get_job_stats(time.time()),
+        }
@@ -0,0 +1,267 @@
+"""
+Async load generator for the backend API.
+
+Drives a weighted mix of call creation, webhook deliveries, tool invocations
+and dashboard reads at a target request rate (open loop), then reports
+p50/p95/p99 latency and throughput per endpoint. Results can be saved as a
+baseline and compared against later runs.
+
+Run the backend against the mock Ultravox server first:
+    python mock_ultravox.py --port 9000
+    ULTRAVOX_API_BASE=http://127.0.0.1:9000/api python main.py
+
+Then:
+    python load_test.py --rps 200 --duration 30 --save-baseline baseline.json
+    python load_test.py --rps 200 --duration 30 --compare baseline.json
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+import uuid
+
+import httpx
+
+# Scenario name -> relative weight in the request mix
+DEFAULT_MIX = {
+    "create_call": 1,
+    "webhook": 4,
+    "tool_invocation": 3,
+    "dashboard_list": 1,
+    "dashboard_detail": 2,
+    "analytics": 1,
+}
+
+SENTIMENTS = ["angry", "frustrated", "neutral", "satisfied", "very_satisfied"]
+PHASES = ["initial_contact", "understanding_issue", "providing_solution", "closing_conversation"]
+
+
+def percentile(sorted_values, fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+class LoadTest:
+    """Open-loop request generator with per-endpoint latency recording."""
+
+    def __init__(self, base_url: str, mix: dict, max_outstanding: int):
+        self.client = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=30,
+            limits=httpx.Limits(max_connections=max_outstanding),
+        )
+        self.mix = mix
+        self.max_outstanding = max_outstanding
+        self.call_ids = []
+        self.latencies = {}
+        self.errors = {}
+        self.dropped = 0
+
+    async def seed(self, count: int):
+        """Create some calls up front so webhook/tool/detail scenarios have targets."""
+        for _ in range(count):
+            await self.create_call()
+        if not self.call_ids:
+            # Call creation failed (no Ultravox stand-in?); create calls via webhooks
+            for _ in range(count):
+                await self.webhook(event="call.started")
+
+    async def _request(self, label: str, method: str, url: str, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            response, ok = None, False
+        elapsed = (time.perf_counter() - started) * 1000
+        self.latencies.setdefault(label, []).append(elapsed)
+        if not ok:
+            self.errors[label] = self.errors.get(label, 0) + 1
+        return response if ok else None
+
+    async def create_call(self):
+        response = await self._request(
+            "POST /api/calls", "POST", "/api/calls", json={"metadata": {"source": "load"}}
+        )
+        if response is not None:
+            self.call_ids.append(response.json()["call_id"])
+
+    async def webhook(self, event: str = None):
+        if event == "call.started" or not self.call_ids:
+            call_id = str(uuid.uuid4())
+            event = "call.started"
+            self.call_ids.append(call_id)
+        else:
+            call_id = random.choice(self.call_ids)
+            event = event or random.choice(["call.joined", "call.ended"])
+        call = {"callId": call_id, "agentId": "load-agent"}
+        if event == "call.joined":
+            call["joined"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        elif event == "call.ended":
+            call.update(ended=time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                        endReason="hangup", shortSummary="Load test call",
+                        summary="Synthetic call generated by the load test.")
+        await self._request("POST /api/webhook", "POST", "/api/webhook",
+                            json={"event": event, "call": call})
+
+    async def tool_invocation(self):
+        if not self.call_ids:
+            return
+        call_id = random.choice(self.call_ids)
+        if random.random() < 0.3:
+            await self._request(
+                "POST /api/tools/escalate_to_human", "POST", "/api/tools/escalate_to_human",
+                json={
+                    "call_id": call_id,
+                    "escalation_reason": "Customer requests a technician",
+                    "priority_level": random.choice(["low", "medium", "high", "critical"]),
+                    "context_summary": "Laptop not booting after update",
+                    "customer_sentiment": random.choice(SENTIMENTS),
+                },
+            )
+        else:
+            await self._request(
+                "POST /api/tools/log_call_engagement", "POST", "/api/tools/log_call_engagement",
+                json={
+                    "call_id": call_id,
+                    "call_phase": random.choice(PHASES),
+                    "customer_sentiment": random.choice(SENTIMENTS),
+                    "resolution_likelihood": random.randint(0, 100),
+                    "issue_resolved": random.random() < 0.5,
+                    "engagement_notes": "Synthetic engagement from the load test",
+                },
+            )
+
+    async def dashboard_list(self):
+        await self._request("GET /api/calls", "GET", "/api/calls")
+
+    async def dashboard_detail(self):
+        if self.call_ids:
+            call_id = random.choice(self.call_ids)
+            await self._request("GET /api/calls/{call_id}", "GET", f"/api/calls/{call_id}")
+
+    async def analytics(self):
+        await self._request("GET /api/analytics", "GET", "/api/analytics")
+
+    async def run(self, rps: float, duration: float) -> float:
+        """Fire requests at `rps` for `duration` seconds; return wall time."""
+        scenarios = list(self.mix)
+        weights = [self.mix[name] for name in scenarios]
+        outstanding = set()
+        interval = 1 / rps
+        started = time.perf_counter()
+        next_at = started
+
+        while next_at - started < duration:
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            next_at += interval
+
+            outstanding = {task for task in outstanding if not task.done()}
+            if len(outstanding) >= self.max_outstanding:
+                # Open loop: count requests we could not issue instead of slowing down
+                self.dropped += 1
+                continue
+            scenario = random.choices(scenarios, weights)[0]
+            outstanding.add(asyncio.create_task(getattr(self, scenario)()))
+
+        if outstanding:
+            await asyncio.gather(*outstanding)
+        return time.perf_counter() - started
+
+    def report(self, wall_time: float) -> dict:
+        """Per-endpoint latency percentiles and throughput."""
+        results = {}
+        for label, values in sorted(self.latencies.items()):
+            values.sort()
+            results[label] = {
+                "requests": len(values),
+                "errors": self.errors.get(label, 0),
+                "throughput_rps": round(len(values) / wall_time, 1),
+                "p50_ms": round(percentile(values, 0.50), 2),
+                "p95_ms": round(percentile(values, 0.95), 2),
+                "p99_ms": round(percentile(values, 0.99), 2),
+            }
+        return results
+
+
+def print_report(results: dict, baseline: dict = None, threshold: float = 0.2) -> bool:
+    """Print results (with deltas against a baseline); return False on regression."""
+    ok = True
+    print(f"{'endpoint':<38} {'reqs':>6} {'err':>5} {'rps':>8} "
+          f"{'p50':>9} {'p95':>9} {'p99':>9}")
+    for label, row in results.items():
+        line = (f"{label:<38} {row['requests']:>6} {row['errors']:>5} "
+                f"{row['throughput_rps']:>8} {row['p50_ms']:>9} {row['p95_ms']:>9} "
+                f"{row['p99_ms']:>9}")
+        before = (baseline or {}).get(label)
+        if before and before["p95_ms"]:
+            change = (row["p95_ms"] - before["p95_ms"]) / before["p95_ms"]
+            line += f"  p95 {change:+.0%}"
+            if change > threshold:
+                line += "  REGRESSION"
+                ok = False
+        print(line)
+    return ok
+
+
+async def main_async(args) -> bool:
+    mix = dict(DEFAULT_MIX)
+    for item in args.mix or []:
+        name, weight = item.split("=")
+        mix[name] = float(weight)
+    mix = {name: weight for name, weight in mix.items() if weight > 0}
+
+    test = LoadTest(args.base_url, mix, args.max_outstanding)
+    try:
+        await test.seed(args.seed_calls)
+        wall_time = await test.run(args.rps, args.duration)
+    finally:
+        await test.client.aclose()
+
+    results = test.report(wall_time)
+    total = sum(row["requests"] for row in results.values())
+    print(f"\n{total} requests in {wall_time:.1f}s ({total / wall_time:.1f} rps, "
+          f"target {args.rps}); {test.dropped} dropped at max outstanding\n")
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+    ok = print_report(results, baseline, args.regression_threshold)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump({"rps": args.rps, "duration": args.duration, "mix": mix,
+                       "results": results}, f, indent=2)
+        print(f"\nBaseline saved to {args.save_baseline}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backend load generator")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--rps", type=float, default=100)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--max-outstanding", type=int, default=200)
+    parser.add_argument("--seed-calls", type=int, default=20)
+    parser.add_argument("--mix", nargs="*", help="Override weights, e.g. webhook=10 analytics=0")
+    parser.add_argument("--save-baseline")
+    parser.add_argument("--compare")
+    parser.add_argument("--regression-threshold", type=float, default=0.2,
+                        help="Allowed p95 increase over the baseline (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    if not asyncio.run(main_async(args)):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
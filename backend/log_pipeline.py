@@ -0,0 +1,206 @@
+"""
+Queue-based logging pipeline.
+
+Logging calls on the event loop only tag the record and append it to an
+in-memory queue; a background thread drains the queue, formats records as
+JSON lines (or plain text) and writes each batch with a single write.
+
+Every record carries the correlation id of the request that produced it.
+Successful requests are sampled per route: for an unsampled request its
+DEBUG/INFO records are dropped, while warnings and errors are always
+written, as is the access line of any request that fails. The queue is
+unbounded and drained at exit, so nothing at WARNING or above is lost.
+"""
+
+import atexit
+import contextvars
+import json
+import logging
+import queue
+import random
+import sys
+import threading
+from datetime import datetime, timezone
+
+# Correlation id and sampling decision of the request being handled
+request_id_var = contextvars.ContextVar("request_id", default=None)
+sampled_var = contextvars.ContextVar("log_sampled", default=True)
+
+# LogRecord attributes that are not `extra` fields (plus uvicorn's colored copy)
+_RECORD_FIELDS = set(vars(logging.makeLogRecord({}))) | {
+    "message", "asctime", "request_id", "color_message",
+}
+
+_handler = None
+_writer = None
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line, including any `extra` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """The previous plain-text format, with the correlation id appended."""
+
+    def __init__(self):
+        super().__init__("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        request_id = getattr(record, "request_id", None)
+        return f"{line} [{request_id}]" if request_id else line
+
+
+class QueueLogHandler(logging.Handler):
+    """Non-blocking handler: applies sampling, tags records and queues them."""
+
+    def __init__(self, records: queue.SimpleQueue):
+        super().__init__()
+        self.records = records
+        self.sampled_out = 0
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        # No handler lock needed: SimpleQueue.put is thread-safe
+        if record.levelno < logging.WARNING and not sampled_var.get():
+            self.sampled_out += 1
+            return False
+        record.request_id = request_id_var.get()
+        self.records.put(record)
+        return True
+
+    def emit(self, record: logging.LogRecord):
+        self.handle(record)
+
+
+class BatchWriter(threading.Thread):
+    """Background thread writing queued records in batches."""
+
+    def __init__(self, records: queue.SimpleQueue, stream, formatter: logging.Formatter,
+                 batch_size: int = 1000):
+        super().__init__(name="log-writer", daemon=True)
+        self.records = records
+        self.stream = stream
+        self.formatter = formatter
+        self.batch_size = batch_size
+        self.stats = {"written": 0, "batches": 0}
+
+    def run(self):
+        stopping = False
+        while not stopping:
+            batch = [self.records.get()]
+            # Whatever queued up while we were writing goes in the same batch
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.records.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                stopping = True
+                batch = [record for record in batch if record is not None]
+            if batch:
+                self._write(batch)
+
+    def _write(self, batch: list):
+        lines = []
+        for record in batch:
+            try:
+                lines.append(self.formatter.format(record))
+            except Exception as e:
+                lines.append(f"{record.levelname} {record.name} unformattable record: {e}")
+        try:
+            self.stream.write("\n".join(lines) + "\n")
+            self.stream.flush()
+        except (OSError, ValueError):
+            return
+        self.stats["written"] += len(lines)
+        self.stats["batches"] += 1
+
+    def stop(self, timeout: float = 5.0):
+        """Write everything still queued, then exit."""
+        self.records.put(None)
+        self.join(timeout)
+
+
+def parse_sample_rates(spec: str) -> list:
+    """Parse "prefix=rate,..." into (prefix, rate) pairs, longest prefix first."""
+    rates = []
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        prefix, _, rate = item.partition("=")
+        rates.append((prefix.strip(), float(rate)))
+    return sorted(rates, key=lambda pair: len(pair[0]), reverse=True)
+
+
+def sample_rate(path: str, rates: list, default: float) -> float:
+    """Fraction of successful requests to `path` whose INFO logs are kept."""
+    for prefix, rate in rates:
+        if path.startswith(prefix):
+            return rate
+    return default
+
+
+def start_request(request_id: str, rate: float):
+    """Bind a correlation id and a sampling decision to the current request."""
+    request_id_var.set(request_id)
+    sampled_var.set(rate >= 1 or random.random() < rate)
+
+
+def keep_request_logs():
+    """Force the rest of this request's logs to be written (e.g. it failed)."""
+    sampled_var.set(True)
+
+
+def configure_logging(level: str = "INFO", fmt: str = "json", stream=None):
+    """Route all logging (including uvicorn's) through the queue and writer thread."""
+    global _handler, _writer
+    if _writer is not None:
+        return
+
+    records = queue.SimpleQueue()
+    formatter = JSONFormatter() if fmt == "json" else TextFormatter()
+    _handler = QueueLogHandler(records)
+    _writer = BatchWriter(records, stream or sys.stderr, formatter)
+    _writer.start()
+    atexit.register(_writer.stop)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_handler)
+    root.setLevel(level.upper())
+
+    # uvicorn's own handlers write synchronously; send its logs through the
+    # pipeline instead, and drop its access log (we log requests ourselves)
+    for name in ("uvicorn", "uvicorn.error"):
+        logging.getLogger(name).handlers = []
+        logging.getLogger(name).propagate = True
+    logging.getLogger("uvicorn.access").handlers = []
+    logging.getLogger("uvicorn.access").propagate = False
+
+
+def stats() -> dict:
+    """Pipeline counters for the metrics endpoint."""
+    if _writer is None:
+        return {}
+    return {
+        **_writer.stats,
+        "queued": _writer.records.qsize(),
+        "sampled_out": _handler.sampled_out,
+    }
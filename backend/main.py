@@ -1,13 +1,41 @@
 from config import (
-    ULTRAVOX_API_KEY,
     ULTRAVOX_AGENT_ID,
-    ULTRAVOX_API_BASE,
     HOST,
     PORT,
-    SIP_DOMAIN,
+    DEV_MODE,
+    LOG_LEVEL,
+    LOG_FORMAT,
+    LOG_SAMPLE_RATE,
+    LOG_SAMPLE_RATES,
+    WORKERS,
+    DB_WRITER_HOST,
+    DB_WRITER_PORT,
     SIP_USERNAME,
     SIP_PASSWORD,
-    SIP_FROM_NUMBER,
+    CAMPAIGN_CALLS_PER_SECOND,
+    CAMPAIGN_MAX_CONCURRENT,
+    CAMPAIGN_MAX_ATTEMPTS,
+    SYNC_INTERVAL_SECONDS,
+    SYNC_REQUESTS_PER_MINUTE,
+    SYNC_PAGE_SIZE,
+    SYNC_RECHECK_BATCH,
+    SYNC_RECHECK_AGE_SECONDS,
+    JOB_WORKERS,
+    JOB_VISIBILITY_TIMEOUT_SECONDS,
+    JOB_MAX_ATTEMPTS,
+    JOB_RETRY_BASE_SECONDS,
+    JOB_POLL_INTERVAL_SECONDS,
+    JOB_DRAIN_TIMEOUT_SECONDS,
+    JOB_RETENTION_SECONDS,
+    REPLICA_INTERVAL_SECONDS,
+    REPLICA_PAGES_PER_STEP,
+    REPLICA_STEP_PAUSE_SECONDS,
+    CALL_POOL_SIZE,
+    CALL_POOL_JOIN_TIMEOUT_SECONDS,
+    CALL_POOL_MAX_AGE_SECONDS,
+    TRACE_SLOW_MS,
+    TRACE_BUFFER_SIZE,
+    TRACE_MAX_SPANS,
     get_webhook_url,
     validate_config,
 )
@@ -15,17 +43,77 @@ from database import (
     init_db,
     create_call,
     update_call_status,
-    log_webhook,
+    ingest_webhook,
     log_tool_invocation,
-    get_call,
+    get_call_detail_json,
+    get_call_state,
+    get_call_version,
+    get_data_version,
     get_all_calls,
-    get_call_webhooks,
-    get_call_tool_invocations,
+    get_analytics,
+    search_calls,
+    iter_export_rows,
+    get_export_high_water_mark,
+    get_export_cursor,
+    save_export_cursor,
+    save_call_costs,
+    get_top_call_costs,
+    get_agent_costs,
+    parse_export_cursor,
+    format_export_cursor,
+    store_call_messages,
+    get_stored_messages,
+    create_campaign,
+    get_campaign,
+    get_all_campaigns,
+    set_campaign_status,
+    use_writer,
+    replica_age,
+    POOL_METADATA_KEY,
+    ROLLUP_DIMENSIONS,
+    WEBHOOK_TIMESTAMP_FIELDS,
+    EXPORT_TABLES,
+    DB_STATS,
+    call_cache,
+    webhook_keys,
 )
-from fastapi import FastAPI, HTTPException, Request
+from export import (
+    EXPORT_FORMATS,
+    check_export_options,
+    encode_export,
+    export_filename,
+)
+from assets import AssetStore
+from call_pool import CallPool
+from call_sync import CallSync
+from campaigns import CampaignScheduler
+from chat_replies import ChatReplyWatcher
+from db_writer import DBWriterClient, RemoteCampaignScheduler, start_process
+from job_queue import JobQueue
+from replica import SnapshotReplica
+import accounting
+import log_pipeline
+from responses import FastJSONResponse
+from tracing import Tracer, chrome_trace
+from transcripts import JOB_KIND as TRANSCRIPT_JOB, store_transcript, transcript_job_key
+from ultravox_api import (
+    create_agent_call,
+    get_call_messages as get_ultravox_messages,
+    sip_outbound_payload,
+    ultravox_request,
+    upstream,
+    webrtc_call_payload,
+)
+from upstream import UpstreamUnavailable
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, HTMLResponse
+from fastapi.responses import (
+    FileResponse,
+    HTMLResponse,
+    JSONResponse,
+    Response,
+    StreamingResponse,
+)
 from pydantic import BaseModel, Field
 from typing import Optional, Dict, Any, List
 from pathlib import Path
@@ -33,11 +121,12 @@ import requests
 from datetime import datetime
 import uvicorn
 import logging
+import os
+import time
+import uuid
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
+# Configure logging (queued, batched and written off the event loop)
+log_pipeline.configure_logging(LOG_LEVEL, LOG_FORMAT)
 logger = logging.getLogger(__name__)
 
 
@@ -45,7 +134,10 @@ app = FastAPI(
     title="Ultravox Integration API",
     description="Backend API for Ultravox voice agent integration",
     version="1.0.0",
+    default_response_class=FastJSONResponse,
 )
+# Handlers run with per-call resource accounting (see accounting.py)
+app.router.route_class = accounting.AccountedRoute
 
 # CORS middleware
 app.add_middleware(
@@ -56,28 +148,77 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Request logging middleware
+
+@app.exception_handler(UpstreamUnavailable)
+async def upstream_unavailable_handler(request: Request, exc: UpstreamUnavailable):
+    """Fail fast with 503 when Ultravox admission control rejects a request."""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": f"Ultravox unavailable: {exc.reason}"},
+        headers={"Retry-After": str(max(1, round(exc.retry_after)))},
+    )
+
+
+# Request counters by route group, for per-request DB query rates
+REQUEST_STATS = {"total": 0, "tool_calls": 0, "webhooks": 0}
+
+# Webhook deliveries applied vs. acknowledged as duplicates
+WEBHOOK_STATS = {"ingested": 0, "duplicates": 0, "ignored": 0}
+
+# Per-route sampling of success logs (errors are always logged)
+LOG_SAMPLING = log_pipeline.parse_sample_rates(LOG_SAMPLE_RATES)
+
+# Request traces; slow ones are kept for /api/debug/traces
+tracer = Tracer(TRACE_SLOW_MS, TRACE_BUFFER_SIZE, TRACE_MAX_SPANS)
 
 
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
-    logger.info(f">>> {request.method} {request.url.path}")
-    response = await call_next(request)
+    REQUEST_STATS["total"] += 1
+    if request.url.path.startswith("/api/tools/"):
+        REQUEST_STATS["tool_calls"] += 1
+    elif request.url.path == "/api/webhook":
+        REQUEST_STATS["webhooks"] += 1
+
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    log_pipeline.start_request(
+        request_id,
+        log_pipeline.sample_rate(request.url.path, LOG_SAMPLING, LOG_SAMPLE_RATE),
+    )
+    # The trace shares the request id, so a slow trace can be matched to its logs
+    trace = tracer.start(request_id, f"{request.method} {request.url.path}")
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+    except Exception:
+        tracer.finish(trace, status=500)
+        raise
+    tracer.finish(trace, status=response.status_code)
+    if response.status_code >= 400:
+        log_pipeline.keep_request_logs()
     logger.info(
-        f"<<< {request.method} {request.url.path} - Status: {response.status_code}"
+        f"{request.method} {request.url.path} - Status: {response.status_code}",
+        extra={
+            "method": request.method,
+            "path": request.url.path,
+            "status": response.status_code,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+        },
     )
+    response.headers["X-Request-ID"] = request_id
     return response
 
 
 # Pydantic Models
+DEFAULT_FIRST_SPEAKER_PROMPT = "(New Call) Respond as if you are answering the phone."
+
+
 class CreateCallRequest(BaseModel):
     """Request model for creating a new call."""
 
     metadata: Optional[Dict[str, str]] = Field(default_factory=dict)
     recording_enabled: bool = Field(default=True)
-    first_speaker_prompt: Optional[str] = Field(
-        default="(New Call) Respond as if you are answering the phone."
-    )
+    first_speaker_prompt: Optional[str] = Field(default=DEFAULT_FIRST_SPEAKER_PROMPT)
 
 
 class CreateCallResponse(BaseModel):
@@ -154,6 +295,23 @@ class CreateSIPCallResponse(BaseModel):
     to_number: Optional[str] = None
 
 
+class CampaignTarget(BaseModel):
+    """A single number to dial in an outbound campaign."""
+
+    to_number: str
+    template_context: Optional[Dict[str, str]] = Field(default_factory=dict)
+
+
+class CreateCampaignRequest(BaseModel):
+    """Request model for creating an outbound SIP campaign."""
+
+    name: str
+    targets: List[CampaignTarget] = Field(..., min_length=1)
+    calls_per_second: float = Field(default=CAMPAIGN_CALLS_PER_SECOND, gt=0)
+    max_concurrent: int = Field(default=CAMPAIGN_MAX_CONCURRENT, ge=1)
+    max_attempts: int = Field(default=CAMPAIGN_MAX_ATTEMPTS, ge=1)
+
+
 class CreateChatRequest(BaseModel):
     """Request model for creating a text chat session."""
 
@@ -182,21 +340,61 @@ class CreateChatResponse(BaseModel):
     message: str
 
 
+# With several workers, writes, campaign dialing and call sync happen in the DB writer process
+db_writer = DBWriterClient(DB_WRITER_HOST, DB_WRITER_PORT) if WORKERS > 1 else None
+campaign_scheduler = RemoteCampaignScheduler(db_writer) if db_writer else CampaignScheduler()
+chat_replies = ChatReplyWatcher(get_ultravox_messages)
+# Each worker process runs its own job pool; claims are atomic across processes
+job_queue = JobQueue(
+    workers=JOB_WORKERS,
+    visibility_timeout=JOB_VISIBILITY_TIMEOUT_SECONDS,
+    max_attempts=JOB_MAX_ATTEMPTS,
+    retry_base=JOB_RETRY_BASE_SECONDS,
+    poll_interval=JOB_POLL_INTERVAL_SECONDS,
+    drain_timeout=JOB_DRAIN_TIMEOUT_SECONDS,
+    retention=JOB_RETENTION_SECONDS,
+)
+job_queue.register(TRANSCRIPT_JOB, store_transcript)
+call_sync = None if db_writer else CallSync(
+    SYNC_INTERVAL_SECONDS, SYNC_REQUESTS_PER_MINUTE, SYNC_PAGE_SIZE,
+    SYNC_RECHECK_BATCH, SYNC_RECHECK_AGE_SECONDS, ULTRAVOX_AGENT_ID,
+)
+replica = None if db_writer else SnapshotReplica(
+    REPLICA_INTERVAL_SECONDS, REPLICA_PAGES_PER_STEP, REPLICA_STEP_PAUSE_SECONDS
+)
+# Pooled calls use the CreateCallRequest defaults
+call_pool = CallPool(
+    CALL_POOL_SIZE, CALL_POOL_MAX_AGE_SECONDS, CALL_POOL_JOIN_TIMEOUT_SECONDS,
+    recording_enabled=True, first_speaker_prompt=DEFAULT_FIRST_SPEAKER_PROMPT,
+)
+assets = AssetStore(Path(__file__).parent.parent / "frontend", reload=DEV_MODE)
+
+
 # Startup event
 @app.on_event("startup")
 async def startup_event():
     """Initialize database and validate configuration on startup."""
     try:
-        await init_db()
+        if db_writer:
+            await db_writer.connect()
+            use_writer(db_writer)
+        else:
+            await init_db()
         validate_config()
-
-        # Mount static files AFTER routes are set up
-        frontend_path = Path(__file__).parent.parent / "frontend"
-        if frontend_path.exists():
-            app.mount(
-                "/static", StaticFiles(directory=str(frontend_path)), name="static"
-            )
-            logger.info(f"✓ Static files mounted from: {frontend_path}")
+        await campaign_scheduler.start()
+        await job_queue.start()
+        await call_pool.start()
+        await accounting.ledger.start(save_call_costs)
+        if call_sync:
+            await call_sync.start()
+        if replica:
+            await replica.start()
+
+        # Load the frontend into memory with precompressed variants
+        if assets.directory.exists():
+            assets.load()
+            sizes = ", ".join(f"{enc} {size} B" for enc, size in assets.stats().items())
+            logger.info(f"✓ Frontend assets loaded from: {assets.directory} ({sizes})")
 
         logger.info("=" * 60)
         logger.info(f"Server starting on http://{HOST}:{PORT}")
@@ -214,31 +412,70 @@ async def startup_event():
         raise
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background workers."""
+    await campaign_scheduler.stop()
+    await job_queue.stop()
+    await call_pool.stop()
+    await accounting.ledger.stop()
+    if call_sync:
+        await call_sync.stop()
+    if replica:
+        await replica.stop()
+    if db_writer:
+        await db_writer.close()
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    """Whether the request's If-None-Match header already names this ETag."""
+    header = request.headers.get("if-none-match", "")
+    return header.strip() == "*" or etag in [tag.strip() for tag in header.split(",")]
+
+
+def _not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+
+def _with_etag(content: Dict[str, Any], etag: str) -> FastJSONResponse:
+    return FastJSONResponse(content=content, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+
+async def _chunks(content: bytes, size: int = 64 * 1024):
+    """Send an encoded document in pieces instead of one large write."""
+    for start in range(0, len(content), size):
+        yield content[start:start + size]
+
+
+def _staleness_headers(age: Optional[float]) -> Dict[str, str]:
+    """Whether a reporting read was served from the replica, and how stale its data may be."""
+    if age is None:
+        return {"X-Data-Source": "primary", "X-Data-Staleness-Seconds": "0"}
+    return {"X-Data-Source": "replica", "X-Data-Staleness-Seconds": f"{age:.3f}"}
+
+
+def _serve_asset(request: Request, name: str):
+    """Serve an in-memory asset with content negotiation and ETag revalidation."""
+    asset, cache_control = assets.get(name)
+    if asset is None:
+        return None
+
+    encoding, body, etag = asset.select(request.headers.get("accept-encoding", ""))
+    headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type=asset.content_type, headers=headers)
+
+
 # Serve frontend at root
 @app.get("/", response_class=HTMLResponse)
 async def serve_frontend(request: Request):
     """Serve the frontend dashboard."""
-    logger.info("=== ROOT ROUTE HIT ===")
-
-    frontend_path = Path(__file__).parent.parent / "frontend"
-    frontend_file = frontend_path / "index.html"
-
-    logger.info(f"Frontend path: {frontend_path}")
-    logger.info(f"Frontend file: {frontend_file}")
-    logger.info(f"File exists: {frontend_file.exists()}")
-
-    if frontend_file.exists():
-        logger.info("Serving index.html")
-        with open(frontend_file, "r", encoding="utf-8") as f:
-            html_content = f.read()
-        return HTMLResponse(
-            content=html_content,
-            headers={
-                "Cache-Control": "no-cache, no-store, must-revalidate",
-                "Pragma": "no-cache",
-                "Expires": "0",
-            },
-        )
+    response = _serve_asset(request, "index.html")
+    if response is not None:
+        return response
 
     logger.error("Frontend file not found!")
     return HTMLResponse(content="""
@@ -249,16 +486,21 @@ async def serve_frontend(request: Request):
             <p>API is running at /api/</p>
         </body>
     </html>
-    """.format(frontend_file))
+    """.format(assets.directory / "index.html"))
 
 
-# Test endpoint
+@app.get("/static/{name:path}")
+async def serve_static(name: str, request: Request):
+    """Serve frontend assets (content-hashed names are cached immutably)."""
+    response = _serve_asset(request, name)
+    if response is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return response
 
 
 @app.get("/test")
 async def test_route():
     """Test that routes are working."""
-    logger.info("TEST ROUTE HIT!")
     return {"message": "Routes are working!", "path": "/test"}
 
 
@@ -268,7 +510,6 @@ async def test_route():
 @app.get("/health")
 async def health():
     """Health check endpoint."""
-    logger.info("HEALTH ROUTE HIT!")
     return {
         "status": "running",
         "service": "Ultravox Integration API",
@@ -276,118 +517,207 @@ async def health():
     }
 
 
+@app.get("/api/metrics")
+async def metrics():
+    """Internal counters: database connections and call state cache efficiency."""
+    # Counters are per worker process in multi-worker mode
+    return {
+        "worker_pid": os.getpid(),
+        "database": dict(DB_STATS),
+        "call_cache": call_cache.stats(),
+        "requests": dict(REQUEST_STATS),
+        "webhooks": {**WEBHOOK_STATS, "recent_keys": webhook_keys.stats()},
+        "logging": log_pipeline.stats(),
+        "chat_replies": chat_replies.snapshot(),
+        "jobs": await job_queue.snapshot(),
+        "call_pool": call_pool.snapshot(),
+        "tracing": tracer.snapshot(),
+        "call_costs": accounting.ledger.snapshot(),
+        # Runs in the DB writer process in multi-worker mode
+        "call_sync": call_sync.snapshot() if call_sync else None,
+        "replica": replica.snapshot() if replica else {"age_seconds": replica_age()},
+    }
+
+
+@app.get("/api/debug/traces")
+async def list_traces(format: str = "json", limit: int = Query(50, ge=1, le=1000)):
+    """
+    Recent slow requests (this worker only), newest first: time spent in
+    SQLite, Ultravox and serialization per request. `format=chrome` exports
+    them as Chrome trace-event JSON for chrome://tracing or Perfetto.
+    """
+    if format not in ("json", "chrome"):
+        raise HTTPException(status_code=400, detail="Invalid format")
+    traces = list(tracer.traces)[::-1][:limit]
+    if format == "chrome":
+        return chrome_trace(traces)
+    return {"traces": [trace.summary() for trace in traces], **tracer.snapshot()}
+
+
+@app.get("/api/debug/traces/{trace_id}")
+async def get_trace(trace_id: str, format: str = "json"):
+    """All spans of one kept trace (its id is the request's X-Request-ID)."""
+    if format not in ("json", "chrome"):
+        raise HTTPException(status_code=400, detail="Invalid format")
+    trace = tracer.get(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Trace not found (not slow, or evicted)")
+    return chrome_trace([trace]) if format == "chrome" else trace.to_dict()
+
+
+@app.get("/api/upstream/status")
+async def upstream_status():
+    """Rate limit, adaptive concurrency and circuit breaker state for Ultravox."""
+    return upstream.snapshot()
+
+
 # Call Management Endpoints
 @app.post("/api/calls", response_model=CreateCallResponse)
 async def create_ultravox_call(request: CreateCallRequest):
     """
     Create a new Ultravox call.
     Returns the call_id and join_url (WebRTC URL) for client to connect.
+    A pre-created call from the warm pool is used when one fits the request.
     """
     logger.info(f"Creating call with metadata: {request.metadata}")
     try:
-        # Prepare the payload for Ultravox API
-        payload = {
-            "medium": {"webRtc": {}},
-            "recordingEnabled": request.recording_enabled,
-            "metadata": request.metadata,
-            "firstSpeakerSettings": {"agent": {"prompt": request.first_speaker_prompt}},
-            "callbacks": {
-                "joined": {"url": get_webhook_url()},
-                "ended": {"url": get_webhook_url()},
-            },
-        }
-
-        # Make request to Ultravox API
-        headers = {"X-API-Key": ULTRAVOX_API_KEY, "Content-Type": "application/json"}
-
-        url = f"{ULTRAVOX_API_BASE}/agents/{ULTRAVOX_AGENT_ID}/calls"
-        response = requests.post(url, json=payload, headers=headers)
-
-        if response.status_code != 201:
-            raise HTTPException(
-                status_code=response.status_code,
-                detail=f"Ultravox API error: {response.text}",
-            )
+        response_data = call_pool.take(request.recording_enabled, request.first_speaker_prompt)
+        if response_data is None:
+            # Make request to Ultravox API
+            response = await create_agent_call(webrtc_call_payload(
+                request.metadata, request.recording_enabled, request.first_speaker_prompt
+            ))
+
+            if response.status_code != 201:
+                raise HTTPException(
+                    status_code=response.status_code,
+                    detail=f"Ultravox API error: {response.text}",
+                )
+            response_data = response.json()
 
-        response_data = response.json()
         call_id = response_data.get("callId")
         join_url = response_data.get("joinUrl")
+        accounting.bind(call_id)
 
-        # Store in database
+        # Store in database; for pooled calls this is where the metadata is bound
         await create_call(
             call_id=call_id,
             agent_id=ULTRAVOX_AGENT_ID,
             join_url=join_url,
             response_json=response_data,
+            metadata=request.metadata,
         )
 
-        return CreateCallResponse(
-            call_id=call_id,
-            join_url=join_url,
-            agent_id=ULTRAVOX_AGENT_ID,
-            status="created",
-            message="Call created successfully",
+        # Built directly: skips response_model re-validation of our own data
+        return FastJSONResponse(
+            {
+                "call_id": call_id,
+                "join_url": join_url,
+                "agent_id": ULTRAVOX_AGENT_ID,
+                "status": "created",
+                "message": "Call created successfully",
+            }
         )
 
+    except (HTTPException, UpstreamUnavailable):
+        raise
+    except requests.exceptions.Timeout as e:
+        raise HTTPException(status_code=504, detail=f"Ultravox timed out: {str(e)}")
     except requests.exceptions.RequestException as e:
-        raise HTTPException(status_code=500, detail=f"Request failed: {str(e)}")
+        raise HTTPException(status_code=502, detail=f"Request failed: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
 
 
 @app.get("/api/calls")
-async def list_calls():
-    """List all calls."""
+async def list_calls(request: Request):
+    """List all calls. Supports conditional GET via ETag / If-None-Match."""
     try:
+        etag = f'"calls-{await get_data_version("calls")}"'
+        if _etag_matches(request, etag):
+            return _not_modified(etag)
+
         calls = await get_all_calls()
-        return {"calls": calls, "count": len(calls)}
+        return _with_etag({"calls": calls, "count": len(calls)}, etag)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/api/calls/{call_id}")
-async def get_call_details(call_id: str):
-    """Get details of a specific call including webhooks and tool invocations."""
+async def get_call_details(call_id: str, request: Request):
+    """
+    Get details of a specific call including webhooks and tool invocations.
+    Supports conditional GET: the ETag changes whenever any of the call's rows do.
+    """
     try:
-        call = await get_call(call_id)
-        if not call:
+        # Read the version first so a concurrent write can only make the ETag stale
+        version = await get_call_version(call_id)
+        if version is None:
+            raise HTTPException(status_code=404, detail="Call not found")
+        accounting.bind(call_id)
+        etag = f'"call-{call_id}-{version}"'
+        if _etag_matches(request, etag):
+            return _not_modified(etag)
+
+        # One query assembles the whole document; it goes out without re-encoding
+        content = await get_call_detail_json(call_id)
+        if content is None:
             raise HTTPException(status_code=404, detail="Call not found")
 
-        webhooks = await get_call_webhooks(call_id)
-        tool_invocations = await get_call_tool_invocations(call_id)
-
-        return {
-            "call": call,
-            "webhooks": webhooks,
-            "tool_invocations": tool_invocations,
-        }
+        return StreamingResponse(
+            _chunks(content),
+            media_type="application/json",
+            headers={"ETag": etag, "Cache-Control": "no-cache"},
+        )
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def _read_messages(call_id: str, status: str, offset: int, limit: int) -> Dict[str, Any]:
+    """
+    A page of a call's messages: from the local transcript store once the
+    call has ended, otherwise (live calls, or a fetch still pending) from Ultravox.
+    """
+    stored = await get_stored_messages(call_id, offset, limit)
+    if stored is not None:
+        total, messages = stored
+        source = "local"
+    else:
+        history = await get_ultravox_messages(call_id)
+        if status == "ended":
+            # The background fetch was missed or has not run yet
+            await store_call_messages(call_id, history)
+        total, messages = len(history), history[offset:offset + limit]
+        source = "ultravox"
+    return {
+        "messages": messages,
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+        "source": source,
+    }
+
+
 @app.get("/api/calls/{call_id}/messages")
-async def get_call_messages(call_id: str):
-    """Get all messages from a call."""
+async def get_call_messages(
+    call_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(200, ge=1, le=1000),
+):
+    """Get a page of messages from a call."""
     try:
-        call = await get_call(call_id)
+        call = await get_call_state(call_id)
         if not call:
             raise HTTPException(status_code=404, detail="Call not found")
+        accounting.bind(call_id)
 
-        # Try to fetch from Ultravox API
-        headers = {"X-API-Key": ULTRAVOX_API_KEY, "Content-Type": "application/json"}
-
-        url = f"{ULTRAVOX_API_BASE}/calls/{call_id}/messages"
-        response = requests.get(url, headers=headers)
-
-        if response.status_code == 200:
-            data = response.json()
-            return {"messages": data.get("results", [])}
-        else:
-            return {"messages": []}
+        return FastJSONResponse(
+            await _read_messages(call_id, call.get("status"), offset, limit)
+        )
 
-    except HTTPException:
+    except (HTTPException, UpstreamUnavailable):
         raise
     except Exception as e:
         logger.error(f"Error fetching messages: {str(e)}")
@@ -398,15 +728,15 @@ async def get_call_messages(call_id: str):
 async def get_call_recording(call_id: str):
     """Get call recording audio file."""
     try:
-        call = await get_call(call_id)
+        call = await get_call_state(call_id)
         if not call:
             raise HTTPException(status_code=404, detail="Call not found")
+        accounting.bind(call_id)
 
         # Fetch from Ultravox API
-        headers = {"X-API-Key": ULTRAVOX_API_KEY}
-
-        url = f"{ULTRAVOX_API_BASE}/calls/{call_id}/recording"
-        response = requests.get(url, headers=headers, stream=True)
+        response = await ultravox_request(
+            "GET", f"/calls/{call_id}/recording", stream=True
+        )
 
         if response.status_code != 200:
             raise HTTPException(status_code=404, detail="Recording not found")
@@ -422,13 +752,204 @@ async def get_call_recording(call_id: str):
             },
         )
 
-    except HTTPException:
+    except (HTTPException, UpstreamUnavailable):
         raise
     except Exception as e:
         logger.error(f"Error fetching recording: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Analytics Endpoint
+def _summarize_rollups(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Fold rollup rows into per-metric totals and dimension breakdowns."""
+    summary = {
+        "escalations": {"total": 0, "priority_level": {}, "customer_sentiment": {}},
+        "engagement": {
+            "total": 0,
+            "resolved": 0,
+            "avg_resolution_likelihood": None,
+            "call_phase": {},
+            "customer_sentiment": {},
+        },
+        "call_status": {},
+    }
+    resolution_sum = 0
+
+    for row in rows:
+        if row["metric"] == "call_status":
+            statuses = summary["call_status"]
+            statuses[row["value"]] = statuses.get(row["value"], 0) + row["count"]
+            continue
+
+        key = "escalations" if row["metric"] == "escalate_to_human" else "engagement"
+        breakdown = summary[key][row["dimension"]]
+        breakdown[row["value"]] = breakdown.get(row["value"], 0) + row["count"]
+
+        # Each call is counted once per dimension; totals use the primary one
+        if row["dimension"] == ROLLUP_DIMENSIONS[row["metric"]][0]:
+            summary[key]["total"] += row["count"]
+            if key == "engagement":
+                summary[key]["resolved"] += row["resolved_count"]
+                resolution_sum += row["resolution_sum"]
+
+    if summary["engagement"]["total"]:
+        summary["engagement"]["avg_resolution_likelihood"] = round(
+            resolution_sum / summary["engagement"]["total"], 1
+        )
+    return summary
+
+
+@app.get("/api/analytics")
+async def analytics(
+    granularity: str = "all",
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    agent_id: Optional[str] = None,
+):
+    """
+    Escalation, engagement and call status analytics served from rollup tables.
+    Counts are of calls: escalated calls, calls with an engagement log (its
+    first one's outcome) and calls by current status (bucketed by creation).
+    granularity: all | day | hour. start/end bound the bucket range
+    (e.g. 2026-01-19 or "2026-01-19 16:00"). Served from the read replica;
+    X-Data-Staleness-Seconds says how old the data may be.
+    """
+    if granularity not in ("all", "day", "hour"):
+        raise HTTPException(status_code=400, detail="Invalid granularity")
+    try:
+        age = replica_age()
+        rows = await get_analytics(granularity, start, end, agent_id, replica=age is not None)
+
+        result = {"granularity": granularity, "totals": _summarize_rollups(rows)}
+        if granularity != "all":
+            buckets: Dict[str, List[Dict[str, Any]]] = {}
+            for row in rows:
+                buckets.setdefault(row["bucket"], []).append(row)
+            result["buckets"] = [
+                {"bucket": bucket, **_summarize_rollups(bucket_rows)}
+                for bucket, bucket_rows in buckets.items()
+            ]
+        return FastJSONResponse(result, headers=_staleness_headers(age))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Costs Endpoints
+@app.get("/api/costs/calls")
+async def top_call_costs(
+    metric: str = "cpu_ms",
+    limit: int = Query(20, ge=1, le=500),
+    agent_id: Optional[str] = None,
+):
+    """
+    The heaviest calls by one resource: requests, webhooks, ultravox_requests,
+    ultravox_bytes, db_rows, db_bytes or cpu_ms. Totals lag by up to
+    COST_FLUSH_INTERVAL_SECONDS.
+    """
+    if metric not in accounting.COST_FIELDS:
+        raise HTTPException(status_code=400, detail="Invalid metric")
+    try:
+        return {"metric": metric, "calls": await get_top_call_costs(metric, limit, agent_id)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/costs/agents")
+async def agent_costs():
+    """Resource totals per agent over all accounted calls."""
+    try:
+        return {"agents": await get_agent_costs()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Search Endpoint
+@app.get("/api/search")
+async def search(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+):
+    """
+    Search call summaries, escalation context and engagement notes.
+    Results are ranked by relevance and include highlighted snippets.
+    """
+    try:
+        results, has_more = await search_calls(q, limit=limit, offset=offset)
+        return FastJSONResponse(
+            {
+                "query": q,
+                "results": results,
+                "count": len(results),
+                "offset": offset,
+                "limit": limit,
+                "has_more": has_more,
+            }
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Bulk Export Endpoint
+@app.get("/api/export/{table}")
+async def export_table(
+    table: str,
+    format: str = "ndjson",
+    compression: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    since_id: Optional[str] = None,
+    consumer: Optional[str] = None,
+    batch_size: int = Query(1000, ge=1, le=10000),
+):
+    """
+    Stream a table (calls, webhooks, tool_invocations) as NDJSON, CSV or Parquet.
+    Rows are exported in id order up to the high-water mark at request time,
+    which is returned in the X-Export-Cursor header. Pass it back as `since_id`,
+    or pass a `consumer` name to have the server remember it between exports.
+    With several database shards the cursor has one row id per shard
+    ("12,40,3") and each row carries its `shard`.
+    Rows are read from the read replica (see X-Data-Staleness-Seconds).
+    """
+    if table not in EXPORT_TABLES:
+        raise HTTPException(status_code=404, detail=f"Unknown export table: {table}")
+    try:
+        check_export_options(format, compression)
+        since_ids = parse_export_cursor(since_id) if since_id is not None else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if since_ids is None:
+        since_ids = await get_export_cursor(consumer, table) if consumer else None
+    age = replica_age()
+    marks = await get_export_high_water_mark(table, replica=age is not None)
+    # A snapshot can lag behind a cursor saved from a fresher read; never move it back
+    until_ids = [max(mark, since) for mark, since in zip(marks, since_ids or [0] * len(marks))]
+
+    async def stream():
+        batches = iter_export_rows(
+            table, since_ids, until_ids, start=start, end=end, batch_size=batch_size,
+            replica=age is not None,
+        )
+        async for chunk in encode_export(batches, format, compression):
+            yield chunk
+        # Only advance the consumer's cursor once the whole export was sent
+        if consumer:
+            await save_export_cursor(consumer, table, until_ids)
+
+    return StreamingResponse(
+        stream(),
+        media_type=EXPORT_FORMATS[format][0],
+        headers={
+            "Content-Disposition": (
+                f"attachment; filename={export_filename(table, format, compression)}"
+            ),
+            "X-Export-Cursor": format_export_cursor(until_ids),
+            **_staleness_headers(age),
+        },
+    )
+
+
 # SIP Call Endpoints
 @app.post("/api/calls/sip/inbound", response_model=CreateSIPCallResponse)
 async def create_sip_inbound_call(request: CreateSIPInboundRequest):
@@ -449,10 +970,7 @@ async def create_sip_inbound_call(request: CreateSIPInboundRequest):
         if request.template_context:
             payload["templateContext"] = request.template_context
 
-        headers = {"X-API-Key": ULTRAVOX_API_KEY, "Content-Type": "application/json"}
-
-        url = f"{ULTRAVOX_API_BASE}/agents/{ULTRAVOX_AGENT_ID}/calls"
-        response = requests.post(url, json=payload, headers=headers)
+        response = await create_agent_call(payload)
 
         if response.status_code != 201:
             raise HTTPException(
@@ -462,6 +980,7 @@ async def create_sip_inbound_call(request: CreateSIPInboundRequest):
 
         response_data = response.json()
         call_id = response_data.get("callId")
+        accounting.bind(call_id)
 
         # Extract SIP URI from response
         sip_uri = response_data.get("medium", {}).get("sip", {}).get("uri", "")
@@ -476,15 +995,22 @@ async def create_sip_inbound_call(request: CreateSIPInboundRequest):
 
         logger.info(f"Inbound SIP call created: {call_id}, URI: {sip_uri}")
 
-        return CreateSIPCallResponse(
-            call_id=call_id,
-            status="created",
-            message="Inbound SIP call created successfully. Users can dial the SIP URI.",
-            sip_uri=sip_uri,
+        return FastJSONResponse(
+            {
+                "call_id": call_id,
+                "status": "created",
+                "message": "Inbound SIP call created successfully. Users can dial the SIP URI.",
+                "sip_uri": sip_uri,
+                "to_number": None,
+            }
         )
 
+    except (HTTPException, UpstreamUnavailable):
+        raise
+    except requests.exceptions.Timeout as e:
+        raise HTTPException(status_code=504, detail=f"Ultravox timed out: {str(e)}")
     except requests.exceptions.RequestException as e:
-        raise HTTPException(status_code=500, detail=f"Request failed: {str(e)}")
+        raise HTTPException(status_code=502, detail=f"Request failed: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
 
@@ -497,26 +1023,8 @@ async def create_sip_outbound_call(request: CreateSIPOutboundRequest):
     """
     logger.info(f"Creating outbound SIP call to {request.to_number}")
     try:
-        payload = {
-            "medium": {
-                "sip": {
-                    "outgoing": {
-                        "to": f"sip:{request.to_number}@{SIP_DOMAIN}",
-                        "from": SIP_FROM_NUMBER,
-                        "username": SIP_USERNAME,
-                        "password": SIP_PASSWORD,
-                    }
-                }
-            }
-        }
-
-        if request.template_context:
-            payload["templateContext"] = request.template_context
-
-        headers = {"X-API-Key": ULTRAVOX_API_KEY, "Content-Type": "application/json"}
-
-        url = f"{ULTRAVOX_API_BASE}/agents/{ULTRAVOX_AGENT_ID}/calls"
-        response = requests.post(url, json=payload, headers=headers)
+        payload = sip_outbound_payload(request.to_number, request.template_context)
+        response = await create_agent_call(payload)
 
         if response.status_code != 201:
             raise HTTPException(
@@ -526,6 +1034,7 @@ async def create_sip_outbound_call(request: CreateSIPOutboundRequest):
 
         response_data = response.json()
         call_id = response_data.get("callId")
+        accounting.bind(call_id)
 
         # Store in database
         await create_call(
@@ -537,19 +1046,94 @@ async def create_sip_outbound_call(request: CreateSIPOutboundRequest):
 
         logger.info(f"Outbound SIP call created: {call_id} to {request.to_number}")
 
-        return CreateSIPCallResponse(
-            call_id=call_id,
-            status="created",
-            message=f"Outbound call initiated to {request.to_number}",
-            to_number=request.to_number,
+        return FastJSONResponse(
+            {
+                "call_id": call_id,
+                "status": "created",
+                "message": f"Outbound call initiated to {request.to_number}",
+                "sip_uri": None,
+                "to_number": request.to_number,
+            }
         )
 
+    except (HTTPException, UpstreamUnavailable):
+        raise
+    except requests.exceptions.Timeout as e:
+        raise HTTPException(status_code=504, detail=f"Ultravox timed out: {str(e)}")
     except requests.exceptions.RequestException as e:
-        raise HTTPException(status_code=500, detail=f"Request failed: {str(e)}")
+        raise HTTPException(status_code=502, detail=f"Request failed: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
 
 
+# Outbound Campaign Endpoints
+@app.post("/api/campaigns")
+async def create_outbound_campaign(request: CreateCampaignRequest):
+    """
+    Queue an outbound SIP campaign.
+    Numbers are dialed in the background within the campaign's rate and
+    concurrency budget; poll GET /api/campaigns/{id} for progress.
+    """
+    try:
+        campaign_id = await create_campaign(
+            name=request.name,
+            targets=[target.dict() for target in request.targets],
+            calls_per_second=request.calls_per_second,
+            max_concurrent=request.max_concurrent,
+            max_attempts=request.max_attempts,
+        )
+        campaign_scheduler.wake()
+        logger.info(
+            f"Campaign {campaign_id} queued with {len(request.targets)} numbers"
+        )
+        return await get_campaign(campaign_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/campaigns")
+async def list_campaigns():
+    """List all outbound campaigns."""
+    try:
+        campaigns = await get_all_campaigns()
+        return {"campaigns": campaigns, "count": len(campaigns)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/campaigns/{campaign_id}")
+async def get_campaign_progress(campaign_id: int):
+    """Get a campaign with live job counts per status."""
+    campaign = await get_campaign(campaign_id)
+    if not campaign:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    jobs = campaign["jobs"]
+    done = jobs["completed"] + jobs["failed"] + jobs["cancelled"]
+    campaign["progress"] = round(100 * done / jobs["total"], 1) if jobs["total"] else 100.0
+    campaign["dialing_active"] = campaign_scheduler.is_active(campaign_id)
+    return campaign
+
+
+@app.post("/api/campaigns/{campaign_id}/{action}")
+async def control_campaign(campaign_id: int, action: str):
+    """Pause, resume or cancel a campaign."""
+    statuses = {"pause": "paused", "resume": "running", "cancel": "cancelled"}
+    if action not in statuses:
+        raise HTTPException(status_code=404, detail=f"Unknown action: {action}")
+
+    campaign = await get_campaign(campaign_id)
+    if not campaign:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    if campaign["status"] in ("completed", "cancelled"):
+        raise HTTPException(
+            status_code=409, detail=f"Campaign is already {campaign['status']}"
+        )
+
+    await set_campaign_status(campaign_id, statuses[action])
+    campaign_scheduler.wake()
+    return await get_campaign(campaign_id)
+
+
 # Text Chat Endpoints
 @app.post("/api/chats", response_model=CreateChatResponse)
 async def create_chat_session(request: CreateChatRequest):
@@ -569,10 +1153,7 @@ async def create_chat_session(request: CreateChatRequest):
             },
         }
 
-        headers = {"X-API-Key": ULTRAVOX_API_KEY, "Content-Type": "application/json"}
-
-        url = f"{ULTRAVOX_API_BASE}/agents/{ULTRAVOX_AGENT_ID}/calls"
-        response = requests.post(url, json=payload, headers=headers)
+        response = await create_agent_call(payload)
 
         if response.status_code != 201:
             raise HTTPException(
@@ -582,6 +1163,7 @@ async def create_chat_session(request: CreateChatRequest):
 
         response_data = response.json()
         chat_id = response_data.get("callId")
+        accounting.bind(chat_id)
 
         # Store in database
         await create_call(
@@ -593,14 +1175,20 @@ async def create_chat_session(request: CreateChatRequest):
 
         logger.info(f"Text chat session created: {chat_id}")
 
-        return CreateChatResponse(
-            chat_id=chat_id,
-            status="created",
-            message="Chat session created successfully",
+        return FastJSONResponse(
+            {
+                "chat_id": chat_id,
+                "status": "created",
+                "message": "Chat session created successfully",
+            }
         )
 
+    except (HTTPException, UpstreamUnavailable):
+        raise
+    except requests.exceptions.Timeout as e:
+        raise HTTPException(status_code=504, detail=f"Ultravox timed out: {str(e)}")
     except requests.exceptions.RequestException as e:
-        raise HTTPException(status_code=500, detail=f"Request failed: {str(e)}")
+        raise HTTPException(status_code=502, detail=f"Request failed: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
 
@@ -614,21 +1202,21 @@ async def send_chat_message(chat_id: str, request: SendMessageRequest):
     logger.info(f"Sending message to chat {chat_id}: {request.message}")
     try:
         # Verify chat exists
-        call = await get_call(chat_id)
+        call = await get_call_state(chat_id)
         if not call:
             raise HTTPException(status_code=404, detail="Chat session not found")
+        accounting.bind(chat_id)
 
         # Send message to Ultravox
-        headers = {"X-API-Key": ULTRAVOX_API_KEY, "Content-Type": "application/json"}
-
-        url = f"{ULTRAVOX_API_BASE}/calls/{chat_id}/data-message"
         payload = {
             "type": "user_text_message",
             "text": request.message,
             "urgency": "soon",
         }
 
-        response = requests.post(url, json=payload, headers=headers)
+        response = await ultravox_request(
+            "POST", f"/calls/{chat_id}/data-message", json=payload
+        )
 
         if response.status_code not in [200, 201]:
             raise HTTPException(
@@ -637,6 +1225,7 @@ async def send_chat_message(chat_id: str, request: SendMessageRequest):
             )
 
         response_data = response.json()
+        chat_replies.nudge(chat_id)
 
         logger.info(f"Message sent successfully to chat {chat_id}")
 
@@ -646,55 +1235,93 @@ async def send_chat_message(chat_id: str, request: SendMessageRequest):
             "response": response_data,
         }
 
-    except HTTPException:
+    except (HTTPException, UpstreamUnavailable):
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
 
 
 @app.get("/api/chats/{chat_id}/messages")
-async def get_chat_messages(chat_id: str):
+async def get_chat_messages(
+    chat_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(200, ge=1, le=1000),
+):
     """
     Get message history for a chat session.
-    Returns all messages exchanged in the conversation.
+    Returns a page of the messages exchanged in the conversation.
     """
     logger.info(f"Fetching messages for chat {chat_id}")
     try:
         # Verify chat exists
-        call = await get_call(chat_id)
+        call = await get_call_state(chat_id)
         if not call:
             raise HTTPException(status_code=404, detail="Chat session not found")
+        accounting.bind(chat_id)
 
-        # Get messages from Ultravox
-        headers = {"X-API-Key": ULTRAVOX_API_KEY, "Content-Type": "application/json"}
+        page = await _read_messages(chat_id, call.get("status"), offset, limit)
 
-        url = f"{ULTRAVOX_API_BASE}/calls/{chat_id}/messages"
-        response = requests.get(url, headers=headers)
+        return FastJSONResponse({"chat_id": chat_id, **page})
 
-        if response.status_code != 200:
-            raise HTTPException(
-                status_code=response.status_code,
-                detail=f"Ultravox API error: {response.text}",
-            )
+    except (HTTPException, UpstreamUnavailable):
+        raise
+    except requests.exceptions.HTTPError as e:
+        raise HTTPException(
+            status_code=e.response.status_code,
+            detail=f"Ultravox API error: {e.response.text}",
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
 
-        messages = response.json()
 
-        return {"chat_id": chat_id, "messages": messages}
+@app.get("/api/chats/{chat_id}/wait_for_reply")
+async def wait_for_reply(
+    chat_id: str,
+    after: int = Query(0, ge=0, description="Number of messages the client already has"),
+    timeout: float = Query(25, ge=0, le=60, description="Seconds to wait for a reply"),
+    message: Optional[str] = Query(None, description="Text of the user message to wait on"),
+):
+    """
+    Long-poll for the agent's reply to the latest user message.
+    Returns only the messages after index `after` once an agent message
+    follows the user message `message` (or any user message) among them, or
+    whatever arrived when `timeout` expires (`timed_out: true`). Once a reply
+    arrives, pass `next_index` back as `after` on the next call.
+    """
+    call = await get_call_state(chat_id)
+    if not call:
+        raise HTTPException(status_code=404, detail="Chat session not found")
+    accounting.bind(chat_id)
 
-    except HTTPException:
+    try:
+        messages, timed_out = await chat_replies.wait(chat_id, after, timeout, message)
+    except UpstreamUnavailable:
         raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
+    except requests.exceptions.RequestException as e:
+        raise HTTPException(status_code=502, detail=f"Ultravox request failed: {str(e)}")
+
+    return FastJSONResponse(
+        {
+            "chat_id": chat_id,
+            "messages": messages,
+            "next_index": after + len(messages),
+            "timed_out": timed_out,
+        }
+    )
 
 
 @app.get("/api/chats")
-async def list_chat_sessions():
+async def list_chat_sessions(request: Request):
     """
     List all text chat sessions.
     """
     try:
+        etag = f'"chats-{await get_data_version("calls")}"'
+        if _etag_matches(request, etag):
+            return _not_modified(etag)
+
         calls = await get_all_calls()
-        return {"chats": calls, "count": len(calls)}
+        return _with_etag({"chats": calls, "count": len(calls)}, etag)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -706,7 +1333,6 @@ async def receive_webhook(request: Request):
     Receive webhook events from Ultravox.
     Events: call.started, call.joined, call.ended
     """
-    logger.info("=== WEBHOOK RECEIVED ===")
     try:
         payload = await request.json()
         event_type = payload.get("event")
@@ -716,46 +1342,59 @@ async def receive_webhook(request: Request):
         if not call_id:
             raise HTTPException(status_code=400, detail="Invalid webhook payload")
 
-        # Log webhook to database
-        await log_webhook(call_id=call_id, event_type=event_type, payload=payload)
-
-        # Check if call exists, if not create it
-        existing_call = await get_call(call_id)
-        if not existing_call and event_type == "call.started":
-            # Create call from webhook data
-            agent_id = call_data.get("agentId", "")
-            join_url = call_data.get("joinUrl", "")
-            await create_call(
-                call_id=call_id,
-                agent_id=agent_id,
-                join_url=join_url,
-                response_json=call_data,
+        # Callbacks of warm pool calls that expired before being handed out
+        pooled = POOL_METADATA_KEY in (call_data.get("metadata") or {})
+        if pooled and not await get_call_state(call_id):
+            WEBHOOK_STATS["ignored"] += 1
+            return FastJSONResponse(
+                {"status": "ignored", "event": event_type, "call_id": call_id}
             )
-            logger.info(f"Created call {call_id} from webhook")
-
-        # Update call status based on event type
-        if event_type == "call.started":
-            await update_call_status(call_id, "started")
-        elif event_type == "call.joined":
-            joined_at = call_data.get("joined")
-            await update_call_status(call_id, "joined", joined_at=joined_at)
+        accounting.bind(call_id)
+        accounting.record(webhooks=1)
+
+        # Ultravox retries deliveries: acknowledge repeats without writing
+        timestamp_field = WEBHOOK_TIMESTAMP_FIELDS.get(event_type)
+        event_timestamp = str(
+            payload.get("timestamp") or call_data.get(timestamp_field) or ""
+        )
+        key = (call_id, event_type, event_timestamp)
+        if key in webhook_keys:
+            WEBHOOK_STATS["duplicates"] += 1
+            return FastJSONResponse(
+                {"status": "duplicate", "event": event_type, "call_id": call_id}
+            )
+
+        fields = {}
+        if event_type == "call.joined":
+            fields = {"joined_at": call_data.get("joined")}
         elif event_type == "call.ended":
-            ended_at = call_data.get("ended")
-            end_reason = call_data.get("endReason")
-            short_summary = call_data.get("shortSummary")
-            summary = call_data.get("summary")
-            await update_call_status(
-                call_id,
-                "ended",
-                ended_at=ended_at,
-                end_reason=end_reason,
-                short_summary=short_summary,
-                summary=summary,
+            fields = {
+                "ended_at": call_data.get("ended"),
+                "end_reason": call_data.get("endReason"),
+                "short_summary": call_data.get("shortSummary"),
+                "summary": call_data.get("summary"),
+            }
+
+        # Logs the delivery and applies a monotonic status change atomically;
+        # the unique index catches repeats the in-memory filter has not seen
+        ingested = await ingest_webhook(
+            call_id, event_type, event_timestamp, payload, **fields
+        )
+        webhook_keys.add(key)
+        if not ingested:
+            WEBHOOK_STATS["duplicates"] += 1
+            return FastJSONResponse(
+                {"status": "duplicate", "event": event_type, "call_id": call_id}
             )
+        WEBHOOK_STATS["ingested"] += 1
+        if event_type == "call.ended":
+            job_queue.enqueue(TRANSCRIPT_JOB, {"call_id": call_id}, key=transcript_job_key(call_id))
 
         logger.info(f"Webhook received: {event_type} for call {call_id}")
 
-        return {"status": "success", "event": event_type, "call_id": call_id}
+        return FastJSONResponse(
+            {"status": "success", "event": event_type, "call_id": call_id}
+        )
 
     except Exception as e:
         logger.error(f"Webhook error: {str(e)}")
@@ -774,9 +1413,10 @@ async def escalate_to_human(request: EscalateToHumanRequest, req: Request):
         call_id = parameters.pop("call_id") or req.headers.get("X-Call-ID", "unknown")
 
         # Verify call exists
-        call = await get_call(call_id)
+        call = await get_call_state(call_id)
         if not call:
             raise HTTPException(status_code=404, detail="Call not found")
+        accounting.bind(call_id)
 
         # Log tool invocation and get the inserted ID
         invocation_id = await log_tool_invocation(
@@ -787,12 +1427,15 @@ async def escalate_to_human(request: EscalateToHumanRequest, req: Request):
             f"Escalation requested for call {call_id}: {parameters['escalation_reason']}"
         )
 
-        return ToolResponse(
-            success=True,
-            message="Escalation logged successfully",
-            tool_name="escalate_to_human",
-            call_id=call_id,
-            invocation_id=invocation_id,
+        # Built directly: skips response_model re-validation of our own data
+        return FastJSONResponse(
+            {
+                "success": True,
+                "message": "Escalation logged successfully",
+                "tool_name": "escalate_to_human",
+                "call_id": call_id,
+                "invocation_id": invocation_id,
+            }
         )
 
     except HTTPException:
@@ -812,9 +1455,10 @@ async def log_call_engagement(request: LogCallEngagementRequest, req: Request):
         call_id = parameters.pop("call_id") or req.headers.get("X-Call-ID", "unknown")
 
         # Verify call exists
-        call = await get_call(call_id)
+        call = await get_call_state(call_id)
         if not call:
             raise HTTPException(status_code=404, detail="Call not found")
+        accounting.bind(call_id)
 
         # Log tool invocation and get the inserted ID
         invocation_id = await log_tool_invocation(
@@ -823,12 +1467,14 @@ async def log_call_engagement(request: LogCallEngagementRequest, req: Request):
 
         logger.info(f"Engagement logged for call {call_id}: {parameters['call_phase']}")
 
-        return ToolResponse(
-            success=True,
-            message="Engagement metrics logged successfully",
-            tool_name="log_call_engagement",
-            call_id=call_id,
-            invocation_id=invocation_id,
+        return FastJSONResponse(
+            {
+                "success": True,
+                "message": "Engagement metrics logged successfully",
+                "tool_name": "log_call_engagement",
+                "call_id": call_id,
+                "invocation_id": invocation_id,
+            }
         )
 
     except HTTPException:
@@ -842,4 +1488,11 @@ async def log_call_engagement(request: LogCallEngagementRequest, req: Request):
 
 
 if __name__ == "__main__":
-    uvicorn.run("main:app", host=HOST, port=PORT, reload=True)
+    if WORKERS > 1:
+        writer_process = start_process(DB_WRITER_HOST, DB_WRITER_PORT)
+        try:
+            uvicorn.run("main:app", host=HOST, port=PORT, workers=WORKERS, access_log=False)
+        finally:
+            writer_process.terminate()
+    else:
+        uvicorn.run("main:app", host=HOST, port=PORT, reload=True, access_log=False)
@@ -0,0 +1,77 @@
+"""
+Maintenance commands for the Ultravox backend database.
+
+Usage:
+    python manage.py rebuild-analytics
+    python manage.py rebuild-search
+    python manage.py reshard --shards 4
+"""
+
+import argparse
+import asyncio
+
+import database
+from database import init_db, rebuild_analytics, rebuild_search_index
+
+
+async def cmd_rebuild_analytics(args):
+    """Backfill analytics rollups from raw call and tool invocation rows."""
+    await init_db()
+    counts = await rebuild_analytics()
+    print(
+        f"Rebuilt analytics from {counts['calls']} calls "
+        f"and {counts['tool_invocations']} first tool invocations"
+    )
+
+
+async def cmd_rebuild_search(args):
+    """Rebuild the full-text search index from raw call and tool invocation rows."""
+    await init_db()
+    await rebuild_search_index()
+    print("Rebuilt search index")
+
+
+async def cmd_reshard(args):
+    """Move call data between shard files for a new DB_SHARDS setting."""
+    if args.shards < 1:
+        raise SystemExit("--shards must be at least 1")
+    result = await database.reshard(args.from_shards, args.shards)
+    for table, count in result["moved"].items():
+        print(f"Moved {count} {table} rows")
+    for path in result["removed"]:
+        print(f"Removed emptied shard {path}")
+    print(f"Resharded {args.from_shards} -> {args.shards} shards; "
+          f"start the server with DB_SHARDS={args.shards}. Export cursors were reset.")
+
+
+def main():
+    """Parse arguments and run the selected command."""
+    parser = argparse.ArgumentParser(description="Ultravox backend maintenance")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    rebuild = subparsers.add_parser(
+        "rebuild-analytics", help="Recompute analytics rollups from raw rows"
+    )
+    rebuild.set_defaults(func=cmd_rebuild_analytics)
+
+    search = subparsers.add_parser(
+        "rebuild-search", help="Rebuild the full-text search index"
+    )
+    search.set_defaults(func=cmd_rebuild_search)
+
+    reshard = subparsers.add_parser(
+        "reshard", help="Redistribute call data over a new number of shard files"
+    )
+    reshard.add_argument("--shards", type=int, required=True, help="New shard count")
+    reshard.add_argument(
+        "--from-shards", type=int, default=database.SHARD_COUNT,
+        help="Current shard count (defaults to DB_SHARDS)",
+    )
+    reshard.set_defaults(func=cmd_reshard)
+
+    args = parser.parse_args()
+    asyncio.run(args.func(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+"""
+Local stand-in for the Ultravox REST API, for benchmarks and offline testing.
+
+Emulates call creation (/calls and /agents/{id}/calls), call listing,
+messages, recordings and data messages, with configurable latency and error
+injection. With --emit-webhooks it also fires call.joined / call.ended
+callbacks at the URLs given in each call's `callbacks` (dropping a fraction
+of them with --webhook-loss-rate). --seed-calls pre-populates the call
+listing, e.g. for the reconciliation sync.
+
+Usage:
+    python mock_ultravox.py --port 9000 --latency-ms 50 --error-rate 0.05 --emit-webhooks
+    python mock_ultravox.py --port 9000 --seed-calls 20000
+
+Then point the backend at it with ULTRAVOX_API_BASE=http://localhost:9000/api
+"""
+
+import argparse
+import asyncio
+import io
+import random
+import time
+import uuid
+import wave
+from datetime import datetime, timedelta, timezone
+
+import requests
+import uvicorn
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, Response
+
+SUMMARIES = [
+    ("Laptop not booting", "Customer's laptop shows a black screen with fans running. "
+     "Walked through a hard reset; escalated for a hardware check."),
+    ("Battery drains quickly", "Customer reported the battery lasting under an hour. "
+     "Suggested calibration and booked a battery replacement."),
+    ("Keyboard keys stuck", "Several keys stopped responding after a spill. "
+     "Advised drying and scheduled a repair appointment."),
+]
+
+
+class MockSettings:
+    """Latency, fault and webhook knobs (changeable at runtime via /_config)."""
+
+    latency_ms: float = 0.0
+    latency_jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    emit_webhooks: float = 0.0
+    webhook_loss_rate: float = 0.0
+    join_after_ms: float = 500.0
+    end_after_ms: float = 3000.0
+
+
+settings = MockSettings()
+stats = {
+    "requests": 0,
+    "errors": 0,
+    "rate_limited": 0,
+    "in_flight": 0,
+    "peak_in_flight": 0,
+    "webhooks_sent": 0,
+    "webhooks_failed": 0,
+    "webhooks_dropped": 0,
+}
+calls = {}
+messages = {}
+
+app = FastAPI(title="Mock Ultravox API")
+
+
+def _now() -> str:
+    return _timestamp(datetime.now(timezone.utc))
+
+
+def _timestamp(moment: datetime) -> str:
+    return moment.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+@app.middleware("http")
+async def inject_faults(request: Request, call_next):
+    """Apply configured latency and error injection to every API request."""
+    if not request.url.path.startswith("/api/"):
+        return await call_next(request)
+
+    stats["requests"] += 1
+    stats["in_flight"] += 1
+    stats["peak_in_flight"] = max(stats["peak_in_flight"], stats["in_flight"])
+    try:
+        delay = settings.latency_ms + random.uniform(0, settings.latency_jitter_ms)
+        if delay:
+            await asyncio.sleep(delay / 1000)
+
+        roll = random.random()
+        if roll < settings.rate_limit_rate:
+            stats["rate_limited"] += 1
+            return JSONResponse(
+                {"detail": "Rate limited"}, status_code=429, headers={"Retry-After": "1"}
+            )
+        if roll < settings.rate_limit_rate + settings.error_rate:
+            stats["errors"] += 1
+            return JSONResponse({"detail": "Injected server error"}, status_code=503)
+        return await call_next(request)
+    finally:
+        stats["in_flight"] -= 1
+
+
+def _post_webhook(url: str, payload: dict):
+    try:
+        requests.post(url, json=payload, timeout=10)
+        stats["webhooks_sent"] += 1
+    except requests.exceptions.RequestException:
+        stats["webhooks_failed"] += 1
+
+
+async def _emit_webhook(call: dict, event: str, delay_ms: float):
+    """Send a webhook for `event` to the call's callback URL after a delay."""
+    await asyncio.sleep(delay_ms / 1000)
+    name = event.split(".")[1]
+    if name == "joined":
+        call["joined"] = _now()
+    elif name == "ended":
+        short_summary, summary = random.choice(SUMMARIES)
+        call.update(ended=_now(), endReason="hangup", shortSummary=short_summary,
+                    summary=summary)
+    url = (call.get("callbacks") or {}).get(name, {}).get("url")
+    if url and random.random() < settings.webhook_loss_rate:
+        stats["webhooks_dropped"] += 1
+    elif url:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, _post_webhook, url, {"event": event, "call": call})
+
+
+def _create_call(payload: dict, agent_id: str = None) -> dict:
+    call_id = str(uuid.uuid4())
+    call = {
+        "callId": call_id,
+        "agentId": agent_id,
+        "created": _now(),
+        "joined": None,
+        "ended": None,
+        "endReason": None,
+        "shortSummary": None,
+        "summary": None,
+        "joinUrl": f"wss://mock.ultravox.local/calls/{call_id}",
+        "medium": payload.get("medium", {}),
+        "metadata": payload.get("metadata", {}),
+        "templateContext": payload.get("templateContext", {}),
+        "recordingEnabled": payload.get("recordingEnabled", False),
+        "callbacks": payload.get("callbacks", {}),
+    }
+    if "sip" in call["medium"]:
+        call["medium"]["sip"]["uri"] = f"sip:{call_id}@mock.ultravox.local"
+    calls[call_id] = call
+    messages[call_id] = [
+        {"role": "MESSAGE_ROLE_AGENT", "text": "Hi, thanks for calling TechFix. "
+         "How can I help?", "medium": "MESSAGE_MEDIUM_VOICE", "callStageMessageIndex": 0},
+    ]
+
+    if settings.emit_webhooks:
+        asyncio.create_task(_emit_webhook(call, "call.joined", settings.join_after_ms))
+        asyncio.create_task(_emit_webhook(call, "call.ended", settings.end_after_ms))
+    return call
+
+
+def _seed_calls(count: int):
+    """Add `count` finished past calls (some never joined), created one second apart."""
+    start = datetime.now(timezone.utc) - timedelta(seconds=count + 600)
+    for i in range(count):
+        call = _create_call({"metadata": {"source": "seed"}}, agent_id="seed-agent")
+        created = start + timedelta(seconds=i)
+        call["created"] = _timestamp(created)
+        if random.random() < 0.15:
+            call.update(ended=_timestamp(created + timedelta(seconds=60)), endReason="unjoined")
+        else:
+            short_summary, summary = random.choice(SUMMARIES)
+            call.update(joined=_timestamp(created + timedelta(seconds=2)),
+                        ended=_timestamp(created + timedelta(seconds=90)), endReason="hangup",
+                        shortSummary=short_summary, summary=summary)
+
+
+def _get_call(call_id: str) -> dict:
+    if call_id not in calls:
+        raise HTTPException(status_code=404, detail="Not found.")
+    return calls[call_id]
+
+
+def _page(request: Request, items: list) -> dict:
+    """Cursor-paginate a list the way Ultravox does (`cursor` is an offset)."""
+    page_size = int(request.query_params.get("pageSize", 100))
+    offset = int(request.query_params.get("cursor", 0))
+    page = items[offset:offset + page_size]
+    next_url = None
+    if offset + page_size < len(items):
+        next_url = str(request.url.include_query_params(cursor=offset + page_size))
+    return {"results": page, "next": next_url, "total": len(items)}
+
+
+@app.post("/api/calls", status_code=201)
+async def create_call(request: Request):
+    """Create a call without an agent."""
+    return _create_call(await request.json())
+
+
+@app.post("/api/agents/{agent_id}/calls", status_code=201)
+async def create_agent_call(agent_id: str, request: Request):
+    """Create a call for an agent and echo back an Ultravox-shaped response."""
+    return _create_call(await request.json(), agent_id)
+
+
+@app.get("/api/calls")
+async def list_calls(request: Request):
+    """List calls, most recent first (`sort=created` for oldest first; `fromDate` filters)."""
+    items = calls.values()
+    from_date = request.query_params.get("fromDate")
+    if from_date:
+        items = [call for call in items if call["created"] >= from_date]
+    newest_first = request.query_params.get("sort", "-created") != "created"
+    return _page(request, sorted(items, key=lambda c: c["created"], reverse=newest_first))
+
+
+@app.get("/api/calls/{call_id}")
+async def get_call(call_id: str):
+    return _get_call(call_id)
+
+
+@app.get("/api/calls/{call_id}/messages")
+async def get_messages(call_id: str, request: Request):
+    """Paginated message history for a call."""
+    _get_call(call_id)
+    return _page(request, messages[call_id])
+
+
+@app.get("/api/calls/{call_id}/recording")
+async def get_recording(call_id: str):
+    """A short silent WAV file."""
+    _get_call(call_id)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(8000)
+        wav.writeframes(b"\x00\x00" * 8000)
+    return Response(buffer.getvalue(), media_type="audio/wav")
+
+
+@app.post("/api/calls/{call_id}/data-message")
+async def send_data_message(call_id: str, request: Request):
+    """Accept a user text message and append an agent reply."""
+    _get_call(call_id)
+    body = await request.json()
+    history = messages[call_id]
+    history.append({"role": "MESSAGE_ROLE_USER", "text": body.get("text", ""),
+                    "medium": "MESSAGE_MEDIUM_TEXT", "callStageMessageIndex": len(history)})
+    history.append({"role": "MESSAGE_ROLE_AGENT", "text": "Got it, let me check that for you.",
+                    "medium": "MESSAGE_MEDIUM_TEXT", "callStageMessageIndex": len(history)})
+    return {}
+
+
+@app.get("/_stats")
+async def get_stats():
+    """Request counters and peak concurrency observed by the mock."""
+    return {**stats, "calls": len(calls)}
+
+
+@app.post("/_config")
+async def update_config(request: Request):
+    """Change latency / error / webhook settings at runtime."""
+    for key, value in (await request.json()).items():
+        if hasattr(settings, key):
+            setattr(settings, key, float(value))
+    return {name: getattr(settings, name) for name in MockSettings.__annotations__}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock Ultravox API server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--latency-jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--emit-webhooks", action="store_true")
+    parser.add_argument("--join-after-ms", type=float, default=500.0)
+    parser.add_argument("--end-after-ms", type=float, default=3000.0)
+    parser.add_argument("--webhook-loss-rate", type=float, default=0.0)
+    parser.add_argument("--seed-calls", type=int, default=0)
+    args = parser.parse_args()
+
+    _seed_calls(args.seed_calls)
+    settings.latency_ms = args.latency_ms
+    settings.latency_jitter_ms = args.latency_jitter_ms
+    settings.error_rate = args.error_rate
+    settings.rate_limit_rate = args.rate_limit_rate
+    settings.emit_webhooks = float(args.emit_webhooks)
+    settings.join_after_ms = args.join_after_ms
+    settings.end_after_ms = args.end_after_ms
+    settings.webhook_loss_rate = args.webhook_loss_rate
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Fast JSON responses.
+
+FastJSONResponse serializes with orjson (falling back to the stdlib encoder
+when it isn't installed). Handlers that return an instance directly skip
+FastAPI's jsonable_encoder pass and response_model re-validation, which is
+what we want for row dicts and payloads we build ourselves.
+"""
+
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from tracing import span
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(value: Any):
+    """Encode values orjson doesn't handle natively."""
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if isinstance(value, bytes):
+        return value.decode("utf-8", errors="replace")
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with orjson."""
+
+    def render(self, content: Any) -> bytes:
+        with span("json.render", "serialize"):
+            if orjson is None:
+                return json.dumps(
+                    content, ensure_ascii=False, separators=(",", ":"), default=_default
+                ).encode("utf-8")
+            return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
@@ -6,6 +6,7 @@ Run this after starting the server to test all endpoints
 import requests
 import json
 import time
+import uuid
 
 BASE_URL = "http://localhost:8000"
 
@@ -133,6 +134,49 @@ def test_webhook_simulation(call_id):
     print_response(response, "Webhook (Simulated)")
 
 
+def test_webhook_replay():
+    """Replay a 10x-duplicated, out-of-order webhook stream and check write counts."""
+    print("\n\n🔁 Testing Webhook Idempotency (10x duplicated stream)...")
+    events = [
+        ("call.started", {"agentId": "test-agent", "created": "2026-01-19T15:00:00Z"}),
+        ("call.joined", {"joined": "2026-01-19T15:00:05Z"}),
+        ("call.ended", {"ended": "2026-01-19T15:03:00Z", "endReason": "hangup",
+                        "shortSummary": "Replay test", "summary": "Duplicate delivery test."}),
+    ]
+
+    def replay(stream):
+        call_id = str(uuid.uuid4())
+        statuses = [
+            requests.post(
+                f"{BASE_URL}/api/webhook",
+                json={"event": event, "call": {"callId": call_id, **call}},
+            ).json().get("status")
+            for event, call in stream
+        ]
+        response = requests.get(f"{BASE_URL}/api/calls/{call_id}")
+        # The ETag carries the call's version, bumped by every write touching it
+        return statuses, response.json(), response.headers.get("ETag")
+
+    # Every event delivered 10 times, with the late joined retries arriving after ended
+    _, _, reference_etag = replay(events)
+    statuses, details, etag = replay(
+        [events[0]] * 10 + [events[1]] * 5 + [events[2]] * 10 + [events[1]] * 5
+    )
+
+    checks = {
+        "3 deliveries ingested": statuses.count("success") == 3,
+        "27 acknowledged as duplicates": statuses.count("duplicate") == 27,
+        "3 webhook rows written": len(details["webhooks"]) == 3,
+        "no extra writes for duplicates":
+            etag.rsplit("-", 1)[-1] == reference_etag.rsplit("-", 1)[-1],
+        "late joined does not overwrite ended": details["call"]["status"] == "ended",
+        "joined_at recorded": details["call"]["joined_at"] == "2026-01-19T15:00:05Z",
+    }
+    for name, ok in checks.items():
+        print(f"  {'✅' if ok else '❌'} {name}")
+    return all(checks.values())
+
+
 def main():
     """Run all tests."""
     print("\n" + "=" * 60)
@@ -172,6 +216,9 @@ def main():
     # List all calls
     test_list_calls()
 
+    # Webhook idempotency (does not need Ultravox)
+    test_webhook_replay()
+
     print("\n" + "=" * 60)
     print("🎉 Tests Complete!")
     print("=" * 60)
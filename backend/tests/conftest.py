@@ -0,0 +1,61 @@
+"""
+Shared fixtures for the backend tests.
+
+Run from backend/:
+    python -m pytest tests -q
+"""
+
+import asyncio
+import os
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+
+os.environ.setdefault("ULTRAVOX_API_KEY", "test-key")
+os.environ.setdefault("ULTRAVOX_AGENT_ID", "test-agent")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pytest  # noqa: E402
+import uvicorn  # noqa: E402
+
+import database  # noqa: E402
+import mock_ultravox  # noqa: E402
+
+
+@pytest.fixture
+def make_db(tmp_path, monkeypatch):
+    """Return a function that initializes a scratch database with `shards` shards."""
+
+    def make(shards: int = 1):
+        monkeypatch.setattr(database, "DB_PATH", tmp_path / "test.db")
+        monkeypatch.setattr(database, "SHARD_COUNT", shards)
+        database.call_cache.clear()
+        asyncio.run(database.init_db())
+        return database
+
+    return make
+
+
+@pytest.fixture
+def ultravox_url():
+    """Serve mock_ultravox.py on a free port; yields its API base URL."""
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    server = uvicorn.Server(
+        uvicorn.Config(mock_ultravox.app, log_level="warning", lifespan="off")
+    )
+    thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    yield f"http://127.0.0.1:{sock.getsockname()[1]}/api"
+    server.should_exit = True
+    thread.join()
+    mock_ultravox.calls.clear()
+    mock_ultravox.messages.clear()
+    for name in mock_ultravox.MockSettings.__annotations__:
+        setattr(mock_ultravox.settings, name, getattr(mock_ultravox.MockSettings, name))
+    for name in mock_ultravox.stats:
+        mock_ultravox.stats[name] = 0
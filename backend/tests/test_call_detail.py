@@ -0,0 +1,48 @@
+"""Call detail: one JSON document built by SQLite with stored JSON embedded."""
+
+import asyncio
+import json
+
+from fastapi.testclient import TestClient
+
+
+async def seed(database) -> None:
+    await database.create_call(
+        "call-1", "test-agent", "wss://join", {"joinUrl": "wss://join", "medium": {"webRtc": {}}},
+        metadata={"source": "test"},
+    )
+    for event in ("call.joined", "call.ended"):
+        await database.ingest_webhook(
+            "call-1", event, f"2026-01-19T16:05:0{len(event)}Z", {"event": event, "n": [1, 2]}
+        )
+    await database.log_tool_invocation("call-1", "escalate_to_human", {"reason": "angry \"customer\""})
+
+
+def test_document_embeds_stored_json_and_keeps_time_order(make_db):
+    database = make_db()
+    asyncio.run(seed(database))
+
+    detail = json.loads(asyncio.run(database.get_call_detail_json("call-1")))
+
+    assert detail["call"]["call_id"] == "call-1"
+    assert detail["call"]["response_json"] == {"joinUrl": "wss://join", "medium": {"webRtc": {}}}
+    assert [w["event_type"] for w in detail["webhooks"]] == ["call.joined", "call.ended"]
+    assert detail["webhooks"][0]["payload"] == {"event": "call.joined", "n": [1, 2]}
+    assert detail["tool_invocations"][0]["parameters"] == {"reason": 'angry "customer"'}
+    assert asyncio.run(database.get_call_detail_json("missing")) is None
+
+
+def test_endpoint_streams_the_document_with_an_etag(make_db):
+    database = make_db()
+    asyncio.run(seed(database))
+    import main
+
+    client = TestClient(main.app)
+    response = client.get("/api/calls/call-1")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert response.content == asyncio.run(database.get_call_detail_json("call-1"))
+    etag = response.headers["ETag"]
+    assert client.get("/api/calls/call-1", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/api/calls/missing").status_code == 404
@@ -0,0 +1,104 @@
+"""Reconciliation sync against mock_ultravox.py with a large paginated call listing."""
+
+import asyncio
+
+import pytest
+
+import call_sync
+import mock_ultravox
+import ultravox_api
+from upstream import UltravoxUpstream
+
+AGENT_ID = "test-agent"
+SEEDED = 20000
+
+
+@pytest.fixture
+def listing(ultravox_url, make_db, monkeypatch):
+    """A mock account with SEEDED past calls, every tenth one our agent's."""
+    monkeypatch.setattr(ultravox_api, "upstream", UltravoxUpstream(
+        ultravox_url, {}, rate=10000, burst=10000, initial_concurrency=8, min_concurrency=1,
+        max_concurrency=8, target_latency=5, timeout=30, queue_timeout=5,
+        failure_threshold=5, reset_timeout=1,
+    ))
+    mock_ultravox._seed_calls(SEEDED)
+    ours = set()
+    for i, call in enumerate(mock_ultravox.calls.values()):
+        if i % 10 == 0:
+            call["agentId"] = AGENT_ID
+            ours.add(call["callId"])
+    return make_db(shards=2), ours
+
+
+def make_sync() -> call_sync.CallSync:
+    return call_sync.CallSync(
+        interval=0, requests_per_minute=600000, page_size=500,
+        recheck_batch=100, recheck_age=0, agent_id=AGENT_ID,
+    )
+
+
+async def local_call_ids(database) -> set:
+    return {call["call_id"] for call in await database.get_all_calls()}
+
+
+def test_listing_inserts_only_our_agents_calls(listing):
+    database, ours = listing
+    sync = make_sync()
+
+    asyncio.run(sync._sync_listing())
+
+    assert asyncio.run(local_call_ids(database)) == ours
+    assert sync.stats["listed"] == SEEDED
+    assert sync.stats["requests"] == SEEDED // 500
+    newest = max(call["created"] for call in mock_ultravox.calls.values())
+    assert asyncio.run(database.get_sync_cursor(call_sync.LISTING_CURSOR)) == newest
+
+
+def test_listing_resumes_from_the_saved_cursor_after_a_failure(listing, monkeypatch):
+    database, ours = listing
+    sync = make_sync()
+    get = sync._get
+    requested = []
+    fail_at = [15]
+
+    async def failing_get(path, **kwargs):
+        requested.append(dict(kwargs["params"]))
+        if len(requested) == fail_at[0]:
+            fail_at[0] = None
+            raise RuntimeError("connection reset")
+        return await get(path, **kwargs)
+
+    monkeypatch.setattr(sync, "_get", failing_get)
+    with pytest.raises(RuntimeError):
+        asyncio.run(sync._sync_listing())
+    cursor = asyncio.run(database.get_sync_cursor(call_sync.LISTING_CURSOR))
+    assert cursor is not None
+    assert asyncio.run(local_call_ids(database)) < ours
+
+    requested.clear()
+    asyncio.run(sync._sync_listing())
+
+    # The second run starts from the high-water mark, not from the beginning
+    assert requested[0]["fromDate"] == cursor
+    assert len(requested) <= SEEDED // 500 - 14 + 1
+    assert asyncio.run(local_call_ids(database)) == ours
+
+    requested.clear()
+    asyncio.run(sync._sync_listing())
+    assert len(requested) == 1
+
+
+def test_unknown_calls_are_remembered_in_a_bounded_set(listing, monkeypatch):
+    database, _ = listing
+    monkeypatch.setattr(call_sync, "NOT_FOUND_MAX", 20)
+    sync = make_sync()
+
+    async def create_unknown():
+        for i in range(50):
+            await database.create_call(f"unknown-{i:02d}", AGENT_ID, "", {})
+
+    asyncio.run(create_unknown())
+    asyncio.run(sync._recheck())
+
+    assert sync.stats["not_found"] == 50
+    assert sync._not_found.stats()["size"] == 20
@@ -0,0 +1,87 @@
+"""Campaign dialing: job outcomes when the local writes fail, and restart requeueing."""
+
+import asyncio
+
+import campaigns
+
+
+class Response:
+    status_code = 201
+    headers = {}
+    text = ""
+
+    def __init__(self, call_id: str):
+        self.call_id = call_id
+
+    def json(self):
+        return {"callId": self.call_id}
+
+
+async def dial_one(database, to_number: str = "+15550100") -> dict:
+    campaign_id = await database.create_campaign(
+        "test", [{"to_number": to_number}], calls_per_second=10, max_concurrent=1, max_attempts=3
+    )
+    campaign = await database.get_campaign(campaign_id)
+    [job] = await database.claim_campaign_jobs(campaign_id, 1, now=1e12)
+    await campaigns.CampaignScheduler()._dial(campaign, job)
+    return await job_row(database, job["id"])
+
+
+async def job_row(database, job_id: int) -> dict:
+    async with database._connect() as db:
+        cursor = await db.execute(
+            "SELECT status, call_id, last_error FROM campaign_jobs WHERE id = ?", (job_id,)
+        )
+        status, call_id, last_error = await cursor.fetchone()
+    return {"status": status, "call_id": call_id, "last_error": last_error}
+
+
+def test_placed_call_completes_the_job_even_if_storing_it_fails(make_db, monkeypatch):
+    database = make_db()
+
+    async def create_agent_call(payload):
+        return Response("call-1")
+
+    async def create_call(**kwargs):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(campaigns, "create_agent_call", create_agent_call)
+    monkeypatch.setattr(campaigns, "create_call", create_call)
+
+    job = asyncio.run(dial_one(database))
+
+    assert job["status"] == "completed"
+    assert job["call_id"] == "call-1"
+
+
+def test_unexpected_errors_fail_the_job(make_db, monkeypatch):
+    database = make_db()
+
+    async def create_agent_call(payload):
+        raise ValueError("bad payload")
+
+    monkeypatch.setattr(campaigns, "create_agent_call", create_agent_call)
+
+    job = asyncio.run(dial_one(database))
+
+    assert job["status"] == "failed"
+    assert "bad payload" in job["last_error"]
+
+
+def test_restart_requeues_only_jobs_without_a_call(make_db):
+    database = make_db()
+
+    async def interrupted() -> list:
+        campaign_id = await database.create_campaign(
+            "test", [{"to_number": "+15550100"}, {"to_number": "+15550101"}],
+            calls_per_second=10, max_concurrent=2, max_attempts=3,
+        )
+        dialed, undialed = await database.claim_campaign_jobs(campaign_id, 2, now=1e12)
+        await database.record_campaign_call(dialed["id"], "call-1")
+        await database.requeue_dialing_jobs()
+        return [await job_row(database, job["id"]) for job in (dialed, undialed)]
+
+    dialed, undialed = asyncio.run(interrupted())
+
+    assert dialed == {"status": "completed", "call_id": "call-1", "last_error": None}
+    assert undialed["status"] == "pending"
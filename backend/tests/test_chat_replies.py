@@ -0,0 +1,49 @@
+"""Chat reply long-polling: replies are anchored on the user message just sent."""
+
+import asyncio
+
+from chat_replies import AGENT_ROLE, USER_ROLE, ChatReplyWatcher, has_reply
+
+GREETING = {"role": AGENT_ROLE, "text": "Hi, how can I help?"}
+
+
+def user(text: str) -> dict:
+    return {"role": USER_ROLE, "text": text}
+
+
+def agent(text: str) -> dict:
+    return {"role": AGENT_ROLE, "text": text}
+
+
+def test_greeting_is_not_a_reply():
+    assert not has_reply([GREETING])
+    assert not has_reply([GREETING], "hello")
+    assert not has_reply([GREETING, user("hello")], "hello")
+    assert has_reply([GREETING, user("hello"), agent("Hi!")], "hello")
+
+
+def test_reply_must_follow_the_message_sent():
+    history = [GREETING, user("first"), agent("One"), user("second")]
+    assert has_reply(history, "first")
+    assert not has_reply(history, "second")
+    assert not has_reply(history)
+
+
+def test_wait_ignores_the_greeting_until_the_sent_message_is_answered():
+    snapshots = [
+        [GREETING],
+        [GREETING, user("my router is down")],
+        [GREETING, user("my router is down"), agent("Let me check that.")],
+    ]
+
+    async def fetch(chat_id: str) -> list:
+        return snapshots.pop(0) if len(snapshots) > 1 else snapshots[0]
+
+    async def run():
+        watcher = ChatReplyWatcher(fetch, min_interval=0.01, max_interval=0.01)
+        return await watcher.wait("chat", 0, timeout=2, text="my router is down")
+
+    messages, timed_out = asyncio.run(run())
+
+    assert not timed_out
+    assert messages[-1] == agent("Let me check that.")
@@ -0,0 +1,95 @@
+"""Full-text search: ranking across calls and tool notes, and paging across shards."""
+
+import asyncio
+import uuid
+
+
+async def seed(database, calls: list, notes: list) -> dict:
+    """Create ended calls with summaries and engagement notes; return text -> call id."""
+    ids = {}
+    for summary in calls:
+        call_id = str(uuid.uuid4())
+        await database.create_call(call_id, "test-agent", "", {})
+        await database.update_call_status(
+            call_id, "ended", short_summary=summary[:40], summary=summary
+        )
+        ids[summary] = call_id
+    for note in notes:
+        call_id = str(uuid.uuid4())
+        await database.create_call(call_id, "test-agent", "", {})
+        await database.log_tool_invocation(
+            call_id, "log_call_engagement", {"engagement_notes": note}
+        )
+        ids[note] = call_id
+    return ids
+
+
+def search_all(database, query: str, limit: int) -> list:
+    """Page through every hit of a query."""
+    hits, offset = [], 0
+    while True:
+        page, has_more = asyncio.run(database.search_calls(query, limit=limit, offset=offset))
+        hits += page
+        assert len(page) <= limit
+        if not has_more:
+            return hits
+        assert len(page) == limit
+        offset += limit
+
+
+def test_call_summaries_and_tool_notes_are_ranked_together(make_db):
+    database = make_db()
+    filler = "the customer asked about their monthly plan and upcoming invoice dates " * 4
+    ids = asyncio.run(seed(
+        database,
+        calls=[f"router {filler}", "router router router keeps rebooting"],
+        notes=["customer mentioned the router once among many other unrelated things " * 3,
+               "router router"],
+    ))
+
+    hits, has_more = asyncio.run(database.search_calls("router"))
+
+    assert not has_more
+    assert [hit["rank"] for hit in hits] == sorted(hit["rank"] for hit in hits)
+    # Short, dense documents outrank long ones whichever table they come from
+    assert {hits[0]["call_id"], hits[1]["call_id"]} == {
+        ids["router router router keeps rebooting"], ids["router router"]
+    }
+    assert {hit["source"] for hit in hits} == {"call", "log_call_engagement"}
+    assert all("<mark>router</mark>" in hit["snippet"] for hit in hits)
+    note_hit = next(hit for hit in hits if hit["source"] == "log_call_engagement")
+    assert note_hit["invocation_id"] is not None
+
+
+def test_pagination_across_shards_returns_every_hit_once_in_rank_order(make_db):
+    database = make_db(shards=3)
+    texts = [f"modem {'modem ' * (i % 5)}replaced for customer number {i}" for i in range(40)]
+    ids = asyncio.run(seed(database, calls=texts[:25], notes=texts[25:]))
+    assert len({database.shard_for(call_id) for call_id in ids.values()}) == 3
+
+    hits = search_all(database, "modem", limit=7)
+
+    assert sorted(hit["call_id"] for hit in hits) == sorted(ids.values())
+    assert [hit["rank"] for hit in hits] == sorted(hit["rank"] for hit in hits)
+    first_page, _ = asyncio.run(database.search_calls("modem", limit=7))
+    assert first_page == hits[:7]
+
+
+def test_prefix_match_and_empty_query(make_db):
+    database = make_db()
+    ids = asyncio.run(seed(database, calls=["password reset completed"], notes=[]))
+
+    hits, _ = asyncio.run(database.search_calls("passw"))
+    assert [hit["call_id"] for hit in hits] == [ids["password reset completed"]]
+    assert asyncio.run(database.search_calls("   ")) == ([], False)
+
+
+def test_only_newest_matches_are_ranked(make_db, monkeypatch):
+    database = make_db()
+    monkeypatch.setattr(database, "SEARCH_MAX_CANDIDATES", 3)
+    texts = [f"outage report {i}" for i in range(6)]
+    ids = asyncio.run(seed(database, calls=texts, notes=[]))
+
+    hits = search_all(database, "outage", limit=2)
+
+    assert sorted(hit["call_id"] for hit in hits) == sorted(ids[text] for text in texts[3:])
@@ -0,0 +1,145 @@
+"""Ultravox admission control and usage accounting against mock_ultravox.py."""
+
+import asyncio
+import io
+import time
+
+import pytest
+import requests
+from fastapi.testclient import TestClient
+
+import accounting
+import mock_ultravox
+import ultravox_api
+from upstream import CircuitBreaker, UltravoxUpstream, UpstreamUnavailable, _streamed_bytes
+
+
+def make_upstream(url: str, **overrides) -> UltravoxUpstream:
+    options = {
+        "rate": 1000, "burst": 1000,
+        "initial_concurrency": 8, "min_concurrency": 1, "max_concurrency": 8,
+        "target_latency": 1.0, "timeout": 5, "queue_timeout": 0.1,
+        "failure_threshold": 3, "reset_timeout": 0.3,
+    }
+    return UltravoxUpstream(url, {}, **{**options, **overrides})
+
+
+def test_breaker_opens_on_server_errors_and_recovers_after_a_probe(ultravox_url):
+    mock_ultravox.settings.error_rate = 1.0
+
+    async def run():
+        upstream = make_upstream(ultravox_url)
+        for _ in range(3):
+            assert (await upstream.request("GET", "/calls")).status_code == 503
+        assert upstream.breaker.state == CircuitBreaker.OPEN
+
+        sent = mock_ultravox.stats["requests"]
+        with pytest.raises(UpstreamUnavailable) as rejected:
+            await upstream.request("GET", "/calls")
+        assert mock_ultravox.stats["requests"] == sent
+        assert 0 < rejected.value.retry_after <= 0.3
+
+        mock_ultravox.settings.error_rate = 0.0
+        await asyncio.sleep(0.3)
+        assert (await upstream.request("GET", "/calls")).status_code == 200
+        assert upstream.breaker.state == CircuitBreaker.CLOSED
+        assert upstream.stats["rejected_open_circuit"] == 1
+
+    asyncio.run(run())
+
+
+def test_limiter_halves_on_slow_or_rate_limited_responses(ultravox_url):
+    async def run():
+        upstream = make_upstream(ultravox_url, target_latency=0.05)
+        mock_ultravox.settings.latency_ms = 100
+        await upstream.request("GET", "/calls")
+        assert upstream.limiter.limit == 4
+
+        mock_ultravox.settings.latency_ms = 0
+        mock_ultravox.settings.rate_limit_rate = 1.0
+        await asyncio.sleep(0.06)
+        assert (await upstream.request("GET", "/calls")).status_code == 429
+        assert upstream.limiter.limit == 2
+        # 429 is pushback, not an outage
+        assert upstream.breaker.consecutive_failures == 0
+
+    asyncio.run(run())
+
+
+def test_requests_beyond_the_limits_are_rejected_not_queued(ultravox_url):
+    mock_ultravox.settings.latency_ms = 300
+
+    async def run():
+        upstream = make_upstream(ultravox_url, initial_concurrency=1, max_concurrency=1)
+        started = time.monotonic()
+        results = await asyncio.gather(
+            upstream.request("GET", "/calls"),
+            upstream.request("GET", "/calls"),
+            return_exceptions=True,
+        )
+        assert time.monotonic() - started < 1
+        assert results[0].status_code == 200
+        assert isinstance(results[1], UpstreamUnavailable)
+        assert upstream.stats["rejected_overloaded"] == 1
+
+        upstream = make_upstream(ultravox_url, rate=1, burst=1)
+        mock_ultravox.settings.latency_ms = 0
+        await upstream.request("GET", "/calls")
+        with pytest.raises(UpstreamUnavailable):
+            await upstream.request("GET", "/calls")
+        assert upstream.stats["rejected_rate_limited"] == 1
+
+    asyncio.run(run())
+
+
+def test_messages_answer_503_once_the_breaker_opens(ultravox_url, make_db, monkeypatch):
+    database = make_db()
+    import main
+
+    monkeypatch.setattr(ultravox_api, "upstream", make_upstream(ultravox_url, failure_threshold=2))
+    asyncio.run(database.create_call("live-call", "test-agent", "", {}))
+    mock_ultravox.settings.error_rate = 1.0
+    client = TestClient(main.app)
+
+    for _ in range(2):
+        response = client.get("/api/calls/live-call/messages")
+        assert response.status_code == 200
+        assert response.json()["messages"] == []
+
+    response = client.get("/api/calls/live-call/messages")
+    assert response.status_code == 503
+    assert "circuit breaker" in response.json()["detail"]
+    assert int(response.headers["Retry-After"]) >= 1
+
+
+def test_streamed_responses_are_counted_without_reading_the_body(ultravox_url):
+    async def run():
+        usage = accounting.collect()
+        upstream = make_upstream(ultravox_url)
+        call = (await upstream.request("POST", "/calls", json={})).json()
+        usage.counters["ultravox_bytes"] = 0
+
+        response = await upstream.request(
+            "GET", f"/calls/{call['callId']}/recording", stream=True
+        )
+        return usage, response
+
+    usage, response = asyncio.run(run())
+
+    assert not response._content_consumed
+    size = int(response.headers["Content-Length"])
+    assert usage.counters["ultravox_bytes"] == size
+    assert len(b"".join(response.iter_content(8192))) == size
+
+
+def test_streamed_bytes_without_a_length_are_charged_once_read(monkeypatch):
+    monkeypatch.setattr(accounting, "ledger", accounting.CostLedger())
+    response = requests.Response()
+    response.raw = io.BytesIO(b"x" * 20000)
+
+    with accounting.charge_to("call-1"):
+        assert _streamed_bytes(response) == 0
+    assert accounting.ledger._pending["call-1"]["ultravox_bytes"] == 0
+
+    assert len(b"".join(response.iter_content(4096))) == 20000
+    assert accounting.ledger._pending["call-1"]["ultravox_bytes"] == 20000
@@ -0,0 +1,240 @@
+"""
+In-process request tracing.
+
+The request middleware opens a trace per request, whose id is the request's
+correlation id (X-Request-ID, also on its log lines). Spans opened while it
+is handled (database.py functions, Ultravox requests, JSON rendering) become
+its children; the current trace and span live in context variables, so they
+follow the request into the tasks and executor calls it starts.
+
+Finished traces slower than the threshold are kept in a bounded ring buffer
+for the debug endpoints; the rest are dropped. A span is one small object
+appended to a list, and code running outside a request (background tasks)
+only pays a context variable lookup, so tracing can stay on in production.
+"""
+
+import contextlib
+import contextvars
+import functools
+import inspect
+import os
+import time
+from collections import deque
+
+# Trace of the request being handled, and the innermost open span in it
+_trace_var = contextvars.ContextVar("trace", default=None)
+_span_var = contextvars.ContextVar("span", default=None)
+
+
+class Span:
+    """A timed operation within a trace; `parent` is the parent span's index."""
+
+    __slots__ = ("index", "name", "category", "parent", "start", "end", "attrs")
+
+    def __init__(self, index: int, name: str, category: str, parent, attrs: dict):
+        self.index = index
+        self.name = name
+        self.category = category
+        self.parent = parent
+        self.start = time.perf_counter()
+        self.end = None
+        self.attrs = attrs
+
+    def to_dict(self, origin: float) -> dict:
+        end = self.end if self.end is not None else self.start
+        return {
+            "name": self.name,
+            "category": self.category,
+            "parent": self.parent,
+            "start_ms": round((self.start - origin) * 1000, 3),
+            "duration_ms": round((end - self.start) * 1000, 3),
+            **({"attrs": self.attrs} if self.attrs else {}),
+        }
+
+
+class Trace:
+    """The spans of one request; spans[0] is the request itself."""
+
+    __slots__ = ("trace_id", "started_at", "spans", "max_spans", "dropped_spans")
+
+    def __init__(self, trace_id: str, name: str, max_spans: int):
+        self.trace_id = trace_id
+        self.started_at = time.time()
+        self.spans = [Span(0, name, "request", None, {})]
+        self.max_spans = max_spans
+        self.dropped_spans = 0
+
+    @property
+    def root(self) -> Span:
+        return self.spans[0]
+
+    @property
+    def duration(self) -> float:
+        return (self.root.end or time.perf_counter()) - self.root.start
+
+    def open(self, name: str, category: str, parent: Span, attrs: dict):
+        """Add a child span, or return None once the trace holds max_spans."""
+        if len(self.spans) >= self.max_spans:
+            self.dropped_spans += 1
+            return None
+        span = Span(len(self.spans), name, category, parent.index if parent else 0, attrs)
+        self.spans.append(span)
+        return span
+
+    def summary(self) -> dict:
+        """Duration and time spent per span category (concurrent spans add up)."""
+        by_category = {}
+        for span in self.spans[1:]:
+            if span.end is not None:
+                by_category[span.category] = by_category.get(span.category, 0) + span.end - span.start
+        return {
+            "trace_id": self.trace_id,
+            "name": self.root.name,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration * 1000, 3),
+            "spans": len(self.spans),
+            "dropped_spans": self.dropped_spans,
+            "attrs": self.root.attrs,
+            "category_ms": {
+                category: round(seconds * 1000, 3) for category, seconds in by_category.items()
+            },
+        }
+
+    def to_dict(self) -> dict:
+        origin = self.root.start
+        return {**self.summary(), "span_list": [span.to_dict(origin) for span in self.spans]}
+
+
+class Tracer:
+    """Starts request traces and keeps the slow ones."""
+
+    def __init__(self, slow_ms: float = 500, buffer_size: int = 200, max_spans: int = 500):
+        # slow_ms <= 0 turns tracing off
+        self.enabled = slow_ms > 0
+        self.slow = slow_ms / 1000
+        self.max_spans = max_spans
+        self.traces = deque(maxlen=buffer_size)
+        self.stats = {"traced": 0, "kept": 0}
+
+    def start(self, trace_id: str, name: str):
+        """Begin a trace for the current request; returns None when tracing is off."""
+        if not self.enabled:
+            return None
+        trace = Trace(trace_id, name, self.max_spans)
+        _trace_var.set(trace)
+        _span_var.set(trace.root)
+        return trace
+
+    def finish(self, trace, **attrs):
+        """End a request's trace and keep it if it was slow."""
+        if trace is None:
+            return
+        trace.root.end = time.perf_counter()
+        trace.root.attrs.update(attrs)
+        self.stats["traced"] += 1
+        if trace.duration >= self.slow:
+            self.traces.append(trace)
+            self.stats["kept"] += 1
+
+    def get(self, trace_id: str):
+        for trace in self.traces:
+            if trace.trace_id == trace_id:
+                return trace
+        return None
+
+    def snapshot(self) -> dict:
+        return {
+            **self.stats,
+            "enabled": self.enabled,
+            "slow_ms": self.slow * 1000,
+            "buffered": len(self.traces),
+        }
+
+
+class _SpanScope:
+    """Context manager that makes a span current for the enclosed block."""
+
+    __slots__ = ("span", "token")
+
+    def __init__(self, span: Span):
+        self.span = span
+
+    def __enter__(self) -> Span:
+        self.token = _span_var.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        self.span.end = time.perf_counter()
+        if exc_type is not None:
+            self.span.attrs["error"] = exc_type.__name__
+        _span_var.reset(self.token)
+
+
+_NO_SPAN = contextlib.nullcontext()
+
+
+def span(name: str, category: str, **attrs):
+    """Time the enclosed block as a child of the current span, if a request is traced."""
+    trace = _trace_var.get()
+    if trace is None:
+        return _NO_SPAN
+    current = trace.open(name, category, _span_var.get(), attrs)
+    return _NO_SPAN if current is None else _SpanScope(current)
+
+
+def traced(name: str, category: str):
+    """Decorate a coroutine function so each call is a span."""
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            trace = _trace_var.get()
+            if trace is None:
+                return await func(*args, **kwargs)
+            current = trace.open(name, category, _span_var.get(), {})
+            if current is None:
+                return await func(*args, **kwargs)
+            with _SpanScope(current):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def instrument(namespace: dict, category: str, prefix: str):
+    """Wrap every public coroutine function defined in a module namespace in a span."""
+    module = namespace["__name__"]
+    for attr, value in list(namespace.items()):
+        if (
+            not attr.startswith("_")
+            and inspect.iscoroutinefunction(value)
+            and value.__module__ == module
+        ):
+            namespace[attr] = traced(f"{prefix}.{attr}", category)(value)
+
+
+def chrome_trace(traces: list) -> dict:
+    """Traces as Chrome trace-event JSON (load in chrome://tracing or Perfetto)."""
+    pid = os.getpid()
+    events = []
+    for tid, trace in enumerate(traces, 1):
+        # Absolute microseconds, so several traces line up on one timeline
+        offset = trace.started_at * 1e6 - trace.root.start * 1e6
+        events.append({
+            "name": "thread_name", "ph": "M", "pid": pid, "tid": tid,
+            "args": {"name": f"{trace.root.name} [{trace.trace_id}]"},
+        })
+        for span in trace.spans:
+            end = span.end if span.end is not None else span.start
+            events.append({
+                "name": span.name,
+                "cat": span.category,
+                "ph": "X",
+                "ts": round(offset + span.start * 1e6, 3),
+                "dur": round((end - span.start) * 1e6, 3),
+                "pid": pid,
+                "tid": tid,
+                "args": {"trace_id": trace.trace_id, **span.attrs},
+            })
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
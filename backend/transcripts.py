@@ -0,0 +1,36 @@
+"""
+Local transcript store.
+
+When a call ends, a store_transcript job (see job_queue.py) fetches its full
+message history from Ultravox once and stores it in the messages table, so
+transcript views are served from SQLite. Failed fetches are retried by the
+job queue; calls Ultravox does not know about (4xx other than 429) are not.
+"""
+
+import requests
+
+from accounting import charge_to
+from database import store_call_messages
+from job_queue import PermanentJobError
+from ultravox_api import get_call_messages
+
+JOB_KIND = "store_transcript"
+
+
+def transcript_job_key(call_id: str) -> str:
+    """Idempotency key, so repeated call.ended deliveries fetch once."""
+    return f"{JOB_KIND}:{call_id}"
+
+
+async def store_transcript(payload: dict):
+    """Job handler: copy an ended call's messages from Ultravox into SQLite."""
+    call_id = payload["call_id"]
+    with charge_to(call_id):
+        try:
+            messages = await get_call_messages(call_id)
+        except requests.exceptions.HTTPError as e:
+            status = e.response.status_code if e.response is not None else None
+            if status is not None and status < 500 and status != 429:
+                raise PermanentJobError(f"Ultravox returned {status} for call {call_id}") from e
+            raise
+        await store_call_messages(call_id, messages)
@@ -0,0 +1,121 @@
+"""
+Helpers for building and sending requests to the Ultravox REST API.
+
+All requests go through the shared admission-control layer in upstream.py.
+"""
+
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+from config import (
+    ULTRAVOX_API_KEY,
+    ULTRAVOX_AGENT_ID,
+    ULTRAVOX_API_BASE,
+    SIP_DOMAIN,
+    SIP_USERNAME,
+    SIP_PASSWORD,
+    SIP_FROM_NUMBER,
+    WORKERS,
+    UPSTREAM_RATE_PER_SECOND,
+    UPSTREAM_BURST,
+    UPSTREAM_INITIAL_CONCURRENCY,
+    UPSTREAM_MIN_CONCURRENCY,
+    UPSTREAM_MAX_CONCURRENCY,
+    UPSTREAM_TARGET_LATENCY_MS,
+    UPSTREAM_TIMEOUT_SECONDS,
+    UPSTREAM_QUEUE_TIMEOUT_SECONDS,
+    UPSTREAM_FAILURE_THRESHOLD,
+    UPSTREAM_RESET_TIMEOUT_SECONDS,
+    get_webhook_url,
+)
+from upstream import UltravoxUpstream
+
+# Each worker process gets an equal share of the configured Ultravox budget
+upstream = UltravoxUpstream(
+    base_url=ULTRAVOX_API_BASE,
+    headers={"X-API-Key": ULTRAVOX_API_KEY},
+    rate=UPSTREAM_RATE_PER_SECOND / WORKERS,
+    burst=max(1.0, UPSTREAM_BURST / WORKERS),
+    initial_concurrency=max(1, UPSTREAM_INITIAL_CONCURRENCY // WORKERS),
+    min_concurrency=UPSTREAM_MIN_CONCURRENCY,
+    max_concurrency=max(UPSTREAM_MIN_CONCURRENCY, UPSTREAM_MAX_CONCURRENCY // WORKERS),
+    target_latency=UPSTREAM_TARGET_LATENCY_MS / 1000,
+    timeout=UPSTREAM_TIMEOUT_SECONDS,
+    queue_timeout=UPSTREAM_QUEUE_TIMEOUT_SECONDS,
+    failure_threshold=UPSTREAM_FAILURE_THRESHOLD,
+    reset_timeout=UPSTREAM_RESET_TIMEOUT_SECONDS,
+)
+
+
+def webrtc_call_payload(metadata: dict, recording_enabled: bool, first_speaker_prompt: str,
+                        join_timeout: float = None) -> dict:
+    """Build the call creation payload for a browser (WebRTC) call."""
+    payload = {
+        "medium": {"webRtc": {}},
+        "recordingEnabled": recording_enabled,
+        "metadata": metadata,
+        "firstSpeakerSettings": {"agent": {"prompt": first_speaker_prompt}},
+        "callbacks": {
+            "joined": {"url": get_webhook_url()},
+            "ended": {"url": get_webhook_url()},
+        },
+    }
+    if join_timeout:
+        payload["joinTimeout"] = f"{int(join_timeout)}s"
+    return payload
+
+
+def sip_outbound_payload(to_number: str, template_context: dict = None) -> dict:
+    """Build the call creation payload for an outbound SIP call."""
+    payload = {
+        "medium": {
+            "sip": {
+                "outgoing": {
+                    "to": f"sip:{to_number}@{SIP_DOMAIN}",
+                    "from": SIP_FROM_NUMBER,
+                    "username": SIP_USERNAME,
+                    "password": SIP_PASSWORD,
+                }
+            }
+        }
+    }
+    if template_context:
+        payload["templateContext"] = template_context
+    return payload
+
+
+def next_cursor(page: dict):
+    """The `cursor` of a paginated response's `next` URL, or None on the last page."""
+    cursor = parse_qs(urlparse(page.get("next") or "").query).get("cursor")
+    return cursor[0] if cursor else None
+
+
+async def ultravox_request(method: str, path: str, **kwargs) -> requests.Response:
+    """Send a request to an Ultravox API path (e.g. "/calls/{id}/messages")."""
+    return await upstream.request(method, path, **kwargs)
+
+
+async def create_agent_call(payload: dict) -> requests.Response:
+    """POST a new call for the configured agent and return the raw response."""
+    return await upstream.request(
+        "POST", f"/agents/{ULTRAVOX_AGENT_ID}/calls", json=payload
+    )
+
+
+async def get_call_messages(call_id: str, page_size: int = 200) -> list:
+    """
+    Fetch a call's full message history, following Ultravox pagination.
+    Raises requests.exceptions.HTTPError on a non-200 response.
+    """
+    messages = []
+    params = {"pageSize": page_size}
+    while True:
+        response = await ultravox_request("GET", f"/calls/{call_id}/messages", params=params)
+        response.raise_for_status()
+        data = response.json()
+        messages.extend(data.get("results", []))
+        cursor = next_cursor(data)
+        if not cursor:
+            return messages
+        params["cursor"] = cursor
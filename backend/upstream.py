@@ -0,0 +1,319 @@
+"""
+Admission control for outbound Ultravox API requests.
+
+Every request passes three gates before it is sent:
+
+- a token bucket capping the global request rate,
+- an AIMD concurrency limiter whose cap grows additively while Ultravox is
+  fast and healthy and halves when latency exceeds the target or it pushes
+  back with 429/5xx/timeouts,
+- a circuit breaker that fails fast while Ultravox is down and lets a few
+  half-open probes through after a cool-down.
+
+Requests that cannot be admitted raise UpstreamUnavailable instead of
+queueing forever, so handlers can answer 503 with a Retry-After hint.
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import accounting
+from tracing import span
+
+
+class UpstreamUnavailable(Exception):
+    """Raised when a request is rejected by admission control."""
+
+    def __init__(self, reason: str, retry_after: float = 1.0):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Async token bucket: `rate` tokens per second, bursting up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = None
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self) -> bool:
+        """Take a token if one is available right now."""
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def wait_time(self) -> float:
+        """Seconds until the next token is available."""
+        self._refill()
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+    async def acquire(self, timeout: float = None):
+        """Wait until a token is available and take it (TimeoutError after `timeout`)."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        async with self._lock:
+            while not self.try_acquire():
+                delay = self.wait_time()
+                if deadline is not None and time.monotonic() + delay > deadline:
+                    raise asyncio.TimeoutError()
+                await asyncio.sleep(delay)
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD concurrency cap driven by observed latency and upstream pushback."""
+
+    def __init__(self, initial: int, minimum: int, maximum: int,
+                 target_latency: float, backoff_ratio: float = 0.5):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_latency = target_latency
+        self.backoff_ratio = backoff_ratio
+        self.in_flight = 0
+        self.latency_ewma = None
+        self._last_decrease = 0.0
+        self._condition = None
+
+    async def acquire(self, timeout: float):
+        """Wait for a slot under the current limit (TimeoutError after `timeout`)."""
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        async with self._condition:
+            await asyncio.wait_for(
+                self._condition.wait_for(lambda: self.in_flight < int(self.limit)),
+                timeout,
+            )
+            self.in_flight += 1
+
+    async def release(self, latency: float, overloaded: bool):
+        """Free a slot and adapt the limit from this request's outcome."""
+        self.latency_ewma = (
+            latency if self.latency_ewma is None
+            else 0.8 * self.latency_ewma + 0.2 * latency
+        )
+        now = time.monotonic()
+        if overloaded or latency > self.target_latency:
+            # Decrease at most once per target latency so a burst of slow
+            # responses from the same window only halves the limit once
+            if now - self._last_decrease > self.target_latency:
+                self.limit = max(self.minimum, self.limit * self.backoff_ratio)
+                self._last_decrease = now
+        else:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+
+class CircuitBreaker:
+    """Closed -> open after consecutive failures; half-open probes after a cool-down."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float, half_open_probes: int = 1):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = half_open_probes
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probes_in_flight = 0
+        self.times_opened = 0
+
+    def retry_after(self) -> float:
+        """Seconds until the breaker will allow a probe."""
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now (reserves a probe slot when half-open)."""
+        if self.state == self.OPEN:
+            if self.retry_after() > 0:
+                return False
+            self.state = self.HALF_OPEN
+            self.probes_in_flight = 0
+        if self.state == self.HALF_OPEN:
+            if self.probes_in_flight >= self.half_open_probes:
+                return False
+            self.probes_in_flight += 1
+        return True
+
+    def record_success(self):
+        self.consecutive_failures = 0
+        if self.state == self.HALF_OPEN:
+            self.state = self.CLOSED
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self._open()
+
+    def _open(self):
+        if self.state != self.OPEN:
+            self.times_opened += 1
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+
+
+def _streamed_bytes(response: requests.Response) -> int:
+    """
+    Size of a streamed response's body without reading it: its Content-Length,
+    or without one 0 now, with the bytes charged to the call once the body
+    has been read through iter_content.
+    """
+    length = response.headers.get("Content-Length", "")
+    if length.isdigit():
+        return int(length)
+    call_id = accounting.current_call_id()
+    iter_content = response.iter_content
+
+    def counted(*args, **kwargs):
+        received = 0
+        try:
+            for chunk in iter_content(*args, **kwargs):
+                received += len(chunk)
+                yield chunk
+        finally:
+            with accounting.charge_to(call_id):
+                accounting.record(ultravox_bytes=received)
+
+    response.iter_content = counted
+    return 0
+
+
+class UltravoxUpstream:
+    """Sends requests to Ultravox through rate, concurrency and breaker gates."""
+
+    def __init__(self, base_url: str, headers: dict, rate: float, burst: float,
+                 initial_concurrency: int, min_concurrency: int, max_concurrency: int,
+                 target_latency: float, timeout: float, queue_timeout: float,
+                 failure_threshold: int, reset_timeout: float):
+        self.base_url = base_url
+        self.headers = headers
+        self.timeout = timeout
+        self.queue_timeout = queue_timeout
+        self.bucket = TokenBucket(rate, burst)
+        self.limiter = AdaptiveConcurrencyLimiter(
+            initial_concurrency, min_concurrency, max_concurrency, target_latency
+        )
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency)
+        self.stats = {
+            "requests": 0,
+            "succeeded": 0,
+            "failed": 0,
+            "rejected_open_circuit": 0,
+            "rejected_rate_limited": 0,
+            "rejected_overloaded": 0,
+        }
+
+    async def request(self, method: str, path: str, **kwargs) -> requests.Response:
+        """
+        Send a request to `{base_url}{path}`.
+        Raises UpstreamUnavailable if it cannot be admitted, and
+        requests.exceptions.RequestException on network errors/timeouts.
+        """
+        if not self.breaker.allow():
+            self.stats["rejected_open_circuit"] += 1
+            raise UpstreamUnavailable(
+                "Ultravox circuit breaker is open", self.breaker.retry_after() or 1.0
+            )
+
+        try:
+            await self.bucket.acquire(timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._abandon_probe()
+            self.stats["rejected_rate_limited"] += 1
+            raise UpstreamUnavailable("Ultravox request rate limit reached", self.bucket.wait_time())
+
+        try:
+            await self.limiter.acquire(timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._abandon_probe()
+            self.stats["rejected_overloaded"] += 1
+            raise UpstreamUnavailable("Too many concurrent Ultravox requests")
+
+        self.stats["requests"] += 1
+        stream = kwargs.get("stream", False)
+        headers = {**self.headers, **kwargs.pop("headers", {})}
+        kwargs.setdefault("timeout", self.timeout)
+        loop = asyncio.get_running_loop()
+        started = time.monotonic()
+        overloaded = True
+        try:
+            with span(f"{method} {path}", "upstream") as current:
+                response = await loop.run_in_executor(
+                    self.executor,
+                    lambda: requests.request(
+                        method, f"{self.base_url}{path}", headers=headers, **kwargs
+                    ),
+                )
+                if current is not None:
+                    current.attrs["status"] = response.status_code
+            # Reading .content would load a streamed body into memory here
+            received = _streamed_bytes(response) if stream else len(response.content)
+            accounting.record(
+                ultravox_requests=1,
+                ultravox_bytes=len(response.request.body or b"") + received,
+            )
+        except requests.exceptions.RequestException:
+            self.stats["failed"] += 1
+            self.breaker.record_failure()
+            raise
+        else:
+            overloaded = response.status_code == 429 or response.status_code >= 500
+            if response.status_code >= 500:
+                self.stats["failed"] += 1
+                self.breaker.record_failure()
+            else:
+                self.stats["succeeded"] += 1
+                self.breaker.record_success()
+            return response
+        finally:
+            await self.limiter.release(time.monotonic() - started, overloaded)
+
+    def _abandon_probe(self):
+        """Give back a half-open probe slot reserved for a request that never ran."""
+        if self.breaker.state == CircuitBreaker.HALF_OPEN:
+            self.breaker.probes_in_flight -= 1
+
+    def snapshot(self) -> dict:
+        """Current admission-control state for monitoring."""
+        return {
+            "circuit": {
+                "state": self.breaker.state,
+                "consecutive_failures": self.breaker.consecutive_failures,
+                "times_opened": self.breaker.times_opened,
+                "retry_after": round(self.breaker.retry_after(), 2)
+                if self.breaker.state == CircuitBreaker.OPEN else 0,
+            },
+            "concurrency": {
+                "limit": round(self.limiter.limit, 2),
+                "in_flight": self.limiter.in_flight,
+                "latency_ewma_ms": round(self.limiter.latency_ewma * 1000, 1)
+                if self.limiter.latency_ewma is not None else None,
+                "target_latency_ms": self.limiter.target_latency * 1000,
+            },
+            "rate_limit": {
+                "rate": self.bucket.rate,
+                "tokens": round(self.bucket.tokens, 2),
+            },
+            "stats": dict(self.stats),
+        }
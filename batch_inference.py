@@ -0,0 +1,244 @@
+"""
+Batch inference entry point.
+
+Runs the local model over a directory (or manifest) of recordings as an
+overlapped pipeline: decode -> resample -> featurize -> batched generate ->
+write, with bounded queues between the stages. Results are appended to a
+JSONL file and finished clips to a checkpoint file, so an interrupted run is
+resumed by running the same command again. Failed clips are written with an
+`error` but not checkpointed, so they are retried on the next run.
+
+Usage:
+    python batch_inference.py --input recordings/ --output results.jsonl
+    python batch_inference.py --manifest clips.txt --output results.jsonl --batch-size 16
+"""
+
+import argparse
+import json
+import os
+from pathlib import Path
+from app.core.prompts import get_system_prompt
+from app.models.ai_model import get_model_manager
+from app.utils.audio_processor import decode_audio, resample_audio
+from app.utils.pipeline import Pipeline, Stage
+
+AUDIO_EXTENSIONS = {".wav", ".mp3", ".flac", ".ogg", ".m4a"}
+SAMPLE_RATE = 16000
+
+
+def find_clips(input_dir: str) -> list:
+    """All audio files under a directory, in a stable order."""
+    root = Path(input_dir)
+    return [
+        {"id": path.relative_to(root).as_posix(), "path": str(path)}
+        for path in sorted(root.rglob("*"))
+        if path.is_file() and path.suffix.lower() in AUDIO_EXTENSIONS
+    ]
+
+
+def read_manifest(manifest_path: str) -> list:
+    """Clips from a manifest: one path per line, or JSON lines with `path` (and `id`)."""
+    base = Path(manifest_path).parent
+    clips = []
+    with open(manifest_path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            entry = json.loads(line) if line.startswith("{") else {"path": line}
+            path = Path(entry["path"])
+            if not path.is_absolute():
+                path = base / path
+            clips.append({"id": entry.get("id", entry["path"]), "path": str(path)})
+    return clips
+
+
+def read_checkpoint(checkpoint_path: str) -> set:
+    """Ids of clips finished by earlier runs."""
+    if not os.path.exists(checkpoint_path):
+        return set()
+    with open(checkpoint_path, "r") as f:
+        return {line.rstrip("\n") for line in f if line.strip()}
+
+
+def per_clip(func):
+    """Run a stage on one clip, recording failures on the clip instead of raising."""
+
+    def run(clip: dict) -> dict:
+        if "error" not in clip:
+            try:
+                func(clip)
+            except Exception as e:
+                clip["error"] = f"{type(e).__name__}: {e}"
+                clip.pop("audio", None)
+        return clip
+
+    return run
+
+
+@per_clip
+def decode(clip: dict):
+    clip["audio"], clip["native_sr"] = decode_audio(clip["path"])
+
+
+@per_clip
+def resample(clip: dict):
+    clip["audio"] = resample_audio(clip["audio"], clip["native_sr"], SAMPLE_RATE)
+    clip["duration_s"] = round(len(clip["audio"]) / SAMPLE_RATE, 3)
+
+
+class BatchRunner:
+    """Model stages plus the result/checkpoint writer."""
+
+    def __init__(self, prompt: str, output_path: str, checkpoint_path: str):
+        self.prompt = prompt
+        self.model_manager = get_model_manager()
+        self.output = open(output_path, "a")
+        self.checkpoint = open(checkpoint_path, "a")
+        self.written = 0
+        self.failed = 0
+        self.audio_seconds = 0.0
+
+    def featurize(self, clips: list) -> dict:
+        """Turn a batch of decoded clips into model inputs."""
+        ready = [clip for clip in clips if "error" not in clip]
+        inputs = None
+        if ready:
+            try:
+                inputs = self.model_manager.featurize(
+                    self.prompt, [clip["audio"] for clip in ready], SAMPLE_RATE
+                )
+            except Exception as e:
+                self._fail(ready, e)
+                ready = []
+        for clip in clips:
+            clip.pop("audio", None)
+        return {"clips": clips, "ready": ready, "inputs": inputs}
+
+    def generate(self, batch: dict) -> dict:
+        """Run the model once for the whole batch."""
+        if batch["inputs"] is not None:
+            try:
+                responses = self.model_manager.generate_from_features(batch["inputs"])
+                for clip, response in zip(batch["ready"], responses):
+                    clip["response"] = response
+            except Exception as e:
+                self._fail(batch["ready"], e)
+            batch["inputs"] = None
+        return batch
+
+    def write(self, batch: dict):
+        """Append results, then checkpoint the clips that succeeded."""
+        for clip in batch["clips"]:
+            result = {"id": clip["id"], "path": clip["path"]}
+            for key in ("duration_s", "response", "error"):
+                if key in clip:
+                    result[key] = clip[key]
+            self.output.write(json.dumps(result, ensure_ascii=False) + "\n")
+        self.output.flush()
+
+        # Results are flushed before the checkpoint, so a crash in between
+        # re-runs (and re-writes) those clips rather than losing them
+        for clip in batch["clips"]:
+            if "error" in clip:
+                self.failed += 1
+            else:
+                self.checkpoint.write(clip["id"] + "\n")
+                self.written += 1
+                self.audio_seconds += clip.get("duration_s", 0.0)
+        self.checkpoint.flush()
+
+    def close(self):
+        self.output.close()
+        self.checkpoint.close()
+
+    @staticmethod
+    def _fail(clips: list, error: Exception):
+        for clip in clips:
+            clip["error"] = f"{type(error).__name__}: {error}"
+
+
+def print_report(runner: BatchRunner, stages: list, wall_time: float, skipped: int):
+    """Throughput and how busy each stage was."""
+    processed = runner.written + runner.failed
+    print("\n" + "=" * 60)
+    print(f"✓ {runner.written} clips done, {runner.failed} failed, {skipped} skipped (checkpoint)")
+    print(f"⏱️  {wall_time:.1f}s, {processed / max(wall_time, 1e-9):.2f} clips/sec, "
+          f"{runner.audio_seconds / max(wall_time, 1e-9):.1f}x realtime")
+    decode = runner.model_manager.stats.snapshot()
+    if decode["tokens_per_second"] is not None:
+        line = f"🔤 {decode['new_tokens']} tokens, {decode['tokens_per_second']} tokens/sec"
+        if decode["acceptance_rate"] is not None:
+            line += (f", draft acceptance {decode['acceptance_rate']:.0%} "
+                     f"({decode['tokens_per_round']} tokens/round)")
+        print(line)
+    print("=" * 60)
+    print(f"{'stage':<12} {'workers':>7} {'items':>7} {'busy':>7} {'starved':>8} {'blocked':>8}")
+    for stage in stages:
+        usage = stage.utilization(wall_time)
+        print(f"{stage.name:<12} {stage.workers:>7} {usage['items']:>7} "
+              f"{usage['busy']:>7.0%} {usage['starved']:>8.0%} {usage['blocked']:>8.0%}")
+    print("=" * 60 + "\n")
+
+
+def main():
+    """Run batch inference."""
+    parser = argparse.ArgumentParser(description="Offline batch inference over recordings")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--input", help="Directory of recordings (searched recursively)")
+    source.add_argument("--manifest", help="File listing recordings, one per line")
+    parser.add_argument("--output", default="results.jsonl")
+    parser.add_argument("--checkpoint", help="Defaults to <output>.checkpoint")
+    parser.add_argument("--prompt-file", help="Defaults to the system prompt")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--batch-timeout", type=float, default=0.5,
+                        help="Seconds to wait for a full batch before running a partial one")
+    parser.add_argument("--decode-workers", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument("--queue-size", type=int, default=32)
+    parser.add_argument("--limit", type=int, help="Process at most this many clips")
+    args = parser.parse_args()
+
+    checkpoint_path = args.checkpoint or f"{args.output}.checkpoint"
+    clips = find_clips(args.input) if args.input else read_manifest(args.manifest)
+    done = read_checkpoint(checkpoint_path)
+    pending = [clip for clip in clips if clip["id"] not in done]
+    if args.limit is not None:
+        pending = pending[:args.limit]
+    skipped = sum(clip["id"] in done for clip in clips)
+
+    print(f"📂 {len(clips)} clips found, {len(pending)} to process")
+    if not pending:
+        return
+
+    if args.prompt_file:
+        with open(args.prompt_file, "r") as f:
+            prompt = f.read()
+    else:
+        prompt = get_system_prompt()
+
+    runner = BatchRunner(prompt, args.output, checkpoint_path)
+    runner.model_manager.load()  # Load once here rather than inside a stage thread
+
+    stages = [
+        Stage("decode", decode, workers=args.decode_workers),
+        Stage("resample", resample, workers=args.decode_workers),
+        Stage("featurize", runner.featurize, batch_size=args.batch_size,
+              batch_timeout=args.batch_timeout),
+        Stage("generate", runner.generate),
+        Stage("write", runner.write),
+    ]
+    pipeline = Pipeline(stages, queue_size=args.queue_size)
+
+    try:
+        wall_time = pipeline.run(iter(pending))
+    except KeyboardInterrupt:
+        print("\n⚠️  Interrupted; rerun the same command to resume")
+        return
+    finally:
+        runner.close()
+
+    print_report(runner, stages, wall_time, skipped)
+
+
+if __name__ == "__main__":
+    main()
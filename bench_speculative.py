@@ -0,0 +1,141 @@
+"""
+Speculative decoding benchmark.
+
+Decodes random prompts on CPU with a tiny randomly initialized Llama, first
+token by token and then with a draft model proposing tokens for it to verify
+(the same assisted generate() path app/models/ai_model.py uses). The draft
+is the target's first --draft-layers layers with its embeddings and head;
+the target's remaining layers have their output projections scaled by
+--skip-scale, which sets how often the two agree (random weights have no
+real draft/target relationship to exploit).
+
+Reports tokens/sec for both runs, draft acceptance and tokens per
+verification round, and with greedy decoding (the default) how many outputs
+are identical to the plain run.
+
+Usage:
+    python bench_speculative.py --new-tokens 128 --draft-tokens 5
+    python bench_speculative.py --skip-scale 0.5 --sample
+"""
+
+import argparse
+import copy
+import time
+
+import torch
+from transformers import LlamaConfig, LlamaForCausalLM
+
+from app.models.ai_model import DecodeStats, DraftModel, count_new_tokens
+
+
+def build_models(args):
+    """A tiny target model and a draft made of its first layers."""
+    torch.manual_seed(args.seed)
+    config = LlamaConfig(
+        vocab_size=args.vocab,
+        hidden_size=args.hidden,
+        intermediate_size=args.hidden * 4,
+        num_hidden_layers=args.layers,
+        num_attention_heads=max(args.hidden // 64, 1),
+        max_position_embeddings=args.prompt_tokens + args.new_tokens + 64,
+        pad_token_id=0,
+        bos_token_id=1,
+        eos_token_id=None,
+    )
+    target = LlamaForCausalLM(config).eval()
+    for layer in target.model.layers[args.draft_layers:]:
+        layer.self_attn.o_proj.weight.data.mul_(args.skip_scale)
+        layer.mlp.down_proj.weight.data.mul_(args.skip_scale)
+
+    draft_config = copy.deepcopy(config)
+    draft_config.num_hidden_layers = args.draft_layers
+    draft = LlamaForCausalLM(draft_config).eval()
+    draft.model.embed_tokens.load_state_dict(target.model.embed_tokens.state_dict())
+    draft.model.norm.load_state_dict(target.model.norm.state_dict())
+    draft.lm_head.load_state_dict(target.lm_head.state_dict())
+    for draft_layer, layer in zip(draft.model.layers, target.model.layers):
+        draft_layer.load_state_dict(layer.state_dict())
+    return target, draft
+
+
+def decode(target, prompts: list, args, draft: DraftModel = None):
+    """Generate for each prompt (batch size 1); returns outputs and stats."""
+    stats = DecodeStats()
+    outputs = []
+    options = {"max_new_tokens": args.new_tokens, "do_sample": args.sample}
+    if args.sample:
+        options["temperature"] = args.temperature
+    for prompt in prompts:
+        torch.manual_seed(args.seed)
+        started = time.perf_counter()
+        with torch.no_grad():
+            if draft is None:
+                output = target.generate(prompt, **options)
+                rounds = proposed = 0
+            else:
+                with draft.counting(target):
+                    output = target.generate(prompt, assistant_model=draft.model, **options)
+                rounds, proposed = draft.rounds, draft.proposed
+        stats.record(
+            count_new_tokens(output, prompt.shape[-1], None),
+            time.perf_counter() - started,
+            rounds,
+            proposed,
+        )
+        outputs.append(output)
+    return outputs, stats.snapshot()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark speculative decoding on CPU")
+    parser.add_argument("--prompts", type=int, default=8)
+    parser.add_argument("--prompt-tokens", type=int, default=32)
+    parser.add_argument("--new-tokens", type=int, default=128)
+    parser.add_argument("--draft-tokens", type=int, default=5, help="Tokens proposed per round")
+    parser.add_argument("--vocab", type=int, default=8000)
+    parser.add_argument("--hidden", type=int, default=256)
+    parser.add_argument("--layers", type=int, default=12)
+    parser.add_argument("--draft-layers", type=int, default=2)
+    parser.add_argument("--skip-scale", type=float, default=0.1,
+                        help="Scale of the target layers the draft lacks (lower = more agreement)")
+    parser.add_argument("--sample", action="store_true", help="Sample instead of greedy decoding")
+    parser.add_argument("--temperature", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    target, draft = build_models(args)
+    generator = torch.Generator().manual_seed(args.seed)
+    prompts = [
+        torch.randint(2, args.vocab, (1, args.prompt_tokens), generator=generator)
+        for _ in range(args.prompts)
+    ]
+
+    # Warm up both paths before timing
+    draft = DraftModel(draft, args.draft_tokens)
+    warmup = copy.copy(args)
+    warmup.new_tokens = 8
+    decode(target, prompts[:1], warmup)
+    decode(target, prompts[:1], warmup, draft)
+
+    plain_outputs, plain = decode(target, prompts, args)
+    spec_outputs, spec = decode(target, prompts, args, draft)
+
+    print("\n" + "=" * 60)
+    print(f"target {args.layers} layers, draft {args.draft_layers} layers, "
+          f"hidden {args.hidden}, {'sampling' if args.sample else 'greedy'}")
+    print("=" * 60)
+    print(f"{'plain':<12} {plain['tokens_per_second']:>10} tokens/sec")
+    print(f"{'speculative':<12} {spec['tokens_per_second']:>10} tokens/sec  "
+          f"({spec['tokens_per_second'] / plain['tokens_per_second']:.2f}x)")
+    print(f"acceptance {spec['acceptance_rate']:.0%}, "
+          f"{spec['tokens_per_round']} tokens per verification round")
+    if not args.sample:
+        identical = sum(
+            torch.equal(a, b) for a, b in zip(plain_outputs, spec_outputs)
+        )
+        print(f"{identical}/{len(prompts)} outputs identical to plain decoding")
+    print("=" * 60 + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -23,16 +23,27 @@ function showToast(message, type = 'info') {
 }
 
 // API Request Helper
+// Last response per GET endpoint, revalidated with If-None-Match
+const etagCache = new Map();
+
 async function apiRequest(endpoint, method = 'GET', body = null) {
     const options = { method, headers: { 'Content-Type': 'application/json' } };
     if (body) options.body = JSON.stringify(body);
 
+    const cached = method === 'GET' ? etagCache.get(endpoint) : null;
+    if (cached) options.headers['If-None-Match'] = cached.etag;
+    if (method === 'GET') options.cache = 'no-store';
+
     const response = await fetch(`${API_BASE}${endpoint}`, options);
+    if (response.status === 304 && cached) return cached.data;
     if (!response.ok) {
         const data = await response.json();
         throw new Error(data.detail || 'Request failed');
     }
-    return response.json();
+    const data = await response.json();
+    const etag = response.headers.get('ETag');
+    if (method === 'GET' && etag) etagCache.set(endpoint, { etag, data });
+    return data;
 }
 
 // Load Dashboard Data
@@ -58,32 +69,15 @@ function updateStats(calls) {
     document.getElementById('totalCalls').textContent = total;
     document.getElementById('activeCalls').textContent = active;
 
-    // Count escalations and resolutions
-    let escalations = 0;
-    let resolved = 0;
-    let totalLogged = 0;
-
-    calls.forEach(async (call) => {
-        try {
-            const details = await apiRequest(`/api/calls/${call.call_id}`);
-            if (details.tool_invocations) {
-                const hasEscalation = details.tool_invocations.some(t => t.tool_name === 'escalate_to_human');
-                if (hasEscalation) escalations++;
-
-                const engagement = details.tool_invocations.find(t => t.tool_name === 'log_call_engagement');
-                if (engagement) {
-                    totalLogged++;
-                    const params = JSON.parse(engagement.parameters);
-                    if (params.issue_resolved) resolved++;
-                }
-            }
-
-            document.getElementById('escalationCount').textContent = escalations;
-            const rate = totalLogged > 0 ? Math.round((resolved / totalLogged) * 100) : 0;
-            document.getElementById('resolutionRate').textContent = `${rate}%`;
-        } catch (error) {
-            console.error(`Error loading call ${call.call_id}:`, error);
-        }
+    // Escalated calls and the resolution rate (of each call's first engagement
+    // log) come from the server-side rollups
+    apiRequest('/api/analytics').then(({ totals }) => {
+        document.getElementById('escalationCount').textContent = totals.escalations.total;
+        const logged = totals.engagement.total;
+        const rate = logged > 0 ? Math.round((totals.engagement.resolved / logged) * 100) : 0;
+        document.getElementById('resolutionRate').textContent = `${rate}%`;
+    }).catch(error => {
+        console.error('Error loading analytics:', error);
     });
 }
 
@@ -150,7 +144,7 @@ async function loadEscalationsAndEngagement(calls) {
                     .forEach(e => escalations.push({
                         ...e,
                         call_id: call.call_id,
-                        params: JSON.parse(e.parameters)
+                        params: typeof e.parameters === 'string' ? JSON.parse(e.parameters) : e.parameters
                     }));
 
                 // Engagements
@@ -159,7 +153,7 @@ async function loadEscalationsAndEngagement(calls) {
                     .forEach(e => engagements.push({
                         ...e,
                         call_id: call.call_id,
-                        params: JSON.parse(e.parameters)
+                        params: typeof e.parameters === 'string' ? JSON.parse(e.parameters) : e.parameters
                     }));
             }
         } catch (error) {
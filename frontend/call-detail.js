@@ -26,12 +26,22 @@ function showToast(message, type = 'info') {
 }
 
 // API Helper
+// Last response per endpoint, revalidated with If-None-Match
+const etagCache = new Map();
+
 async function apiRequest(endpoint) {
-    const response = await fetch(`${API_BASE}${endpoint}`);
+    const cached = etagCache.get(endpoint);
+    const headers = cached ? { 'If-None-Match': cached.etag } : {};
+
+    const response = await fetch(`${API_BASE}${endpoint}`, { headers, cache: 'no-store' });
+    if (response.status === 304 && cached) return cached.data;
     if (!response.ok) {
         throw new Error('API request failed');
     }
-    return response.json();
+    const data = await response.json();
+    const etag = response.headers.get('ETag');
+    if (etag) etagCache.set(endpoint, { etag, data });
+    return data;
 }
 
 // Get Call ID from URL
@@ -313,7 +323,9 @@ function openStageModal(stageId) {
     } else if (stage.toolData) {
         let params = {};
         try {
-            params = JSON.parse(stage.toolData.parameters || '{}');
+            params = typeof stage.toolData.parameters === 'string'
+                ? JSON.parse(stage.toolData.parameters)
+                : stage.toolData.parameters || {};
         } catch (e) {
             params = stage.toolData.parameters || {};
         }
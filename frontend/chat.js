@@ -4,6 +4,13 @@ let currentChatId = null;
 let ultravoxSession = null;
 let isWaitingForResponse = false;
 let isInitialized = false;
+// Messages already seen through wait_for_reply, and replies shown this turn
+let messageIndex = 0;
+const shownReplies = new Set();
+// The user message awaiting a reply, and whether its transcript has arrived;
+// agent messages before it (like the greeting) are not its reply
+let pendingMessage = null;
+let pendingMessageSeen = false;
 
 // Theme Management
 const savedTheme = localStorage.getItem('theme') || 'light';
@@ -26,16 +33,27 @@ document.getElementById('newChatBtn').addEventListener('click', () => {
 });
 
 // API Helper
+// Last response per GET endpoint, revalidated with If-None-Match
+const etagCache = new Map();
+
 async function apiRequest(endpoint, method = 'GET', body = null) {
     const options = { method, headers: { 'Content-Type': 'application/json' } };
     if (body) options.body = JSON.stringify(body);
 
+    const cached = method === 'GET' ? etagCache.get(endpoint) : null;
+    if (cached) options.headers['If-None-Match'] = cached.etag;
+    if (method === 'GET') options.cache = 'no-store';
+
     const response = await fetch(`${API_BASE}${endpoint}`, options);
+    if (response.status === 304 && cached) return cached.data;
     if (!response.ok) {
         const data = await response.json();
         throw new Error(data.detail || 'Request failed');
     }
-    return response.json();
+    const data = await response.json();
+    const etag = response.headers.get('ETag');
+    if (method === 'GET' && etag) etagCache.set(endpoint, { etag, data });
+    return data;
 }
 
 // Reset Chat
@@ -52,6 +70,10 @@ function resetChat() {
     ultravoxSession = null;
     isInitialized = false;
     isWaitingForResponse = false;
+    messageIndex = 0;
+    shownReplies.clear();
+    pendingMessage = null;
+    pendingMessageSeen = false;
 
     const container = document.getElementById('messagesContainer');
     container.innerHTML = `
@@ -118,15 +140,13 @@ async function initializeChat() {
         // Create Ultravox session
         ultravoxSession = new UltravoxSession();
 
-        // Listen for transcripts (agent responses)
+        // Listen for transcripts (agent responses to the pending message)
         ultravoxSession.addEventListener('transcript', (event) => {
-            if (event.role === 'agent' && event.medium === 'text' && event.final) {
-                hideTypingIndicator();
-                addMessage('agent', event.text);
-                isWaitingForResponse = false;
-                document.getElementById('sendBtn').disabled = false;
-                document.getElementById('messageInput').disabled = false;
-                document.getElementById('messageInput').focus();
+            if (event.medium !== 'text' || !event.final || pendingMessage === null) return;
+            if (event.role === 'user' && event.text.trim() === pendingMessage) {
+                pendingMessageSeen = true;
+            } else if (event.role === 'agent' && pendingMessageSeen) {
+                showAgentReply(event.text);
             }
         });
 
@@ -181,6 +201,54 @@ function addMessage(role, text) {
     messagesWrapper.scrollTop = messagesWrapper.scrollHeight;
 }
 
+// Show an agent reply once, whether it arrives as a live transcript or via wait_for_reply
+function showAgentReply(text) {
+    if (shownReplies.has(text)) return;
+    shownReplies.add(text);
+
+    hideTypingIndicator();
+    addMessage('agent', text);
+    pendingMessage = null;
+    isWaitingForResponse = false;
+    document.getElementById('sendBtn').disabled = false;
+    document.getElementById('messageInput').disabled = false;
+    document.getElementById('messageInput').focus();
+}
+
+// Agent messages following the last user message reading `text`
+function agentReplies(messages, text) {
+    const sent = messages.map(m => m.role === 'MESSAGE_ROLE_USER' && (m.text || '').trim() === text);
+    const anchor = sent.lastIndexOf(true);
+    if (anchor === -1) return [];
+    return messages
+        .slice(anchor + 1)
+        .filter(m => m.role === 'MESSAGE_ROLE_AGENT' && m.text)
+        .map(m => m.text);
+}
+
+// Long-poll the backend for the reply (one shared upstream poll per chat)
+async function waitForReply(chatId, text) {
+    while (chatId === currentChatId && isWaitingForResponse) {
+        try {
+            const result = await apiRequest(
+                `/api/chats/${chatId}/wait_for_reply?after=${messageIndex}&timeout=25` +
+                `&message=${encodeURIComponent(text)}`
+            );
+            if (chatId !== currentChatId) return;
+            // Keep waiting from the same index until the reply is in, so the
+            // user message stays in the window the reply is anchored on
+            if (!result.timed_out) {
+                messageIndex = result.next_index;
+                agentReplies(result.messages, text).forEach(showAgentReply);
+                return;
+            }
+        } catch (error) {
+            console.error('Failed to wait for reply:', error);
+            return;
+        }
+    }
+}
+
 // Show Typing Indicator
 function showTypingIndicator() {
     const container = document.getElementById('messagesContainer');
@@ -255,9 +323,13 @@ async function sendMessage(messageText = null) {
             await initializeChat();
 
             // Now send the message
+            shownReplies.clear();
+            pendingMessage = message;
+            pendingMessageSeen = false;
             await apiRequest(`/api/chats/${currentChatId}/messages`, 'POST', {
                 message: message
             });
+            waitForReply(currentChatId, message);
 
         } catch (error) {
             console.error('Failed to initialize or send message:', error);
@@ -282,9 +354,13 @@ async function sendMessage(messageText = null) {
 
     try {
         // Send message to API
+        shownReplies.clear();
+        pendingMessage = message;
+        pendingMessageSeen = false;
         await apiRequest(`/api/chats/${currentChatId}/messages`, 'POST', {
             message: message
         });
+        waitForReply(currentChatId, message);
 
     } catch (error) {
         console.error('Failed to send message:', error);